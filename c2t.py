@@ -15,12 +15,13 @@ from common import (
     HelpFormatter,
     makedirs,
     pypath,
+    QMPClient,
     qdtdirs,
 )
 from debug import (
     DWARFInfoCache,
     get_elffile_loading,
-    InMemoryELFFile,
+    MappedELFFile,
     Runtime,
 )
 with pypath("pyrsp"):
@@ -29,7 +30,6 @@ with pypath("pyrsp"):
     )
     from pyrsp.utils import (
         find_free_port,
-        QMP,
         wait_for_tcp_port,
     )
 
@@ -40,11 +40,17 @@ from argparse import (
 from collections import (
     defaultdict,
 )
+from hashlib import (
+    md5,
+)
 from multiprocessing import (
     Process,
     Queue,
     Value,
 )
+from multiprocessing.pool import (
+    ThreadPool,
+)
 from os import (
     killpg,
     setpgrp,
@@ -90,6 +96,7 @@ from threading import (
 from time import (
     localtime,
     strftime,
+    time,
 )
 from traceback import (
     print_exc,
@@ -178,7 +185,8 @@ class DebugSession(object):
     def reset(self, srcfile, elffile):
         self.srcfile = srcfile
         self.elffile = elffile
-        self.elf = InMemoryELFFile(elffile)
+        # Sessions of all tests share mappings of ELF files.
+        self.elf = MappedELFFile(elffile, shared = True)
         di = self.elf.get_dwarf_info()
         dic = DWARFInfoCache(di,
             symtab = self.elf.get_section_by_name(".symtab")
@@ -398,47 +406,300 @@ class ProcessWithErrCatching(Thread):
         self.join()
 
 
-def oracle_tests_run(tests_queue, port_queue, res_queue, is_finish, verbose,
-    timeout
-):
+# Timeout of QMP query of debug server health check, in seconds.
+HEALTH_CHECK_TIMEOUT = 1.0
+
+
+class DebugServerInstance(object):
+    """ A debug server (QEMU or gdbserver) process. It serves one test or
+several tests if it's reused. Statistics are reported in verbose mode.
+    """
+
+    def __init__(self, name, popen_args, port, qmp_port = None):
+        self.name = name
+        self.port = port
+        self.qmp_port = qmp_port
+        self.qmp = None
+        # `DebugSession` connected to the server, set by test runner
+        self.session = None
+
+        # statistics
+        self.t_start = time()
+        self.startup_time = None
+        self.tests = 0
+        self.timeouts = 0
+        self.busy_time = 0.
+
+        self.process = ProcessWithErrCatching(popen_args)
+        self.process.start()
+
+    def wait_ready(self):
+        "Returns `False` if the server does not listen its port."
+
+        if self.startup_time is not None:
+            return True
+
+        if not wait_for_tcp_port(self.port):
+            return False
+
+        if self.qmp_port and wait_for_tcp_port(self.qmp_port):
+            self.qmp = QMPClient(self.qmp_port)
+
+        self.startup_time = time() - self.t_start
+        return True
+
+    def is_healthy(self):
+        if not self.process.is_alive():
+            return False
+
+        qmp = self.qmp
+        if qmp is None:
+            return True
+
+        qmp.settimeout(HEALTH_CHECK_TIMEOUT)
+        try:
+            qmp("query-status")
+        except Exception:
+            return False
+        finally:
+            qmp.settimeout(None)
+        return True
+
+    def run_test(self, timeout):
+        "Runs current test of the `session`. Returns was timeout expired."
+
+        t0 = time()
+        timeout_expired = self.session.run(timeout)
+        self.busy_time += time() - t0
+
+        self.tests += 1
+        if timeout_expired:
+            self.timeouts += 1
+
+        return timeout_expired
+
+    def stop(self, force = False):
+        session = self.session
+        if force or session is None:
+            # The server is hung or it has never been connected.
+            self.process.wipe()
+        else:
+            session.kill()
+            self.process.join()
+            session.port_close()
+
+    def __str__(self):
+        return ("%s:%d: %d test(s), %d timeout(s), ready in %s, busy %.2f s,"
+            " lifetime %.2f s" % (
+                self.name, self.port, self.tests, self.timeouts,
+                "n/a" if self.startup_time is None else (
+                    "%.2f s" % self.startup_time
+                ),
+                self.busy_time, time() - self.t_start
+            )
+        )
+
+
+class DebugServerPool(object):
+    """ Debug servers of a test runner process.
+
+A server for next test is started in advance, while current test is running.
+So, test throughput is not bound by server startup. It's only possible if
+servers are not `bound` to ELF files they are started with. Next test is not
+known in advance because it's not taken from the queue until current test is
+finished. Else another runner could be idle.
+
+If `reuse`, a server is used for next tests while it's healthy. Only servers
+with QMP can be reused. A hung server is killed after test timeout and
+its replacement is started in advance too.
+
+A server is started in advance only if there are free ports for it at once.
+Else, it's started on demand.
+
+:param start:
+    a callable which starts `DebugServerInstance` for given test ELF file,
+    if `block` is `False`, it returns `None` when there are no free ports
+:param bound:
+    a server can only run the test ELF file it's started with (e.g.
+    gdbserver or QEMU in user mode)
+    """
+
+    def __init__(self, start, reuse, verbose, bound = True):
+        self.start = start
+        self.reuse = reuse
+        self.verbose = verbose
+        self.bound = bound
+
+        self.current = None
+        # ELF file of current test
+        self.current_elf = None
+        # a server started in advance and its ELF file
+        self.spare = None
+        self.spare_elf = None
+
+        self.started = 0
+
+    def _reusable(self, server):
+        return self.reuse and server.qmp is not None
+
+    def _start(self, test_elf, block = True):
+        server = self.start(test_elf, block = block)
+        if server is not None:
+            self.started += 1
+        return server
+
+    def warm_up(self):
+        """ Starts a server for next test, if servers are not bound and
+current server cannot be reused. ELF file of current test is given to it.
+        """
+
+        if self.bound or self.spare is not None:
+            return
+
+        current = self.current
+        if current is not None and self._reusable(current):
+            return
+
+        self.spare = self._start(self.current_elf, block = False)
+        self.spare_elf = self.current_elf
+
+    def acquire(self, test_elf):
+        self.current_elf = test_elf
+
+        current = self.current
+        if current is not None:
+            # It's a reusable server, see `release`.
+            if current.is_healthy():
+                return current
+
+            self._retire(current, force = True)
+
+        spare, self.spare = self.spare, None
+        if spare is not None and (not self.bound or self.spare_elf == test_elf):
+            server = spare
+        else:
+            if spare is not None:
+                self._retire(spare, force = True)
+            server = self._start(test_elf)
+
+        if not server.wait_ready():
+            c2t_exit("%s malfunction" % server.name)
+
+        self.current = server
+        return server
+
+    def release(self, server, timeout_expired):
+        if timeout_expired:
+            self._retire(server, force = True)
+        elif not self._reusable(server):
+            self._retire(server)
+
+    def _retire(self, server, force = False):
+        server.stop(force = force)
+
+        if server is self.current:
+            self.current = None
+
+        if self.verbose:
+            print(server)
+
+    def close(self):
+        if self.current is not None:
+            self._retire(self.current)
+        if self.spare is not None:
+            self._retire(self.spare, force = True)
+            self.spare = None
+
+        if self.verbose:
+            print("%d debug server(s) started" % self.started)
+
+
+def get_test(tests_queue, is_finish):
+    "Waits for next test. Returns `None` if all tests are done."
+
     while True:
         try:
-            test_src, test_elf = tests_queue.get(timeout = 0.1)
+            return tests_queue.get(timeout = 0.1)
         except Empty:
             if is_finish.value:
-                break
-            continue
+                return None
+
+
+def run_tests(pool, tests_queue, is_finish, timeout, setup_session):
+    def warm_up():
+        # A server started in advance is wasted if there are no more tests.
+        if not (is_finish.value and tests_queue.empty()):
+            pool.warm_up()
+
+    test = get_test(tests_queue, is_finish)
+
+    while test is not None:
+        test_src, test_elf = test
+
+        server = pool.acquire(test_elf)
+        setup_session(server, test_src, test_elf)
+
+        warm_up()
+        pool.release(server, server.run_test(timeout))
+        # replacement for a killed server
+        warm_up()
+
+        # Next test is taken only when this runner is free. Else, it could
+        # wait for this runner while another runner is idle.
+        test = get_test(tests_queue, is_finish)
+
+    pool.close()
+
+
+def get_ports(port_queue, count, block):
+    """ Returns list of `count` ports from the `port_queue`. If not `block`, it
+returns `None` when there are not enough ports at once.
+    """
 
-        gdbserver_port = port_queue.get(block = True)
+    ports = []
+    try:
+        for __ in range(count):
+            ports.append(port_queue.get(block = block))
+    except Empty:
+        # the ports are left for others
+        for port in ports:
+            port_queue.put(port)
+        return None
+    return ports
+
+
+def oracle_tests_run(tests_queue, port_queue, res_queue, is_finish, verbose,
+    timeout
+):
+    def start(test_elf, block = True):
+        ports = get_ports(port_queue, 1, block)
+        if ports is None:
+            return None
+        port = ports[0]
 
-        gdbserver = ProcessWithErrCatching(
+        return DebugServerInstance("gdbserver",
             c2t_cfg.gdbserver.run.gen_popen_args(
-                port = gdbserver_port,
+                port = port,
                 bin = test_elf,
                 c2t_dir = C2T_DIR,
                 test_dir = C2T_TEST_DIR
-            )
+            ),
+            port
         )
-        gdbserver.start()
 
-        if not wait_for_tcp_port(gdbserver_port):
-            c2t_exit("gdbserver malfunction")
-
-        session = OracleSession(archmap[ORACLE_CPU], test_src,
-            str(gdbserver_port), test_elf, res_queue, verbose
+    def setup_session(server, test_src, test_elf):
+        server.session = OracleSession(archmap[ORACLE_CPU], test_src,
+            str(server.port), test_elf, res_queue, verbose
         )
 
-        if session.run(timeout):
-            gdbserver.wipe()
-        else:
-            session.kill()
-            gdbserver.join()
-            session.port_close()
+    # gdbserver cannot run another program
+    pool = DebugServerPool(start, False, verbose)
+    run_tests(pool, tests_queue, is_finish, timeout, setup_session)
 
     res_queue.put(("oracle", None, "TEST_EXIT"))
 
 
-def run_qemu(test_elf, qemu_port, qmp_port, verbose):
+def start_qemu(test_elf, qemu_port, qmp_port, verbose):
     if qmp_port:
         qmp_args = ("-qmp", "tcp:localhost:%d,server,nowait" % qmp_port)
     else:
@@ -454,73 +715,55 @@ def run_qemu(test_elf, qemu_port, qmp_port, verbose):
     if verbose:
         print(cmd)
 
-    qemu = ProcessWithErrCatching(cmd)
-    qemu.start()
-    return qemu
+    return DebugServerInstance("qemu", cmd, qemu_port, qmp_port = qmp_port)
 
 
 def target_tests_run(tests_queue, port_queue, res_queue, is_finish, reuse,
     verbose, timeout
 ):
-    qemu = None
-    session = None
-    qmp_port = None
-    qmp = None
-    while True:
-        try:
-            test_src, test_elf = tests_queue.get(timeout = 0.1)
-        except Empty:
-            if is_finish.value:
-                if reuse and qemu and session:
-                    session.kill()
-                    qemu.join()
-                    session.port_close()
-                break
-            continue
-        else:
-            if reuse and session and qmp:
-                qmp("stop")
-                qmp("system_reset")
-                session.reset(test_src, test_elf)
-            else:
-                qemu_port = port_queue.get(block = True)
-                if (not c2t_cfg.rsp_target.user
-                    and (reuse or c2t_cfg.rsp_target.qemu_reset)
-                ):
-                    qmp_port = port_queue.get(block = True)
+    rsp_target = c2t_cfg.rsp_target
 
-                qemu = run_qemu(test_elf, qemu_port, qmp_port, verbose)
+    if not rsp_target.user and (reuse or rsp_target.qemu_reset):
+        ports_count = 2
+    else:
+        ports_count = 1
 
-                if not wait_for_tcp_port(qemu_port):
-                    c2t_exit("qemu malfunction")
+    def start(test_elf, block = True):
+        ports = get_ports(port_queue, ports_count, block)
+        if ports is None:
+            return None
 
-                if qmp_port and wait_for_tcp_port(qmp_port):
-                    qmp = QMP(qmp_port)
+        qemu_port = ports[0]
+        qmp_port = ports[1] if ports_count > 1 else None
 
-                session = TargetSession(c2t_cfg.rsp_target.rsp, test_src,
-                    str(qemu_port), test_elf, res_queue, verbose
-                )
+        return start_qemu(test_elf, qemu_port, qmp_port, verbose)
 
-            if qmp and c2t_cfg.rsp_target.qemu_reset:
-                # TODO: use future 'entry' feature
-                session.rt.target[4] = pack("<I",
-                    session.rt.dic.symtab.get_symbol_by_name(
-                        "main"
-                    )[0].entry.st_value
-                )
-                qmp("system_reset")
+    def setup_session(server, test_src, test_elf):
+        session = server.session
+        qmp = server.qmp
 
-            if session.run(timeout):
-                qemu.wipe()
+        if session is None:
+            server.session = session = TargetSession(rsp_target.rsp,
+                test_src, str(server.port), test_elf, res_queue, verbose
+            )
+        else:
+            # reused server
+            qmp("stop")
+            qmp("system_reset")
+            session.reset(test_src, test_elf)
+
+        if qmp and rsp_target.qemu_reset:
+            # TODO: use future 'entry' feature
+            session.rt.target[4] = pack("<I",
+                session.rt.dic.symtab.get_symbol_by_name(
+                    "main"
+                )[0].entry.st_value
+            )
+            qmp("system_reset")
 
-                # Qemu has been terminated and cannot be reused
-                session = None
-                qmp = None
-            else:
-                if not reuse:
-                    session.kill()
-                    qemu.join()
-                    session.port_close()
+    # QEMU in system mode is given the ELF file by `TargetSession.load`.
+    pool = DebugServerPool(start, reuse, verbose, bound = rsp_target.user)
+    run_tests(pool, tests_queue, is_finish, timeout, setup_session)
 
     res_queue.put(("target", None, "TEST_EXIT"))
 
@@ -542,10 +785,13 @@ class FreePortFinder(Process):
 
 
 class C2TTestBuilder(Process):
-    """ A helper class that builds tests """
+    """ A helper class that builds tests. Up to `jobs` tests are built at once.
+A test is given to `tests_queue` as soon as its binary is ready.
+    """
 
     def __init__(self, compiler, tests, tests_tail, tests_queue, is_finish,
-        verbose
+        verbose,
+        jobs = 1
     ):
         super(C2TTestBuilder, self).__init__()
         self.compiler = compiler
@@ -554,8 +800,9 @@ class C2TTestBuilder(Process):
         self.tests_queue = tests_queue
         self.is_finish = is_finish
         self.verbose = verbose
+        self.jobs = jobs
 
-    def test_build(self, test_src, test_ir, test_bin):
+    def test_commands(self, test_src, test_ir, test_bin):
         substitutions = dict(
             src = test_src,
             ir = test_ir,
@@ -563,36 +810,80 @@ class C2TTestBuilder(Process):
             c2t_dir = C2T_DIR,
             test_dir = C2T_TEST_DIR,
         )
-        for run in self.compiler:
-            cmd = run.gen_popen_args(**substitutions)
+        return list(run.gen_popen_args(**substitutions)
+            for run in self.compiler
+        )
+
+    def test_build(self, test_src, test_ir, test_bin):
+        for cmd in self.test_commands(test_src, test_ir, test_bin):
             if self.verbose:
                 print(cmd)
             cmpl_unit = ProcessWithErrCatching(cmd)
             cmpl_unit.start()
             cmpl_unit.join()
 
+    def test_stamp(self, test_src, cmds):
+        "Identifies content of the test source and compiler command lines."
+
+        h = md5()
+        with open(test_src, "rb") as f:
+            h.update(f.read())
+        for cmd in cmds:
+            h.update(repr(cmd).encode("utf-8"))
+        return h.hexdigest()
+
+    def build_if_needed(self, test):
+        test_name = test[:-2]
+        test_src = join(C2T_TEST_DIR, test)
+        test_bin = join(self.bin_dir, test_name)
+        test_ir = join(self.ir_dir, test_name)
+        stamp_file = join(self.stamp_dir, test_name)
+
+        stamp = self.test_stamp(test_src,
+            self.test_commands(test_src, test_ir, test_bin)
+        )
+
+        if not exists(test_bin):
+            up_to_date = False
+        elif exists(stamp_file):
+            with open(stamp_file, "r") as f:
+                up_to_date = f.read() == stamp
+        else:
+            # binary built by previous version of c2t
+            up_to_date = getmtime(test_bin) >= getmtime(test_src)
+
+        if not up_to_date:
+            self.test_build(test_src, test_ir, test_bin)
+
+            # If building fails, `c2t_exit` is called. So, the stamp is only
+            # written for successfully built binary.
+            with open(stamp_file, "w") as f:
+                f.write(stamp)
+
+        return test_src, test_bin
+
     def run(self):
-        bin_dir = join(C2T_WORK_DIR, self.tests_tail, "bin")
-        ir_dir = join(C2T_WORK_DIR, self.tests_tail, "ir")
+        self.bin_dir = join(C2T_WORK_DIR, self.tests_tail, "bin")
+        self.ir_dir = join(C2T_WORK_DIR, self.tests_tail, "ir")
+        self.stamp_dir = join(C2T_WORK_DIR, self.tests_tail, "stamp")
 
-        print("Binaries: " + bin_dir)
-        print("Intermediates: " + ir_dir)
+        print("Binaries: " + self.bin_dir)
+        print("Intermediates: " + self.ir_dir)
 
         # creates tests subdirectories if they don't exist
-        for sub_dir in (bin_dir, ir_dir):
+        for sub_dir in (self.bin_dir, self.ir_dir, self.stamp_dir):
             makedirs(sub_dir, exist_ok = True)
 
-        for test in self.tests:
-            test_name = test[:-2]
-            test_src = join(C2T_TEST_DIR, test)
-            test_bin = join(bin_dir, test_name)
-
-            if not exists(test_bin) or getmtime(test_bin) < getmtime(test_src):
-                test_ir = join(ir_dir, test_name)
-
-                self.test_build(test_src, test_ir, test_bin)
+        # Compilers are external processes, threads are enough to run them
+        # in parallel.
+        pool = ThreadPool(min(self.jobs, len(self.tests)) or 1)
+        try:
+            for test in pool.imap_unordered(self.build_if_needed, self.tests):
+                self.tests_queue.put(test)
+        finally:
+            pool.close()
+            pool.join()
 
-            self.tests_queue.put((test_src, test_bin))
         self.is_finish.value = 1
 
 
@@ -607,10 +898,12 @@ def start_cpu_testing(tests, jobs, reuse, verbose,
     is_finish_target = Value('i', 0)
 
     oracle_tb = C2TTestBuilder(c2t_cfg.oracle_compiler, tests,
-        ORACLE_CPU, oracle_tests_queue, is_finish_oracle, verbose
+        ORACLE_CPU, oracle_tests_queue, is_finish_oracle, verbose,
+        jobs = jobs
     )
     target_tb = C2TTestBuilder(c2t_cfg.target_compiler, tests,
-        c2t_cfg.rsp_target.march, target_tests_queue, is_finish_target, verbose
+        c2t_cfg.rsp_target.march, target_tests_queue, is_finish_target, verbose,
+        jobs = jobs
     )
 
     oracle_tb.start()
@@ -621,22 +914,26 @@ def start_cpu_testing(tests, jobs, reuse, verbose,
         target_tb.join()
         return
 
+    if jobs > len(tests):
+        jobs = len(tests)
+
     port_queue = Queue(0)
 
     if not c2t_cfg.rsp_target.user:
-        # Finding ports for Qemu, QMP server and gdbserver
-        pf = FreePortFinder(port_queue, len(tests) * 3)
+        # Qemu and QMP server
+        qemu_ports = 2
     else:
-        # Finding ports for Qemu and gdbserver
-        pf = FreePortFinder(port_queue, len(tests) * 2)
+        qemu_ports = 1
 
+    # Finding ports for Qemu and gdbserver of each test. A Qemu is also
+    # started in advance by each target runner and can be left unused.
+    pf = FreePortFinder(port_queue,
+        len(tests) * (qemu_ports + 1) + jobs * qemu_ports
+    )
     pf.start()
 
     res_queue = Queue(0)
 
-    if jobs > len(tests):
-        jobs = len(tests)
-
     timeout = float(c2t_cfg.rsp_target.test_timeout)
 
     tests_run_processes = []
@@ -795,7 +1092,7 @@ def main():
         type = int,
         dest = "jobs",
         default = 1,
-        help = "allow N debugging jobs at once"
+        help = "allow N building and debugging jobs at once"
     )
     arg("-r", "--reuse",
         action = "store_true",
@@ -0,0 +1,4 @@
+from .command_executor import *
+from .config import *
+from .debug_cmp import *
+from .test_log import *
\ No newline at end of file
@@ -6,12 +6,35 @@ __all__ = [
   , "CoReturn"
 # object
   , "CoTask"
+  , "CoWaitable"
+      , "CoTimeout"
+      , "CoFD"
+      , "CoEvent"
+          , "CoFuture"
   , "CoDispatcher"
       , "CLICoDispatcher"
 # function
   , "callco"
 ]
 
+from collections import (
+    deque,
+    OrderedDict,
+)
+from heapq import (
+    heappop,
+    heappush,
+)
+from itertools import (
+    count,
+)
+from select import (
+    select,
+)
+from threading import (
+    Event,
+    Lock,
+)
 from time import (
     sleep
 )
@@ -37,6 +60,10 @@ from .os_wrappers import (
 
 PROFILE_COTASK = ee("QDT_PROFILE_COTASK")
 
+# Maximum latency of `CoEvent` handling while `CoDispatcher` is blocked
+# waiting for file descriptors.
+EVENT_LATENCY = 0.01
+
 
 class FailedCallee(RuntimeError):
     def __init__(self, callee):
@@ -127,6 +154,101 @@ class CoTask(object):
         pass
 
 
+class CoWaitable(object):
+    """ Base class of objects a coroutine can `yield` to be suspended until
+something happens. The `yield` returns `None`.
+
+:param timeout: seconds after which the coroutine is resumed even if nothing
+    has happened, `None` means no timeout.
+    """
+
+    def __init__(self, timeout = None):
+        self.timeout = timeout
+        # `False` if the coroutine has been resumed because of the timeout.
+        self.ready = False
+
+    def __wait__(self, dispatcher):
+        """ Called when a coroutine of the `dispatcher` begins waiting.
+Returns `True` if the coroutine can be resumed immediately.
+        """
+        return False
+
+    def __unwait__(self, dispatcher):
+        "Called when no coroutine of the `dispatcher` waits anymore."
+        pass
+
+
+class CoTimeout(CoWaitable):
+    "Suspends the coroutine for `timeout` seconds."
+
+    def __init__(self, timeout):
+        super(CoTimeout, self).__init__(timeout = timeout)
+
+
+class CoFD(CoWaitable):
+    """ Waits for the `fd` (a file descriptor or an object with `fileno`
+method) to be ready for reading or for writing (if `write`). Note that not
+all kinds of file descriptors are supported on all platforms, see
+`select.select`.
+    """
+
+    def __init__(self, fd, write = False, timeout = None):
+        super(CoFD, self).__init__(timeout = timeout)
+        self.fd = fd
+        self.write = write
+
+
+class CoEvent(CoWaitable):
+    """ A flag which can be `set` from any thread. Coroutines waiting for the
+event are resumed when it's set.
+    """
+
+    def __init__(self, timeout = None):
+        super(CoEvent, self).__init__(timeout = timeout)
+        self._flag = False
+        self._lock = Lock()
+        self._dispatchers = set()
+
+    def is_set(self):
+        return self._flag
+
+    def set(self):
+        with self._lock:
+            self._flag = True
+            dispatchers = list(self._dispatchers)
+
+        for d in dispatchers:
+            d._wake_up(self)
+
+    def clear(self):
+        self._flag = False
+
+    def __wait__(self, dispatcher):
+        with self._lock:
+            if self._flag:
+                return True
+            self._dispatchers.add(dispatcher)
+        return False
+
+    def __unwait__(self, dispatcher):
+        with self._lock:
+            self._dispatchers.discard(dispatcher)
+
+
+class CoFuture(CoEvent):
+    """ Waits for a `future`, an object with `add_done_callback` method like
+`concurrent.futures.Future`.
+    """
+
+    def __init__(self, future, timeout = None):
+        super(CoFuture, self).__init__(timeout = timeout)
+        self.future = future
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, __):
+        self.set()
+
+
 class CoDispatcher(object):
     """
     The dispatcher for coroutine task.
@@ -139,6 +261,8 @@ enough the user will not noticed lags.
 until returned one finished. Say, first one _calls_ another.
     - Generator yields False if it has not a work to do right now. For
 instance, if the generator waits for something (except other generator).
+    - Generator yields a `CoWaitable` if it has not a work to do until an
+event. The generator is not given control until then.
     - Generator raise StopIteration when its work is finished. Finished task
 will never be given control. Note that, StopIteration is raised implicitly
 after last statement in the corresponding callable object.
@@ -149,8 +273,19 @@ after last statement in the corresponding callable object.
         N = limit number of active tasks
     """
     def __init__(self, max_tasks = -1):
-        self.tasks = []
-        self.active_tasks = []
+        self.tasks = deque()
+        # Ordered set of active tasks.
+        self.active_tasks = OrderedDict()
+        # Waitable & waiting identifier per each waiting task.
+        self.waiting = {}
+        # Waiting task list per each waitable.
+        self._waiters = {}
+        # Heap of deadline, waiting identifier & task tuples.
+        self._deadlines = []
+        self._wait_ids = count()
+        # Events set (possibly, by other threads) but not handled yet.
+        self._woken = deque()
+        self._wake_up_event = Event()
         # Contains caller list per each callee.
         self.callees = {}
         # Total caller list, I.e. callers = U (callees.values()).
@@ -164,10 +299,11 @@ after last statement in the corresponding callable object.
     def poll(self):
         finished = []
         calls = []
+        waits = []
 
         ready = False
 
-        for task in self.active_tasks:
+        for task in list(self.active_tasks):
             generator = task.generator
             # If the generator is not started yet then just after it yields
             # a reference to its `gi_frame` must be preserved.
@@ -239,6 +375,8 @@ after last statement in the corresponding callable object.
                     # remember the call
                     calls.append((task, ret))
                     ready = True
+                elif isinstance(ret, CoWaitable):
+                    waits.append((task, ret))
                 elif ret:
                     ready = True
 
@@ -269,7 +407,7 @@ after last statement in the corresponding callable object.
             # All callers of finished task may continue execution.
             for caller in callers:
                 del self.callers[caller]
-                self.tasks.insert(0, caller)
+                self.tasks.appendleft(caller)
                 caller._co_ret = co_ret
 
         for caller, callee in calls:
@@ -311,12 +449,156 @@ after last statement in the corresponding callable object.
                 callers.append(caller)
 
             # Caller cannot continue execution until callee finished.
-            self.active_tasks.remove(caller)
+            del self.active_tasks[caller]
             # Remember all callers.
             self.callers[caller] = callee
 
+        for task, waitable in waits:
+            del self.active_tasks[task]
+            self._wait(task, waitable)
+
         return ready
 
+    def _wait(self, task, waitable):
+        wait_id = next(self._wait_ids)
+        self.waiting[task] = (waitable, wait_id)
+
+        try:
+            self._waiters[waitable].append(task)
+        except KeyError:
+            self._waiters[waitable] = [task]
+            if waitable.__wait__(self):
+                self._resume(task, True)
+                return
+
+        timeout = waitable.timeout
+        if timeout is not None:
+            heappush(self._deadlines, (time() + timeout, wait_id, task))
+
+    def _resume(self, task, ready):
+        waitable = self.waiting.pop(task)[0]
+
+        waiters = self._waiters[waitable]
+        waiters.remove(task)
+        if not waiters:
+            del self._waiters[waitable]
+            waitable.__unwait__(self)
+
+        waitable.ready = ready
+        self.tasks.appendleft(task)
+
+    def _wake_up(self, waitable):
+        # It can be called by any thread.
+        self._woken.append(waitable)
+        self._wake_up_event.set()
+
+    def _resume_woken(self):
+        # Note that the event must be cleared before `_woken` checking.
+        self._wake_up_event.clear()
+
+        woken = self._woken
+
+        resumed = False
+        while woken:
+            waitable = woken.popleft()
+            for task in self._waiters.get(waitable, []):
+                self._resume(task, True)
+                resumed = True
+        return resumed
+
+    def _nearest_deadline(self):
+        deadlines = self._deadlines
+        waiting = self.waiting
+        while deadlines:
+            deadline, wait_id, task = deadlines[0]
+            try:
+                cur_wait_id = waiting[task][1]
+            except KeyError:
+                cur_wait_id = None
+            if cur_wait_id == wait_id:
+                return deadline
+            # The task has been resumed before the deadline.
+            heappop(deadlines)
+        return None
+
+    def _resume_expired(self):
+        now = time()
+        resumed = False
+        while True:
+            deadline = self._nearest_deadline()
+            if deadline is None or deadline > now:
+                break
+            task = heappop(self._deadlines)[2]
+            self._resume(task, False)
+            resumed = True
+        return resumed
+
+    def wait_timeout(self):
+        """ Returns seconds until a waiting task will be ready or `None` if
+unknown.
+        """
+        if self._woken:
+            return 0.
+        deadline = self._nearest_deadline()
+        if deadline is None:
+            return None
+        return max(0., deadline - time())
+
+    def wait(self, timeout = None):
+        """ Resumes waiting tasks those are ready. If there is no such task,
+blocks for `timeout` seconds at most (`None` means until a task is ready).
+
+:returns: whether a task has been resumed
+        """
+
+        if not self.waiting:
+            if timeout:
+                sleep(timeout)
+            return False
+
+        resumed = self._resume_woken() | self._resume_expired()
+        if resumed:
+            timeout = 0.
+        else:
+            nearest = self.wait_timeout()
+            if nearest is not None:
+                if timeout is None or nearest < timeout:
+                    timeout = nearest
+
+        rlist, wlist = [], []
+        has_events = False
+        for waitable in self._waiters:
+            if isinstance(waitable, CoFD):
+                (wlist if waitable.write else rlist).append(waitable.fd)
+            elif isinstance(waitable, CoEvent):
+                has_events = True
+
+        if rlist or wlist:
+            if has_events and (timeout is None or timeout > EVENT_LATENCY):
+                timeout = EVENT_LATENCY
+            try:
+                rlist, wlist, __ = select(rlist, wlist, [], timeout)
+            except (IOError, OSError, ValueError):
+                # E.g., interrupted by a signal. Just try again later.
+                rlist, wlist = [], []
+            ready_fds = set(rlist + wlist)
+        else:
+            ready_fds = None
+            if timeout is None or timeout > 0.:
+                self._wake_up_event.wait(timeout)
+
+        if ready_fds:
+            for waitable in list(self._waiters):
+                if isinstance(waitable, CoFD) and waitable.fd in ready_fds:
+                    for task in list(self._waiters[waitable]):
+                        self._resume(task, True)
+                    resumed = True
+
+        resumed |= self._resume_woken()
+        resumed |= self._resume_expired()
+
+        return resumed
+
     def remove(self, task):
         if not isinstance(task, CoTask):
             task = self.gen2task[task]
@@ -348,7 +630,11 @@ after last statement in the corresponding callable object.
             self.tasks.remove(task)
             task.__cancelled__()
         elif task in self.active_tasks:
-            self.active_tasks.remove(task)
+            del self.active_tasks[task]
+            task.__cancelled__()
+        elif task in self.waiting:
+            self._resume(task, False)
+            self.tasks.remove(task)
             task.__cancelled__()
         elif task in self.failed_tasks:
             self.failed_tasks.remove(task)
@@ -377,12 +663,11 @@ after last statement in the corresponding callable object.
             # Wake the caller up giving it a chance to catch the exception
             # around current `yield`.
             del self.callers[c]
-            self.tasks.insert(0, c)
+            self.tasks.appendleft(c)
 
     def _failed(self, task, exception):
         task.exception = exception
-        if task in self.active_tasks:
-            self.active_tasks.remove(task)
+        self.active_tasks.pop(task, None)
         self.failed_tasks.add(task)
         task.__failed__()
 
@@ -398,13 +683,13 @@ after last statement in the corresponding callable object.
 
     def _finish(self, task, ret):
         # print 'Task %s finished' % str(task)
-        self.active_tasks.remove(task)
+        del self.active_tasks[task]
         self.finished_tasks[task] = ret
         task.__finished__()
 
     def _activate(self, task):
         # print 'Activating task %s' % str(task)
-        self.active_tasks.append(task)
+        self.active_tasks[task] = None
         task.__activated__()
 
     def pull(self):
@@ -416,19 +701,22 @@ after last statement in the corresponding callable object.
             added = bool(self.tasks)
             if added:
                 while self.tasks:
-                    task = self.tasks.pop(0)
+                    task = self.tasks.popleft()
                     self._activate(task)
         else:
             rest = self.max_tasks - len(self.active_tasks)
             while rest > 0 and self.tasks:
                 rest = rest - 1
-                task = self.tasks.pop(0)
+                task = self.tasks.popleft()
                 self._activate(task)
                 added = True
 
         return added
 
     def iteration(self):
+        if self.waiting:
+            self.wait(0.)
+
         if self.pull() or self.active_tasks:
             ready = self.poll()
         else:
@@ -437,19 +725,21 @@ after last statement in the corresponding callable object.
         return ready
 
     def has_work(self):
-        return self.tasks or self.active_tasks
+        return bool(self.tasks or self.active_tasks or self.waiting)
 
     def dispatch_all(self, delay = 0.01):
         has_work, iteration = self.has_work, self.iteration
 
-        if delay is None:
-            # No delay mode
-            while has_work():
-                iteration()
-        else:
-            while has_work():
-                if not iteration():
-                    sleep(delay)
+        while has_work():
+            if iteration():
+                continue
+
+            if self.tasks or self.active_tasks:
+                # There are tasks those wait without `CoWaitable`.
+                if delay is not None:
+                    self.wait(delay)
+            else:
+                self.wait()
 
     def get_co_ret(self, co):
         if not isinstance(co, CoTask):
@@ -466,9 +756,11 @@ class CLICoDispatcher(CoDispatcher):
 
 
 def callco(co, delay = default):
-    """ Call `co`routine. See `CoDispatcher` for coroutine protocol.
+    """ Call `co`routine (a generator or `CoTask`). See `CoDispatcher` for
+coroutine protocol.
 
-:param delay: time to wait if a coroutine `yield`ed `False`.
+:param delay: time to wait if a coroutine `yield`ed `False`. `None` means
+    no delay.
 
     """
     disp = CLICoDispatcher()
@@ -479,7 +771,7 @@ def callco(co, delay = default):
         disp.dispatch_all(delay = delay)
 
     for t in disp.failed_tasks:
-        if t.generator is co:
+        if t is co or t.generator is co:
             raise t.exception
 
     return disp.get_co_ret(co)
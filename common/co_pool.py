@@ -0,0 +1,345 @@
+__all__ = [
+    "CoPool"
+  , "OffloadTask"
+# RuntimeError
+  , "OffloadCancelled"
+# function
+  , "offload_progress"
+]
+
+from .co_dispatcher import (
+    callco,
+    CoEvent,
+    CoReturn,
+    CoTask,
+)
+from .co_process import (
+    FunctionFailure,
+)
+from .ml import (
+    mlget as _,
+)
+from .notifier import (
+    notifier,
+)
+
+from collections import (
+    deque,
+)
+from itertools import (
+    count,
+)
+from multiprocessing import (
+    Manager,
+    Pool,
+    Queue,
+)
+from multiprocessing.pool import (
+    ThreadPool,
+)
+from six import (
+    PY3,
+)
+from sys import (
+    exc_info,
+)
+from threading import (
+    local,
+    Thread,
+)
+from traceback import (
+    format_exception,
+)
+from types import (
+    GeneratorType,
+)
+
+
+class OffloadCancelled(RuntimeError):
+    "`offload_progress` raises it in a worker if the job has been cancelled."
+
+
+# Job being executed by current worker thread.
+_current = local()
+
+# Channel of current worker process, see `_init_process_worker`.
+_process_channel = None
+
+
+class _ProcessChannel(object):
+    "Worker side of a process `CoPool`."
+
+    def __init__(self, progress, cancelled):
+        self.progress = progress
+        self.cancelled = cancelled
+
+    def put_progress(self, job_id, value):
+        self.progress.put((job_id, value))
+
+    def is_cancelled(self, job_id):
+        return job_id in self.cancelled
+
+
+class _ProgressEnd(object):
+    "Marks end of job's progress reports in the queue of a process `CoPool`."
+
+
+def _init_process_worker(progress, cancelled, initializer, initargs):
+    global _process_channel
+    _process_channel = _ProcessChannel(progress, cancelled)
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_job(channel, job_id, function, a, kw):
+    "Returns kind & payload of the result and the progress reporting flag."
+
+    if channel is None:
+        channel = _process_channel
+
+    if channel.is_cancelled(job_id):
+        return (2, None, False)
+
+    _current.channel = channel
+    _current.job_id = job_id
+    _current.reported = False
+    try:
+        ret = function(*a, **kw)
+        if isinstance(ret, GeneratorType):
+            # A coroutine is completely executed by the worker.
+            ret = callco(ret)
+    except OffloadCancelled:
+        res = (2, None)
+    except:
+        # Traceback cannot be pickled. So, it's formatted.
+        t, v, tb = exc_info()
+        res = (1, (t, v, "".join(format_exception(t, v, tb))))
+    else:
+        res = (0, ret)
+    finally:
+        reported = _current.reported
+        del _current.channel, _current.job_id, _current.reported
+
+    if reported and channel is _process_channel:
+        # The result and progress reports are delivered by different threads.
+        # Let `OffloadTask` wait for last report.
+        channel.put_progress(job_id, _ProgressEnd)
+        return res + (True,)
+    else:
+        return res + (False,)
+
+
+def offload_progress(value = None):
+    """ Reports progress of current `CoPool` job. `value` (if not `None`) is
+given to "progress" watchers of corresponding `OffloadTask` in the dispatcher
+thread. Does nothing outside a worker.
+
+:raises OffloadCancelled: if the job has been cancelled. A CPU-bound function
+    should call `offload_progress` periodically to be cancellable.
+    """
+
+    try:
+        channel = _current.channel
+    except AttributeError:
+        return
+
+    job_id = _current.job_id
+
+    if channel.is_cancelled(job_id):
+        raise OffloadCancelled()
+
+    if value is not None:
+        _current.reported = True
+        channel.put_progress(job_id, value)
+
+
+@notifier("progress")
+class OffloadTask(CoTask):
+    """ A coroutine task which waits for a `CoPool` job. A coroutine `yield`s
+it to get job's result. Removal of the task from the dispatcher cancels the
+job and callers get `CancelledCallee`. If the job has failed, the task raises
+`FunctionFailure`.
+    """
+
+    def __init__(self, pool, job_id):
+        self.pool = pool
+        self.job_id = job_id
+
+        # (kind, payload, reported), see `_run_job`
+        self._result = None
+        self._progress_ended = False
+        self._progress = deque()
+        self._changed = CoEvent()
+
+        CoTask.__init__(self, self.co_wait(),
+            description = _("Offloaded job")
+        )
+
+    def _on_progress(self, value):
+        # It's called by a thread of the pool.
+        if value is _ProgressEnd:
+            self._progress_ended = True
+            self.pool._forget(self.job_id)
+        else:
+            self._progress.append(value)
+        self._changed.set()
+
+    def _on_result(self, result):
+        # It's called by a thread of the pool.
+        self._result = result
+        if not result[2]:
+            self.pool._forget(self.job_id)
+        self._changed.set()
+
+    @property
+    def _finished(self):
+        result = self._result
+        return result is not None and (self._progress_ended or not result[2])
+
+    def co_wait(self):
+        changed = self._changed
+        progress = self._progress
+
+        while True:
+            yield changed
+            changed.clear()
+
+            # All reports are queued before the job is finished.
+            finished = self._finished
+
+            while progress:
+                self.__notify_progress(progress.popleft())
+
+            if finished:
+                break
+
+        kind, payload, __ = self._result
+        if kind == 0:
+            raise CoReturn(payload)
+        elif kind == 1:
+            raise FunctionFailure(*payload)
+        else:
+            raise OffloadCancelled()
+
+    def __cancelled__(self):
+        self.pool.cancel(self.job_id)
+
+
+class CoPool(object):
+    """ A pool of worker processes (or threads, if `threads`) for CPU-bound
+functions. `offload` returns `OffloadTask` which can be `yield`ed by a
+coroutine or given to `callco`. Worker functions may report progress and
+check for cancellation using `offload_progress`.
+
+A function may also return a generator (i.e. be a coroutine). It's completely
+executed in the worker then.
+
+:param processes: amount of workers, default is CPU count
+:param initializer: called with `initargs` in each worker at start
+    """
+
+    def __init__(self,
+        processes = None,
+        threads = False,
+        initializer = None,
+        initargs = tuple()
+    ):
+        self.threads = threads
+
+        # job_id -> OffloadTask
+        self._jobs = {}
+        self._job_ids = count()
+        # Local copy of `_cancelled` keys.
+        self._cancelled_ids = set()
+
+        # job_id -> True, a `dict` is used because of `Manager`
+        if threads:
+            self._cancelled = {}
+            self.pool = ThreadPool(processes, initializer, initargs)
+        else:
+            self._manager = Manager()
+            self._cancelled = self._manager.dict()
+            self._progress = Queue()
+            self.pool = Pool(processes,
+                initializer = _init_process_worker,
+                initargs = (self._progress, self._cancelled,
+                    initializer, initargs
+                )
+            )
+            self._progress_thread = t = Thread(
+                target = self._deliver_progress,
+                name = "CoPool progress"
+            )
+            t.daemon = True
+            t.start()
+
+    def offload(self, function, *a, **kw):
+        "Schedules `function(*a, **kw)` and returns `OffloadTask`."
+
+        job_id = next(self._job_ids)
+        task = OffloadTask(self, job_id)
+        self._jobs[job_id] = task
+
+        callbacks = dict(callback = task._on_result)
+        if PY3:
+            # E.g., the result cannot be pickled.
+            callbacks["error_callback"] = lambda e: task._on_result(
+                (1, (type(e), e, repr(e)), False)
+            )
+
+        self.pool.apply_async(_run_job,
+            (self if self.threads else None, job_id, function, a, kw),
+            **callbacks
+        )
+        return task
+
+    def cancel(self, job_id):
+        if self._jobs.pop(job_id, None) is not None:
+            self._cancelled_ids.add(job_id)
+            self._cancelled[job_id] = True
+
+    def _forget(self, job_id):
+        self._jobs.pop(job_id, None)
+        if job_id in self._cancelled_ids:
+            self._cancelled_ids.discard(job_id)
+            self._cancelled.pop(job_id, None)
+
+    # Worker side of thread `CoPool`.
+
+    def put_progress(self, job_id, value):
+        task = self._jobs.get(job_id)
+        if task is not None:
+            task._on_progress(value)
+
+    def is_cancelled(self, job_id):
+        return job_id in self._cancelled
+
+    def _deliver_progress(self):
+        progress = self._progress
+        while True:
+            item = progress.get()
+            if item is None:
+                break
+            self.put_progress(*item)
+
+    def close(self):
+        "No more jobs will be offloaded. Workers exit after current jobs."
+        self.pool.close()
+
+    def terminate(self):
+        "Stops workers immediately. Not finished jobs are never finished."
+
+        self.pool.terminate()
+        self.pool.join()
+
+        if not self.threads:
+            self._progress.put(None)
+            self._progress_thread.join()
+            self._manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *__):
+        self.terminate()
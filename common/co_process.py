@@ -10,7 +10,14 @@ from multiprocessing import (
 from sys import (
     exc_info
 )
+from threading import (
+    Thread
+)
+from traceback import (
+    format_exception
+)
 from .co_dispatcher import (
+    CoEvent,
     CoReturn
 )
 
@@ -20,7 +27,7 @@ class FunctionFailure(RuntimeError): pass
 
 def co_process(function, *a, **kw):
     """ Call the `function` in a dedicated process, `a` & `kw` are for
-the call.
+the call. See also `CoPool`.
     """
 
     in_, out = Pipe(False)
@@ -29,8 +36,27 @@ the call.
         args = (out, function, a, kw)
     )
     proc.start()
-    while proc.is_alive():
-        yield False
+    out.close()
+
+    feedback = []
+    done = CoEvent()
+
+    def wait():
+        # The result must be received before joining because the process
+        # cannot exit while the result is not completely sent.
+        try:
+            feedback.append(in_.recv())
+        except EOFError:
+            pass
+        proc.join()
+        done.set()
+
+    t = Thread(target = wait, name = "co_process")
+    t.daemon = True
+    t.start()
+
+    yield done
+    t.join()
 
     if proc.exitcode:
         raise RuntimeError(
@@ -39,7 +65,7 @@ the call.
             )
         )
 
-    kind, payload = in_.recv()
+    kind, payload = feedback[0]
     if kind == 0: # normal return
         raise CoReturn(payload)
     else: # 1 the function failed
@@ -50,6 +76,8 @@ def caller(feedback, function, a, kw):
     try:
         ret = function(*a, **kw)
     except:
-        feedback.send((1, exc_info()))
+        # Traceback cannot be pickled. So, it's formatted.
+        t, v, tb = exc_info()
+        feedback.send((1, (t, v, "".join(format_exception(t, v, tb)))))
     else:
         feedback.send((0, ret))
@@ -6,7 +6,8 @@ __all__ = [
 ]
 
 from .co_dispatcher import (
-    CoTask
+    CoEvent,
+    CoTask,
 )
 from .ml import (
     mlget as _
@@ -36,6 +37,7 @@ class SignalDispatcherTask(CoTask):
             description = _("Signal Dispatcher")
         )
         self.queue = []
+        self._emitted = CoEvent()
 
     def new_signal(self, *a, **kw):
         "Create a new signal and attach it to self."
@@ -47,7 +49,8 @@ class SignalDispatcherTask(CoTask):
             queue = self.queue
 
             if not queue:
-                yield False
+                yield self._emitted
+                self._emitted.clear()
                 continue
 
             # Prevent queue feeding during dispatching.
@@ -80,6 +83,7 @@ class SignalDispatcherTask(CoTask):
             return
 
         self.queue.append((list(listeners), args, kw))
+        self._emitted.set()
 
 
 class CoSignal(object):
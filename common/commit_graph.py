@@ -0,0 +1,326 @@
+__all__ = [
+    "CommitGraph"
+  , "CommitGraphNodes"
+  , "CommitNode"
+  , "iter_rev_list"
+]
+
+from .co_dispatcher import (
+    CoReturn,
+)
+from .lazy import (
+    lazy,
+    reset_lazy,
+)
+from .section_file import (
+    dump_sections,
+    SectionFile,
+)
+
+from array import (
+    array,
+)
+from binascii import (
+    hexlify,
+    unhexlify,
+)
+from six.moves import (
+    range,
+)
+from six.moves.collections_abc import (
+    Mapping,
+)
+from subprocess import (
+    PIPE,
+    Popen,
+)
+from time import (
+    time,
+)
+
+
+# Iterations Between Yields of Commit Graph Updating task
+CGU_IBY = 1000
+
+# Commit Graph file format identifier. Change it if the format is changed.
+CG_MAGIC = b"QDT_CG\x00\x01"
+
+# Integer type for arrays of commit indices.
+IDX = "i"
+
+
+def iter_rev_list(repo, args, stdin_revs = tuple()):
+    """ Runs "git rev-list --parents" and yields lists of SHA1 (`str`) per
+commit, the commit first, then its parents.
+
+:param args: other "git rev-list" arguments
+:param stdin_revs: revisions given through standard input, see "--stdin"
+    """
+
+    cmd = ["git", "--git-dir", repo.git_dir, "rev-list", "--parents"]
+    cmd.extend(args)
+    if stdin_revs:
+        cmd.append("--stdin")
+
+    proc = Popen(cmd, stdin = PIPE, stdout = PIPE)
+
+    # "rev-list" reads all revisions before output.
+    proc.stdin.write("".join(r + "\n" for r in stdin_revs).encode("ascii"))
+    proc.stdin.close()
+
+    for line in proc.stdout:
+        yield line.decode("ascii").split()
+
+    proc.stdout.close()
+    if proc.wait():
+        raise RuntimeError("git rev-list exited with code %d" % (
+            proc.returncode
+        ))
+
+
+def _to_bytes(a):
+    try:
+        return a.tobytes()
+    except AttributeError: # Py2
+        return a.tostring()
+
+
+def _from_bytes(data):
+    a = array(IDX)
+    try:
+        a.frombytes(data)
+    except AttributeError: # Py2
+        a.fromstring(data)
+    return a
+
+
+class CommitGraph(object):
+    """ Compact Git commit graph. Commits are identified by indices. Parents
+always have lesser indices than children (topological order).
+
+Edges are stored in CSR form: parents of commit `i` are
+`parent_indices[parent_offsets[i]:parent_offsets[i + 1]]`.
+
+Generation number of a commit without parents is 1. Other commit has
+generation number greater by one than maximum generation number of its
+parents.
+    """
+
+    def __init__(self):
+        self.shas = []
+        self.sha2idx = {}
+        self.parent_offsets = array(IDX, [0])
+        self.parent_indices = array(IDX)
+        self.generations = array(IDX)
+
+    def __len__(self):
+        return len(self.shas)
+
+    def parents(self, idx):
+        offsets = self.parent_offsets
+        return self.parent_indices[offsets[idx]:offsets[idx + 1]]
+
+    @lazy
+    def child_offsets(self):
+        # Counting sort of edges by parent.
+        offsets = array(IDX, [0]) * (len(self) + 1)
+        for p in self.parent_indices:
+            offsets[p + 1] += 1
+        for i in range(len(self)):
+            offsets[i + 1] += offsets[i]
+        return offsets
+
+    @lazy
+    def child_indices(self):
+        pos = array(IDX, self.child_offsets)
+        indices = array(IDX, [0]) * len(self.parent_indices)
+        parent_offsets = self.parent_offsets
+        parent_indices = self.parent_indices
+        for c in range(len(self)):
+            for e in range(parent_offsets[c], parent_offsets[c + 1]):
+                p = parent_indices[e]
+                indices[pos[p]] = c
+                pos[p] += 1
+        return indices
+
+    def children(self, idx):
+        offsets = self.child_offsets
+        return self.child_indices[offsets[idx]:offsets[idx + 1]]
+
+    def iter_tips(self):
+        "Yields indices of commits without children."
+        offsets = self.child_offsets
+        for i in range(len(self)):
+            if offsets[i] == offsets[i + 1]:
+                yield i
+
+    def is_ancestor(self, ancestor, idx):
+        "Is commit `ancestor` reachable from commit `idx` (both indices)?"
+        if ancestor == idx:
+            return True
+
+        generations = self.generations
+        limit = generations[ancestor]
+        visited = set([idx])
+        stack = [idx]
+        while stack:
+            for p in self.parents(stack.pop()):
+                if p == ancestor:
+                    return True
+                # Generation number of an ancestor is always lesser.
+                if p in visited or generations[p] <= limit:
+                    continue
+                visited.add(p)
+                stack.append(p)
+        return False
+
+    def append(self, sha, parent_shas):
+        sha2idx = self.sha2idx
+        parents = list(sha2idx[p] for p in parent_shas)
+
+        idx = len(self.shas)
+        self.shas.append(sha)
+        sha2idx[sha] = idx
+
+        generations = self.generations
+        self.generations.append(
+            max(generations[p] for p in parents) + 1 if parents else 1
+        )
+
+        self.parent_indices.extend(parents)
+        self.parent_offsets.append(len(self.parent_indices))
+
+        return idx
+
+    def co_update(self, repo):
+        """ Appends commits of `repo` which are not in the graph yet.
+
+:returns: (`CoReturn`) amount of new commits
+        """
+
+        t0 = time()
+
+        # Known commits are excluded by their descendants.
+        # Note that "--not" does not affect "--stdin" revisions.
+        excluded = list("^" + self.shas[i] for i in self.iter_tips())
+        total = len(self)
+
+        i2y = CGU_IBY
+        for shas in iter_rev_list(repo,
+            ["--all", "--topo-order", "--reverse"],
+            stdin_revs = excluded
+        ):
+            self.append(shas[0], shas[1:])
+
+            if i2y == 0:
+                yield True
+                i2y = CGU_IBY
+            else:
+                i2y -= 1
+
+        new_commits = len(self) - total
+        if new_commits:
+            reset_lazy(self)
+
+        t1 = time()
+        print("CommitGraph.co_update work time " + str(t1 - t0))
+
+        raise CoReturn(new_commits)
+
+    @lazy
+    def nodes(self):
+        "`CommitGraphNodes` of the graph."
+        return CommitGraphNodes(self)
+
+    def save(self, path):
+        data = dump_sections(CG_MAGIC, [
+            ("shas", unhexlify("".join(self.shas))),
+            ("parent_offsets", _to_bytes(self.parent_offsets)),
+            ("parent_indices", _to_bytes(self.parent_indices)),
+            ("generations", _to_bytes(self.generations)),
+        ])
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @classmethod
+    def load(klass, path):
+        sections = SectionFile(path, CG_MAGIC)
+
+        g = klass()
+
+        shas = hexlify(sections["shas"]).decode("ascii")
+        g.shas = list(shas[i:i + 40] for i in range(0, len(shas), 40))
+        g.sha2idx = dict((sha, i) for i, sha in enumerate(g.shas))
+        g.parent_offsets = _from_bytes(sections["parent_offsets"])
+        g.parent_indices = _from_bytes(sections["parent_indices"])
+        g.generations = _from_bytes(sections["generations"])
+
+        return g
+
+
+class CommitNode(object):
+    """ Read only `CommitDesc` compatible view of a commit in `CommitGraph`.
+`num` is commit index in the graph.
+    """
+
+    __slots__ = ("graph", "num")
+
+    def __init__(self, graph, num):
+        self.graph = graph
+        self.num = num
+
+    @property
+    def sha(self):
+        return self.graph.shas[self.num]
+
+    @property
+    def parents(self):
+        graph = self.graph
+        return list(CommitNode(graph, i) for i in graph.parents(self.num))
+
+    @property
+    def children(self):
+        graph = self.graph
+        return list(CommitNode(graph, i) for i in graph.children(self.num))
+
+    def __eq__(self, other):
+        return (isinstance(other, CommitNode)
+            and self.graph is other.graph
+            and self.num == other.num
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.num
+
+    def __repr__(self):
+        return "CommitNode(%s, %d)" % (self.sha, self.num)
+
+
+class CommitGraphNodes(Mapping):
+    """ SHA1 -> `CommitNode` mapping over `CommitGraph`. It can be used
+instead of `commit_desc_nodes` filled by `CommitDesc.co_build_git_graph`.
+Nodes are created on demand. So, memory consumption is determined by the
+`graph`.
+
+Note that custom per commit data cannot be attached to a `CommitNode`.
+Lists indexed by `num` should be used instead.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, sha):
+        return CommitNode(self.graph, self.graph.sha2idx[sha])
+
+    def __contains__(self, sha):
+        return sha in self.graph.sha2idx
+
+    def __iter__(self):
+        return iter(self.graph.shas)
+
+    def __len__(self):
+        return len(self.graph)
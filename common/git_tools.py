@@ -4,6 +4,7 @@ __all__ = [
   , "iter_chunks"
   , "git_diff2delta_intervals"
   , "fast_repo_clone"
+  , "git_export_tree"
   , "git_find_commit"
   , "init_submodules_from_cache"
   , "repo_path_in_tree"
@@ -16,11 +17,18 @@ from collections import (
 from re import (
     compile
 )
+from .commit_graph import (
+    iter_rev_list
+)
 from .intervalmap import (
     intervalmap
 )
+from tarfile import (
+    open as tar_open
+)
 from tempfile import (
-    mkdtemp
+    mkdtemp,
+    TemporaryFile
 )
 from os.path import (
     sep,
@@ -126,92 +134,52 @@ class CommitDesc(object):
 
     @classmethod
     def co_build_git_graph(klass, repo, commit_desc_nodes):
-        repo_commit = repo.commit
+        """ Adds all commits of `repo` to `commit_desc_nodes` (SHA1 -> `klass`
+instance) those are not there yet. Commits are numbered in topological order
+continuing numbering of existing ones.
+
+History is streamed by one "git rev-list" in reversed topological order. So,
+parents of a commit are always added before it and numbering requires no
+additional lookups.
+
+Note that a compact alternative is `CommitGraph` with its `nodes`.
+        """
 
         t0 = time()
         # iterations to yield
         i2y = GGB_IBY
 
+        # Known commits are excluded by their descendants.
+        # Note that "--not" does not affect "--stdin" revisions.
+        excluded = []
+        last_num = -1
+        for sha, cd in commit_desc_nodes.items():
+            if not cd.children:
+                excluded.append("^" + sha)
+            if cd.num is not None and last_num < cd.num:
+                last_num = cd.num
+
         # enumeration according to the topology sorting
-        n = count(0)
-        # to_enum is used during the enumeration
-        # it contains commit to enumerate
-        to_enum = None
-        # build_stack contains edges represented by tuples
-        # (parent, child), where parent is instance of
-        # git.Commit, child is instance of `klass` (e.g., QemuCommitDesc)
-        build_stack = []
-        for head in repo.references:
-            head_commit = head.commit
-            head_commit_hexsha = head_commit.hexsha
-            # skip processed heads
-            if head_commit_hexsha in commit_desc_nodes:
-                continue
-
-            head_desc = klass(head_commit_hexsha, [], [])
-            commit_desc_nodes[head_commit_hexsha] = head_desc
-            # add edges connected to head being processed
-            for p in head_commit.parents:
-                build_stack.append((p, head_desc))
-
-            while build_stack:
-                parent, child_commit_desc = build_stack.pop()
-                parent_hexsha = parent.hexsha
-
-                parent_desc = commit_desc_nodes.get(parent_hexsha, None)
-
-                if parent_desc is None:
-                    parent_desc = klass(parent_hexsha, [], [child_commit_desc])
-                    commit_desc_nodes[parent_hexsha] = parent_desc
-
-                    if parent.parents:
-                        for p in parent.parents:
-                            build_stack.append((p, parent_desc))
-                    else:
-                        # current edge parent is an elder commit in the tree,
-                        # that is why we should enumerate starting from it
-                        to_enum = parent_desc
-                else:
-                    # the existence of parent_desc means that parent has been
-                    # enumerated before. Hence, we starts enumeration from
-                    # it's child
-                    to_enum = child_commit_desc
-                    parent_desc.children.append(child_commit_desc)
-
-                child_commit_desc.parents.append(parent_desc)
-
-                if i2y <= 0:
-                    yield True
-                    i2y = GGB_IBY
-                else:
-                    i2y -= 1
-
-                # numbering is performed from the 'to_enum' to either a leaf
-                # commit or a commit just before a merge which have at least
-                # one parent without number (except the commit)
-                while to_enum is not None:
-                    e = to_enum
-                    to_enum = None
-                    # if the number of parents in the commit_desc_nodes
-                    # is equal to the number of parents in the repo,
-                    # then all parents were numbered (added) earlier
-                    # according to the graph building algorithm,
-                    # else we cannot assign number to the commit yet
-                    if len(e.parents) == len(repo_commit(e.sha).parents):
-                        e.num = next(n)
-                        # according to the algorithm, only one child
-                        # have no number. Other children either have
-                        # been enumerated already or are not added yet
-                        for c in e.children:
-                            if c.num is None:
-                                to_enum = c
-                                break
-
-                    if i2y <= 0:
-                        yield True
-                        i2y = GGB_IBY
-                    else:
-                        i2y -= 1
+        n = count(last_num + 1)
+
+        for shas in iter_rev_list(repo,
+            ["--all", "--topo-order", "--reverse"],
+            stdin_revs = excluded
+        ):
+            sha = shas[0]
+
+            cd = klass(sha, [], [])
+            cd.num = next(n)
+            commit_desc_nodes[sha] = cd
+
+            for parent_sha in shas[1:]:
+                commit_desc_nodes[parent_sha].add_child(cd)
+
+            if i2y <= 0:
+                yield True
+                i2y = GGB_IBY
+            else:
+                i2y -= 1
 
         t1 = time()
         print("co_build_git_graph work time " + str(t1 - t0))
@@ -251,6 +219,25 @@ as fast as possible. A clone is neither honest nor independent, so be careful.
     return new_repo
 
 
+def git_export_tree(repo, version, paths, prefix = "repo"):
+    """ Writes files of `version` at given `paths` (relative to repository
+root) to a temporary directory. It's much faster than `fast_repo_clone` but
+result is not a repository.
+
+:returns: the directory
+    """
+    tmp_dir = mkdtemp(prefix = "%s-%s-" % (prefix, version))
+
+    with TemporaryFile() as archive:
+        repo.archive(archive, version, path = list(paths))
+        archive.seek(0)
+
+        with tar_open(fileobj = archive) as tar:
+            tar.extractall(tmp_dir)
+
+    return tmp_dir
+
+
 def iter_submodules_caches(repo):
     modules = join(repo.git_dir, "modules")
     yield modules
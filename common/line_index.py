@@ -55,7 +55,7 @@ Lines enumeration starts from 0.
         read = stream.read
         seek = stream.seek
 
-        prev_line_offset = 0
+        prev_line_offset = offset
 
         while True:
             # support shared access to the stream between `yield`s
@@ -154,6 +154,27 @@ Lines enumeration starts from 0.
             offset = self.index[i - 1]
         return (lineidx, offset)
 
+    def iter_offsets(self, stream, lineidxs):
+        """ Yields offsets of lines with given indexes. The indexes must be
+sorted ascending without duplicates.
+        """
+        # index of the line whose offset `oter` yields next
+        cur = None
+
+        for lineidx in lineidxs:
+            start, offset = self.lookup(lineidx)
+            # Jump only if the line is farther than next chunk start.
+            if cur is None or start > cur:
+                oter = self.iter_line_offsets(stream, offset = offset)
+                cur = start
+
+            while cur < lineidx:
+                next(oter)
+                cur += 1
+
+            yield next(oter)
+            cur += 1
+
     def iter_chunks(self, stream, lineidx = 0):
         lineidx, offset = self.lookup(lineidx)
 
@@ -0,0 +1,47 @@
+__all__ = [
+    "LRUCache"
+]
+
+from collections import (
+    OrderedDict,
+)
+
+
+class LRUCache(object):
+    "A mapping of limited `size`. Least recently used items are evicted."
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+
+    def get(self, key, default = None):
+        items = self._items
+        try:
+            value = items.pop(key)
+        except KeyError:
+            return default
+        # most recently used items are at end
+        items[key] = value
+        return value
+
+    def __getitem__(self, key):
+        items = self._items
+        value = items.pop(key)
+        items[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        items = self._items
+        items.pop(key, None)
+        items[key] = value
+        if len(items) > self.size:
+            items.popitem(last = False)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
@@ -1,11 +1,29 @@
+from .extra_math import (
+    sign
+)
 from math import (
+    floor,
     sqrt
 )
+from random import (
+    random
+)
+
+# Minimal cell size of broad phase of collision detection.
+PH_MIN_CELL = 16
 
 __all__ = [
     "PhObject"
       , "PhBox"
       , "PhCircle"
+  , "SpatialHash"
+  , "box_reaction"
+  , "box_circle_reaction"
+  , "circle_reaction"
+  , "box_vline_reaction"
+  , "box_hline_reaction"
+  , "integrate_velocities"
+  , "PhDiagram"
   , "find_empty_aabb"
 ]
 
@@ -31,6 +49,11 @@ class PhObject(object):
         x, y, = self.x, self.y
         return x, y, x + self.width, y + self.height
 
+    def spaced_aabb(self):
+        "AABB extended by the spacing, it's used by collision detection."
+        x, y, s = self.x, self.y, self.spacing
+        return x - s, y - s, x + self.width + s, y + self.height + s
+
 
 class PhBox(PhObject):
     """ Axis aligned box or vertical line (width == 0) or horizontal line
@@ -96,6 +119,11 @@ class PhBox(PhObject):
 
 class PhCircle(PhObject):
     """ Circle. Size is given as radius (r). """
+
+    # A light circle (e.g. a point of a line path) does not push boxes and
+    # not light circles.
+    light = False
+
     def __init__(self, r = 10, **kw):
         PhObject.__init__(self, **kw)
         self.r = r
@@ -134,6 +162,396 @@ class PhCircle(PhObject):
         return True
 
 
+def box_reaction(n, n1):
+    """ Returns reaction vector of box `n` caused by overlapping box `n1`.
+Reaction of `n1` is the opposite vector.
+    """
+
+    w2 = n.width / 2
+    h2 = n.height / 2
+
+    w12 = n1.width / 2
+    h12 = n1.height / 2
+
+    # distance vector from n center to n1 center
+    dx = n1.x + w12 - (n.x + w2)
+
+    while dx == 0:
+        dx = sign(random() - 0.5)
+
+    dy = n1.y + h12 - (n.y + h2)
+
+    while dy == 0:
+        dy = sign(random() - 0.5)
+
+    w = n.width + 2 * n.spacing
+    w1 = n1.width + 2 * n1.spacing
+
+    h = n.height + 2 * n.spacing
+    h1 = n1.height + 2 * n1.spacing
+
+    xscale = float(w) / (w + w1)
+    yscale = float(h) / (h + h1)
+
+    # intrusion point, inside box physical border (including spacing)
+    # The intrusion point is shifted from interval's middle point to the
+    # smallest box center.
+    ix = dx * xscale
+    iy = dy * yscale
+
+    # collision point, at box physical border
+    if abs(iy) > abs(ix):
+        cy = (h2 + n.spacing) * sign(iy)
+        cx = ix * cy / iy
+    else:
+        cx = (w2 + n.spacing) * sign(ix)
+        cy = iy * cx / ix
+
+    # reaction vector, the direction is from intrusion point to collision
+    # point
+    return ix - cx, iy - cy
+
+
+def box_circle_reaction(n, c):
+    """ Returns reaction vector of box `n` caused by overlapping circle `c`.
+Reaction of `c` is the opposite vector.
+    """
+
+    w2 = n.width / 2
+    h2 = n.height / 2
+
+    # distance vector from n center to c center
+    dx = c.x + c.r - (n.x + w2)
+
+    while dx == 0:
+        dx = sign(random() - 0.5)
+
+    dy = c.y + c.r - (n.y + h2)
+
+    while dy == 0:
+        dy = sign(random() - 0.5)
+
+    w = n.width + 2 * n.spacing
+    h = n.height + 2 * n.spacing
+    d = (c.r + c.spacing) * 2
+
+    xscale = float(w) / (w + d)
+    yscale = float(h) / (h + d)
+
+    ix = dx * xscale
+    iy = dy * yscale
+
+    # collision point, at box physical border
+    if abs(iy) > abs(ix):
+        cy = (h2 + n.spacing) * sign(iy)
+        cx = ix * cy / iy
+    else:
+        cx = (w2 + n.spacing) * sign(ix)
+        cy = iy * cx / ix
+
+    return ix - cx, iy - cy
+
+
+def circle_reaction(c, c1):
+    """ Returns reaction vector of circle `c` caused by overlapping circle
+`c1`. Reaction of `c1` is the opposite vector.
+    """
+
+    dx = c1.x + c1.r - (c.x + c.r)
+
+    while dx == 0:
+        dx = sign(random() - 0.5)
+
+    dy = c1.y + c1.r - (c.y + c.r)
+
+    while dy == 0:
+        dy = sign(random() - 0.5)
+
+    scale = float(c.r) / (c.r + c1.r)
+
+    ix = dx * scale
+    iy = dy * scale
+
+    ir = sqrt(ix * ix + iy * iy)
+    k = (c.r + c.spacing) / ir
+
+    cx = ix * k
+    cy = iy * k
+
+    return ix - cx, iy - cy
+
+
+def _aabbs_overlap(a, b):
+    # Touching AABBs overlap.
+    return not (a[0] > b[2] or b[0] > a[2] or a[1] > b[3] or b[1] > a[3])
+
+
+class SpatialHash(object):
+    """ Uniform grid broad phase of collision detection. An object is put in
+all cells its AABB overlaps. So, only objects sharing a cell are compared.
+
+:param cell: size of a cell, should be comparable with typical object size
+
+    """
+
+    def __init__(self, cell = 64):
+        self.cell = float(cell)
+        # (column, row) -> list of object indexes
+        self.cells = {}
+        self.objects = []
+        self.aabbs = []
+        # column and row of the top left cell of the object
+        self.origins = []
+
+    def _span(self, aabb):
+        cell = self.cell
+        return (
+            int(floor(aabb[0] / cell)),
+            int(floor(aabb[1] / cell)),
+            int(floor(aabb[2] / cell)),
+            int(floor(aabb[3] / cell)),
+        )
+
+    def add(self, obj, aabb = None):
+        "`aabb` defaults to `spaced_aabb` of the `obj`."
+
+        if aabb is None:
+            aabb = obj.spaced_aabb()
+
+        idx = len(self.objects)
+        self.objects.append(obj)
+        self.aabbs.append(aabb)
+
+        c0, r0, c1, r1 = self._span(aabb)
+        self.origins.append((c0, r0))
+
+        cells = self.cells
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                cells.setdefault((c, r), []).append(idx)
+
+    def extend(self, objs):
+        add = self.add
+        for o in objs:
+            add(o)
+
+    def iter_pairs(self):
+        """ Yields pairs of objects with overlapping AABBs. Each pair is
+yielded once, the object added first goes first.
+        """
+
+        objects, aabbs, origins = self.objects, self.aabbs, self.origins
+
+        for key, idxs in self.cells.items():
+            for a, i in enumerate(idxs):
+                ai = aabbs[i]
+                oi = origins[i]
+                for j in idxs[a + 1:]:
+                    # The pair shares several cells. It's only checked in the
+                    # cell containing top left corner of AABBs intersection.
+                    oj = origins[j]
+                    if (max(oi[0], oj[0]), max(oi[1], oj[1])) != key:
+                        continue
+                    if _aabbs_overlap(ai, aabbs[j]):
+                        yield objects[i], objects[j]
+
+    def query(self, aabb):
+        "Returns objects overlapping the `aabb` in order of adding."
+
+        cells = self.cells
+        aabbs = self.aabbs
+        c0, r0, c1, r1 = self._span(aabb)
+
+        found = set()
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                for i in cells.get((c, r), ()):
+                    if i not in found and _aabbs_overlap(aabb, aabbs[i]):
+                        found.add(i)
+
+        objects = self.objects
+        return list(objects[i] for i in sorted(found))
+
+
+def integrate_velocities(objs, limit):
+    "Limits velocities of `objs` by `limit` (per axis) and moves them."
+
+    for n in objs:
+        vx, vy = n.vx, n.vy
+
+        if abs(vx) > limit:
+            vx = sign(vx) * limit
+            n.vx = vx
+        if abs(vy) > limit:
+            vy = sign(vy) * limit
+            n.vy = vy
+
+        n.x += vx
+        n.y += vy
+
+
+def box_vline_reaction(n, l):
+    """ Returns reaction of box `n` along X axis caused by vertical line `l`
+touching it.
+    """
+
+    w2 = n.width / 2
+    dx = l.x - (n.x + w2)
+
+    while dx == 0:
+        dx = sign(random() - 0.5)
+
+    return dx - sign(dx) * (w2 + n.spacing)
+
+
+def box_hline_reaction(n, l):
+    """ Returns reaction of box `n` along Y axis caused by horizontal line `l`
+touching it.
+    """
+
+    h2 = n.height / 2
+    dy = l.y - (n.y + h2)
+
+    while dy == 0:
+        dy = sign(random() - 0.5)
+
+    return dy - sign(dy) * (h2 + n.spacing)
+
+
+class PhDiagram(object):
+    """ Physical model of a diagram with buses. It's a mixin for a class with
+following attributes:
+
+- `nodes` and `buslabels`: lists of `PhBox`es
+- `buses`: list of vertical lines, `PhBox`es with `buslabel` attribute
+- `conns`: list of horizontal lines from a box (`dev_node` attribute) to a
+    bus, a box refers to its line by `conn` attribute (may be `None`)
+- `circles`: list of `PhCircle`s
+- `velocity_k`, `bus_velocity_k` and `velocity_limit` coefficients
+
+    """
+
+    def ph_bus_parent(self, bus):
+        "Returns the box `bus` belongs to (excluding bus label) or `None`."
+        return None
+
+    def ph_broad_phase(self):
+        """ Returns spatial hashes of boxes, buses, connections and circles.
+They are actual until positions are changed.
+        """
+
+        nbl = self.nodes + self.buslabels
+
+        if nbl:
+            cell = sum(max(n.width, n.height) + 2 * n.spacing for n in nbl)
+            cell = max(PH_MIN_CELL, float(cell) / len(nbl))
+        else:
+            cell = PH_MIN_CELL
+
+        nbl_hash = SpatialHash(cell)
+        nbl_hash.extend(nbl)
+
+        buses_hash = SpatialHash(cell)
+        for b in self.buses:
+            buses_hash.add(b, (b.x, b.y, b.x, b.y + b.height))
+
+        conns_hash = SpatialHash(cell)
+        for c in self.conns:
+            conns_hash.add(c, (c.x, c.y, c.x + c.width, c.y))
+
+        circles_hash = SpatialHash(cell)
+        circles_hash.extend(self.circles)
+
+        return nbl_hash, buses_hash, conns_hash, circles_hash
+
+    def ph_co_reactions(self):
+        """ Adds reactions of interacting objects to their velocities. Positions
+are not changed. It's a generator yielding between phases.
+        """
+
+        velocity_k = self.velocity_k
+        bus_velocity_k = self.bus_velocity_k
+        bus_parent = self.ph_bus_parent
+
+        nbl_hash, buses_hash, conns_hash, circles_hash = self.ph_broad_phase()
+
+        yield
+
+        for n, n1 in nbl_hash.iter_pairs():
+            if not n.overlaps_box(n1):
+                continue
+
+            rx, ry = box_reaction(n, n1)
+
+            n.vx += rx * velocity_k
+            n.vy += ry * velocity_k
+            n1.vx -= rx * velocity_k
+            n1.vy -= ry * velocity_k
+
+        yield
+
+        for n in self.nodes + self.buslabels:
+            n_aabb = n.spaced_aabb()
+
+            for b in buses_hash.query(n_aabb):
+                if n is b.buslabel or not n.touches_vline(b):
+                    continue
+
+                parent_node = bus_parent(b)
+                if parent_node is n:
+                    continue
+
+                ix = box_vline_reaction(n, b)
+
+                n.vx += ix * bus_velocity_k
+
+                if parent_node is not None:
+                    parent_node.vx -= ix * velocity_k
+
+            yield
+
+            for c in conns_hash.query(n_aabb):
+                if n.conn is c or not n.touches_hline(c):
+                    continue
+
+                iy = box_hline_reaction(n, c)
+
+                n.vy += iy * bus_velocity_k
+                c.dev_node.vy -= iy * bus_velocity_k
+
+            yield
+
+            for c in circles_hash.query(n_aabb):
+                if not c.overlaps_box(n):
+                    continue
+
+                rx, ry = box_circle_reaction(n, c)
+
+                if not c.light:
+                    n.vx += rx * velocity_k
+                    n.vy += ry * velocity_k
+
+                c.vx -= rx * velocity_k
+                c.vy -= ry * velocity_k
+
+            yield
+
+        for c, c1 in circles_hash.iter_pairs():
+            if not c.overlaps_circle(c1):
+                continue
+
+            rx, ry = circle_reaction(c, c1)
+
+            if c.light or not c1.light:
+                c.vx += rx * velocity_k
+                c.vy += ry * velocity_k
+            if c1.light or not c.light:
+                c1.vx -= rx * velocity_k
+                c1.vy -= ry * velocity_k
+
+        yield
+
+
 def find_empty_aabb(objs, minw = 1, minh = 1):
     """
     :returns: empty space bounds (left, top, right, bottom) where `None` means
@@ -0,0 +1,60 @@
+__all__ = [
+    "QMPClient"
+]
+
+from json import (
+    dumps,
+    loads,
+)
+from socket import (
+    create_connection,
+)
+
+
+class QMPClient(object):
+    """ QEMU Machine Protocol client over TCP.
+See: https://wiki.qemu.org/Documentation/QMP
+
+Unlike `pyrsp.utils.QMP`, it has socket timeout and connection closing API.
+Asynchronous events are skipped while waiting for a response.
+
+:param timeout:
+    of socket operations in seconds, `None` means blocking mode
+
+    """
+
+    def __init__(self, port, host = "localhost", timeout = None):
+        self._sock = sock = create_connection((host, port), timeout)
+        self._file = sock.makefile("rb")
+
+        # QEMU greeting
+        self.qmp_info = self._receive()
+        # Mandatory request for capabilities
+        self.qmp_caps = self("qmp_capabilities")["return"]
+
+    def settimeout(self, timeout):
+        self._sock.settimeout(timeout)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def _receive(self):
+        line = self._file.readline()
+        if not line:
+            raise EOFError("QMP connection is closed")
+        return loads(line.decode("utf-8"))
+
+    def __call__(self, command, **arguments):
+        request = dict(execute = command)
+        if arguments:
+            request["arguments"] = arguments
+
+        self._sock.sendall(dumps(request).encode("utf-8") + b"\r\n")
+
+        while True:
+            response = self._receive()
+            if "error" in response:
+                raise RuntimeError("QMP Error: " + str(response))
+            if "return" in response:
+                return response
@@ -0,0 +1,113 @@
+__all__ = [
+    "BadSectionFile"
+  , "RawSection"
+  , "SectionFile"
+  , "dump_sections"
+]
+
+from os import (
+    SEEK_END,
+)
+from six.moves.cPickle import (
+    dumps,
+    loads,
+)
+from struct import (
+    Struct,
+)
+
+
+# Highest protocol supported by both Py2 & Py3.
+PICKLE_PROTOCOL = 2
+
+# Offset of sections index, the last field of a file.
+_index_offset = Struct("<Q")
+
+
+class BadSectionFile(ValueError):
+    pass
+
+
+class RawSection(object):
+    "Already serialized section. It's written as is by `dump_sections`."
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def dump_sections(magic, sections):
+    """ Serializes `sections` (an iterable of name & value pairs) to `bytes`.
+
+Layout: `magic`, pickled values, pickled index (a `dict` mapping names to
+offsets and sizes of values) and offset of the index.
+    """
+
+    chunks = [magic]
+    offset = len(magic)
+    index = {}
+
+    for name, value in sections:
+        if isinstance(value, RawSection):
+            data = value.data
+        else:
+            data = dumps(value, PICKLE_PROTOCOL)
+
+        index[name] = (offset, len(data))
+        chunks.append(data)
+        offset += len(data)
+
+    chunks.append(dumps(index, PICKLE_PROTOCOL))
+    chunks.append(_index_offset.pack(offset))
+
+    return b"".join(chunks)
+
+
+class SectionFile(object):
+    """ Read only access to a file written with `dump_sections`. A section is
+read & deserialized only when requested.
+    """
+
+    def __init__(self, path, magic):
+        self.path = path
+
+        with open(path, "rb") as f:
+            if f.read(len(magic)) != magic:
+                raise BadSectionFile("Bad magic of " + path)
+
+            try:
+                f.seek(-_index_offset.size, SEEK_END)
+            except (IOError, OSError):
+                raise BadSectionFile("Truncated file " + path)
+
+            index_end = f.tell()
+            offset = _index_offset.unpack(f.read(_index_offset.size))[0]
+
+            if not len(magic) <= offset <= index_end:
+                raise BadSectionFile("Bad index offset in " + path)
+
+            f.seek(offset)
+            self.index = loads(f.read(index_end - offset))
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def read_raw(self, name):
+        offset, size = self.index[name]
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+
+        if len(data) != size:
+            raise BadSectionFile("Truncated section %s in %s" % (
+                name, self.path
+            ))
+        return data
+
+    def __getitem__(self, name):
+        return loads(self.read_raw(name))
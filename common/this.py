@@ -0,0 +1,58 @@
+from .add_line import *
+from .bidict import *
+from .byN import *
+from .class_tools import *
+from .cleaner import *
+from .co_dispatcher import *
+from .co_pipeline import *
+from .co_pool import *
+from .co_process import *
+from .co_signal import *
+from .code_writer import *
+from .commit_graph import *
+from .compat import *
+from .eps import *
+from .extensible import *
+from .extra_math import *
+from .filefilter import *
+from .formated_string_var import *
+from .func import *
+from .gen_file_name import *
+from .git_measurer import *
+from .git_tools import *
+from .import_tools import *
+from .intervalmap import *
+from .inverse_operation import *
+from .lazy import *
+from .legacy import *
+from .line_index import *
+from .line_no_stream import *
+from .lru_cache import *
+from .mechanics import *
+from .ml import *
+from .notifier import *
+from .offsets_stream import *
+from .ordered_set import *
+from .os_wrappers import *
+from .persistent import *
+from .ply_tools import *
+from .port_pool import *
+from .pygen import *
+from .pypath import *
+from .qmp import *
+from .qrepo import *
+from .reflection import *
+from .same import *
+from .search_helper import *
+from .section_file import *
+from .shadow_open import *
+from .soft_stream import *
+from .stdlog import *
+from .thread_stream_copier import *
+from .topology import *
+from .trie import *
+from .user_settings import *
+from .variable import *
+from .version import *
+from .visitor import *
+from .workers import *
\ No newline at end of file
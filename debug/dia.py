@@ -18,6 +18,11 @@ from elftools.dwarf.callframe import (
 from .dwarf_expr_builder import (
     DWARFExprBuilder
 )
+from .dwarf_index import (
+    IndexedLineEntry,
+    IndexedLineState,
+    line_state_row,
+)
 from .expression import (
     Register,
     Plus
@@ -37,8 +42,14 @@ class DWARFInfoAccelerator(object):
 pyelftools's `DWARFInfo`.
     """
 
-    def __init__(self, di):
+    def __init__(self, di, index = None):
+        """
+    :param index:
+        `DWARFIndex` to get data from and to store computed data to
+
+        """
         self.di = di
+        self.index = index
 
         # accelerates access to compilation units (CU)
         self.idx2cu = []
@@ -54,7 +65,10 @@ pyelftools's `DWARFInfo`.
 
         # CUs are parsed and accounted in mappings by demand. So, the iterator
         # do preserves parse state between demands.
-        self._cu_parser_state = self._cu_parser()
+        if index is None or not index.cus:
+            self._cu_parser_state = self._cu_parser()
+        else:
+            self._cu_parser_state = self._cu_parser(self._account_indexed_CUs())
 
         # Mapping of source positions to line program entries. An entry
         # contains the address and other useful information. There are
@@ -100,7 +114,19 @@ pyelftools's `DWARFInfo`.
     @lazy
     def _cfi_parser_state(self):
         "lazy `addr2fde` mapping building"
-        return self._cfi_parser()
+        index = self.index
+        if index is None:
+            return self._cfi_parser()
+        else:
+            return self._cfi_parser(index.cfi_end)
+
+    @lazy
+    def _indexed_fdes(self):
+        "Mapping of target addresses to offsets of FDEs known by `index`."
+        addr2off = intervalmap()
+        for start, end, offset in self.index.fdes:
+            addr2off[start:end] = offset
+        return addr2off
 
     @lazy
     def aranges(self):
@@ -191,16 +217,25 @@ pyelftools's `DWARFInfo`.
 
         return ret
 
-    def _cfi_parser(self):
+    def _cfi_parser(self, offset = 0):
         cfi = self.cfi
-        offset = 0
         size = cfi.size
         parse = cfi._parse_entry_at
+        index = self.index
 
         while offset < size:
             e = parse(offset)
+            entry_offset, offset = offset, e.instructions_end
+
+            if index is not None:
+                if isinstance(e, CIE):
+                    index.set_cfi_end(offset)
+                else:
+                    start = e.header.initial_location
+                    end = start + e.header.address_range
+                    index.add_fde(start, end, entry_offset, offset)
+
             yield e
-            offset = e.instructions_end
 
     def fde(self, addr):
         """ Frame Description Entry
@@ -214,6 +249,13 @@ pyelftools's `DWARFInfo`.
         addr2fde = self.addr2fde
         fde = addr2fde[addr]
 
+        if fde is None and self.index is not None:
+            offset = self._indexed_fdes[addr]
+            if offset is not None:
+                fde = self.cfi._parse_entry_at(offset)
+                start = fde.header.initial_location
+                addr2fde[start:start + fde.header.address_range] = fde
+
         if fde is None:
             for e in self._cfi_parser_state:
                 if isinstance(e, CIE):
@@ -271,7 +313,23 @@ pyelftools's `DWARFInfo`.
 
         return cache[offset]
 
-    def account_line_program_CU(self, cu):
+    def _line_program_CU(self, cu):
+        """
+    :returns:
+        list of split file paths and list of line program entries
+
+        """
+        index = self.index
+
+        if index is not None:
+            lp = index.line_program(cu.cu_offset)
+            if lp is not None:
+                files, rows = lp
+                entries = list(
+                    IndexedLineEntry(IndexedLineState(*row)) for row in rows
+                )
+                return files, entries
+
         lp = self.di.line_program_for_CU(cu)
 
         entries = lp.get_entries()
@@ -298,6 +356,16 @@ pyelftools's `DWARFInfo`.
             _path = _dir + name
             files.append(_path)
 
+        if index is not None:
+            index.add_line_program(cu.cu_offset, files, list(
+                line_state_row(e.state) for e in entries if e.state
+            ))
+
+        return files, entries
+
+    def account_line_program_CU(self, cu):
+        files, entries = self._line_program_CU(cu)
+
         self.cu_off2files[cu.cu_offset] = files
 
         srcmap = self.srcmap
@@ -368,19 +436,59 @@ pyelftools's `DWARFInfo`.
 #     s.epilogue_begin, s.isa
 #             ))
 
-    def _cu_parser(self):
-        citer = self.di._parse_CUs_iter()
+    def _account_indexed_CUs(self):
+        """ Accounts CUs known by `index` without parsing of their DIEs.
+
+    :returns:
+        offset of next CU
+
+        """
+        parse = self.di._parse_CU_at_offset
         idx2cu = self.idx2cu
 
-        for cu in citer:
+        for offset, rparts in self.index.cus:
+            cu = parse(offset)
+            idx2cu.append(cu)
+            self._account_cu_by_reversed_name(rparts, cu)
+
+        return self._next_CU_offset(cu)
+
+    @staticmethod
+    def _next_CU_offset(cu):
+        # Length field of CU header does not include the length field itself.
+        return (cu.cu_offset + cu["unit_length"]
+            + cu.structs.initial_length_field_size()
+        )
+
+    def _cu_parser(self, offset = 0):
+        di = self.di
+        idx2cu = self.idx2cu
+        index = self.index
+
+        if index is not None and index.cus_complete:
+            return
+
+        info_sec = di.debug_info_sec
+        size = 0 if info_sec is None else info_sec.size
+
+        while offset < size:
+            cu = di._parse_CU_at_offset(offset)
+            offset = self._next_CU_offset(cu)
+
             idx2cu.append(cu)
             name = cu.get_top_DIE().attributes["DW_AT_name"].value
             parts = name.split(bsep)
             rparts = tuple(reversed(parts))
             self._account_cu_by_reversed_name(rparts, cu)
 
+            if index is not None:
+                index.add_cu(cu.cu_offset, rparts)
+
             yield cu, rparts
 
+        if index is not None:
+            index.set_cus_complete()
+
     def _account_cu_by_reversed_name(self, rparts, cu):
         # print("Accounting %s" % str(rparts))
 
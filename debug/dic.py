@@ -26,8 +26,8 @@ from .glob import (
 class DWARFInfoCache(DWARFInfoAccelerator):
     "Extends `DWARFInfoAccelerator` with caching of high level data."
 
-    def __init__(self, di, symtab = None):
-        super(DWARFInfoCache, self).__init__(di)
+    def __init__(self, di, symtab = None, index = None):
+        super(DWARFInfoCache, self).__init__(di, index = index)
 
         self.symtab = symtab
 
@@ -185,7 +185,16 @@ class DWARFInfoCache(DWARFInfoAccelerator):
         sp = a2s[addr]
 
         if sp is None:
-            cu_for_addr = self.cu(addr)
+            cu_for_addr = None
+
+            if self.index is not None:
+                cu_offset = self._indexed_sp_cus[addr]
+                if cu_offset is not None:
+                    cu_for_addr = self.di._parse_CU_at_offset(cu_offset)
+
+            if cu_for_addr is None:
+                cu_for_addr = self.cu(addr)
+
             self.account_subprograms(cu_for_addr)
 
             # `account_subprograms` was filled `addr2subprog` with subprograms
@@ -209,6 +218,11 @@ unit (`cu`). Adds address intervals of subprograms to `addr2subprog` mapping.
         a2s = self.addr2subprog
         cu_sps = []
 
+        index = self.index
+        if index is not None:
+            indexed_sp_cus = self._indexed_sp_cus
+            cu_offset = cu.cu_offset
+
         for die in root.iter_children():
             if die.tag != "DW_TAG_subprogram":
                 continue
@@ -234,14 +248,59 @@ unit (`cu`). Adds address intervals of subprograms to `addr2subprog` mapping.
                 for start, end in ranges:
                     a2s[start:end] = sp
 
+                    if index is not None:
+                        if indexed_sp_cus[start] != cu_offset:
+                            indexed_sp_cus[start:end] = cu_offset
+                            index.add_sp_range(start, end, cu_offset)
+
             cu_sps.append(sp)
 
         return cu_sps
 
+    @lazy
+    def _indexed_sp_cus(self):
+        "Mapping of target addresses to offsets of CUs known by `index`."
+        addr2off = intervalmap()
+        for start, end, cu_offset in self.index.sp_ranges:
+            addr2off[start:end] = cu_offset
+        return addr2off
+
+    def _name_table(self, name, getter):
+        index = self.index
+        if index is None:
+            return getter()
+
+        tables = index.name_tables
+        if name in tables:
+            table = tables[name]
+        else:
+            lut = getter()
+            if lut is None:
+                table = None
+            else:
+                table = dict((n, tuple(e)) for n, e in lut.items())
+            index.set_name_table(name, table)
+
+        if table is None:
+            return None
+        return NameTable(table)
+
     @lazy
     def pubnames(self):
-        return self.di.get_pubnames()
+        return self._name_table("pubnames", self.di.get_pubnames)
 
     @lazy
     def pubtypes(self):
-        return self.di.get_pubtypes()
+        return self._name_table("pubtypes", self.di.get_pubtypes)
+
+    def save_index(self):
+        "Saves data accumulated in `index`, if any."
+        if self.index is not None:
+            self.index.save()
+
+
+class NameTable(dict):
+    "Like pyelftools's `NameLUT`, returns `None` for unknown names."
+
+    def __missing__(self, __):
+        return None
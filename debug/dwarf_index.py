@@ -0,0 +1,269 @@
+__all__ = [
+    "DWARFIndex"
+  , "IndexedLineEntry"
+  , "IndexedLineState"
+  , "elf_index_key"
+]
+
+from common import (
+    BadSectionFile,
+    dump_sections,
+    makedirs,
+    qdtdirs,
+    RawSection,
+    rename_replacing,
+    SectionFile,
+)
+
+from hashlib import (
+    md5,
+)
+from os import (
+    stat,
+)
+from os.path import (
+    isfile,
+    join,
+    realpath,
+)
+
+
+# Persistent DWARF index file format identifier. Change it if the format is
+# changed.
+DI_MAGIC = b"QDT_DI\x00\x01"
+
+# Extension of persistent DWARF index file.
+DI_EXT = u".qdi"
+
+DWARF_INDEXES_DIR = join(qdtdirs.user_cache_dir, "dwarf_index")
+
+# Attributes of pyelftools's `LineState` preserved by the index.
+LINE_STATE_FIELDS = (
+    "address",
+    "file",
+    "line",
+    "column",
+    "is_stmt",
+    "basic_block",
+    "end_sequence",
+    "prologue_end",
+    "epilogue_begin",
+    "isa",
+)
+
+# Names of sections those are always loaded.
+DI_KEY = "key"
+DI_CUS = "cus"
+DI_SP_RANGES = "sp_ranges"
+DI_FDES = "fdes"
+DI_NAME_TABLES = "name_tables"
+
+# Prefix of line program section names, CU offset follows.
+DI_LP_PREFIX = "lp:"
+
+
+class IndexedLineState(object):
+    "Line program state restored from `DWARFIndex`, see `LINE_STATE_FIELDS`."
+
+    __slots__ = LINE_STATE_FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(LINE_STATE_FIELDS, values):
+            setattr(self, name, value)
+
+
+class IndexedLineEntry(object):
+    """ Line program entry restored from `DWARFIndex`. Unlike pyelftools's
+`LineProgramEntry`, only `state` is available.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+
+def line_state_row(state):
+    return tuple(getattr(state, name) for name in LINE_STATE_FIELDS)
+
+
+def elf_index_key(elf, file_name):
+    """ Identifies ELF file content. GNU build ID is used, if available.
+Else, size and modification time of the file are used.
+
+Build ID is same for stripped and not stripped copies of a binary. So, size
+of ".debug_info" section (`None`, if there is no one) is a part of the key too.
+    """
+
+    debug_info = elf.get_section_by_name(".debug_info")
+    if debug_info is None:
+        debug_info_size = None
+    else:
+        debug_info_size = debug_info["sh_size"]
+
+    for section in elf.iter_sections():
+        if section["sh_type"] != "SHT_NOTE":
+            continue
+        for note in section.iter_notes():
+            if note["n_type"] == "NT_GNU_BUILD_ID":
+                return ("build-id", note["n_desc"], debug_info_size)
+
+    st = stat(file_name)
+    return ("stat", st.st_size, st.st_mtime)
+
+
+class DWARFIndex(object):
+    """ Persistent data of `DWARFInfoAccelerator` and `DWARFInfoCache`.
+The index is filled as the data is computed. So, next debug session with same
+ELF file does not compute it again.
+
+Line programs are loaded on demand.
+    """
+
+    def __init__(self, key, path = None, sections = None):
+        self.key = key
+        self.path = path
+        self.sections = sections
+        self.changed = False
+
+        # Offsets and reversed name parts of CUs in order of ".debug_info".
+        # It's a prefix of full CU list until `cus_complete`.
+        self.cus = []
+        self.cus_complete = False
+
+        # CU offset -> (files, rows), see `LINE_STATE_FIELDS` about rows.
+        # Only line programs those are accounted during current session.
+        self.line_programs = {}
+
+        # Start, end and CU offset of subprograms address ranges.
+        self.sp_ranges = []
+
+        # Start, end and offset of FDEs in order of CFI section.
+        # It's a prefix of full FDE list until CFI section offset `cfi_end`.
+        self.fdes = []
+        self.cfi_end = 0
+
+        # Name -> (CU offset, DIE offset) mappings keyed by section name
+        # (pubnames, pubtypes). `None` if there is no such section.
+        self.name_tables = {}
+
+        if sections is not None:
+            self.cus, self.cus_complete = sections[DI_CUS]
+            self.sp_ranges = sections[DI_SP_RANGES]
+            self.fdes, self.cfi_end = sections[DI_FDES]
+            self.name_tables = sections[DI_NAME_TABLES]
+
+    @classmethod
+    def for_elf(klass, elf, file_name):
+        """ Loads the index of the ELF file or creates an empty one. Files with
+same GNU build ID (e.g. installed and build directory copies of a binary)
+share the index, unless debug information of one of them is stripped.
+        """
+
+        key = elf_index_key(elf, file_name)
+
+        makedirs(DWARF_INDEXES_DIR, exist_ok = True)
+        if key[0] == "build-id":
+            path_hash = md5(repr(key).encode("utf-8")).hexdigest()
+        else:
+            path_hash = md5(realpath(file_name).encode("utf-8")).hexdigest()
+        path = join(DWARF_INDEXES_DIR, path_hash + DI_EXT)
+
+        if isfile(path):
+            try:
+                sections = SectionFile(path, DI_MAGIC)
+                if sections[DI_KEY] == key:
+                    return klass(key, path = path, sections = sections)
+            except (BadSectionFile, EnvironmentError, EOFError, ValueError,
+                KeyError
+            ):
+                print("Bad DWARF index file %s, it will be rebuilt" % path)
+
+        return klass(key, path = path)
+
+    def line_program(self, cu_offset):
+        """
+    :returns:
+        files and rows of the line program of the CU or `None`
+
+        """
+        try:
+            return self.line_programs[cu_offset]
+        except KeyError:
+            pass
+
+        sections = self.sections
+        name = DI_LP_PREFIX + str(cu_offset)
+        if sections is None or name not in sections:
+            return None
+
+        lp = self.line_programs[cu_offset] = sections[name]
+        return lp
+
+    def add_cu(self, offset, rparts):
+        self.cus.append((offset, rparts))
+        self.changed = True
+
+    def set_cus_complete(self):
+        self.cus_complete = True
+        self.changed = True
+
+    def add_line_program(self, cu_offset, files, rows):
+        self.line_programs[cu_offset] = (files, rows)
+        self.changed = True
+
+    def add_sp_range(self, start, end, cu_offset):
+        self.sp_ranges.append((start, end, cu_offset))
+        self.changed = True
+
+    def add_fde(self, start, end, offset, next_offset):
+        self.fdes.append((start, end, offset))
+        self.cfi_end = next_offset
+        self.changed = True
+
+    def set_cfi_end(self, next_offset):
+        self.cfi_end = next_offset
+        self.changed = True
+
+    def set_name_table(self, name, table):
+        self.name_tables[name] = table
+        self.changed = True
+
+    def iter_sections(self):
+        yield DI_KEY, self.key
+        yield DI_CUS, (self.cus, self.cus_complete)
+        yield DI_SP_RANGES, self.sp_ranges
+        yield DI_FDES, (self.fdes, self.cfi_end)
+        yield DI_NAME_TABLES, self.name_tables
+
+        line_programs = self.line_programs
+        for cu_offset, lp in line_programs.items():
+            yield DI_LP_PREFIX + str(cu_offset), lp
+
+        sections = self.sections
+        if sections is None:
+            return
+
+        # Line programs those were not loaded during current session.
+        for name in sections:
+            if not name.startswith(DI_LP_PREFIX):
+                continue
+            if int(name[len(DI_LP_PREFIX):]) in line_programs:
+                continue
+            yield name, RawSection(sections.read_raw(name))
+
+    def save(self):
+        "Writes the index to `path` if it's changed."
+
+        if not self.changed or self.path is None:
+            return
+
+        data = dump_sections(DI_MAGIC, self.iter_sections())
+
+        tmp_path = self.path + u".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        rename_replacing(tmp_path, self.path)
+
+        self.sections = SectionFile(self.path, DI_MAGIC)
+        self.changed = False
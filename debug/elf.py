@@ -2,22 +2,81 @@
 
 __all__ = [
     "InMemoryELFFile"
+  , "MappedELFFile"
+  , "MappedFile"
+  , "MappedStream"
+  , "map_file"
   , "create_dwarf_cache"
 ]
 
 from .dic import (
     DWARFInfoCache,
 )
+from .dwarf_index import (
+    DWARFIndex,
+)
 
 from elftools.elf.elffile import (
     ELFFile
 )
+from mmap import (
+    ACCESS_READ,
+    mmap,
+)
+from os import (
+    SEEK_CUR,
+    SEEK_END,
+    SEEK_SET,
+    stat,
+)
+from os.path import (
+    realpath,
+)
 from six import (
     BytesIO,
 )
+from weakref import (
+    WeakValueDictionary,
+)
+
+
+class _NamedELFFile(ELFFile):
+    "pyelftools's `ELFFile` of a file with known name."
+
+    def __init__(self, stream, file_name):
+        super(_NamedELFFile, self).__init__(stream)
+        self._file_name = file_name
 
+    def create_dwarf_cache(self, persistent = True):
+        """
+    :param persistent:
+        use `DWARFIndex` of the file, see `DWARFInfoCache.save_index`
 
-class InMemoryELFFile(ELFFile):
+        """
+        if not self.has_dwarf_info():
+            raise ValueError(
+    "%s does not have DWARF info. Provide a debug build\n" % (self._file_name)
+            )
+
+        di = self.get_dwarf_info()
+
+        if not di.debug_pubnames_sec:
+            print("%s does not contain .debug_pubtypes section. Provide"
+                " -gpubnames flag to the compiler" % self._file_name
+            )
+
+        if persistent:
+            index = DWARFIndex.for_elf(self, self._file_name)
+        else:
+            index = None
+
+        return DWARFInfoCache(di,
+            symtab = self.get_section_by_name(".symtab"),
+            index = index
+        )
+
+
+class InMemoryELFFile(_NamedELFFile):
     """ Like pyelftools's `ELFFile` but caches all the file in memory.
     """
 
@@ -33,26 +92,109 @@ class InMemoryELFFile(ELFFile):
                 if l < (1 << 20):
                     break
 
-        super(InMemoryELFFile, self).__init__(stream)
-        self._file_name = file_name
+        super(InMemoryELFFile, self).__init__(stream, file_name)
 
-    def create_dwarf_cache(self):
-        if not self.has_dwarf_info():
-            raise ValueError(
-    "%s does not have DWARF info. Provide a debug build\n" % (self._file_name)
-            )
 
-        di = self.get_dwarf_info()
+class MappedFile(object):
+    "Read only memory mapping of a whole file."
 
-        if not di.debug_pubnames_sec:
-            print("%s does not contain .debug_pubtypes section. Provide"
-                " -gpubnames flag to the compiler" % self._file_name
-            )
+    def __init__(self, file_name):
+        self.file_name = file_name
 
-        return DWARFInfoCache(di,
-            symtab = self.get_section_by_name(".symtab")
-        )
+        with open(file_name, "rb") as f:
+            # The mapping does not require the file to be opened.
+            self.mm = mmap(f.fileno(), 0, access = ACCESS_READ)
+
+        self.size = len(self.mm)
+
+    def close(self):
+        self.mm.close()
+
+    def __del__(self):
+        self.close()
+
+
+# Shared `MappedFile`s keyed by path, size and modification time of files.
+_shared_mappings = WeakValueDictionary()
+
+
+def map_file(file_name, shared = False):
+    """
+    :param shared:
+        reuse the mapping of the file if it's still used by something and the
+        file has not been changed since the mapping
+    :returns:
+        `MappedFile`
+    """
+
+    if not shared:
+        return MappedFile(file_name)
+
+    st = stat(file_name)
+    key = (realpath(file_name), st.st_size, st.st_mtime)
+
+    mapping = _shared_mappings.get(key)
+    if mapping is None:
+        mapping = _shared_mappings[key] = MappedFile(file_name)
+
+    return mapping
+
+
+class MappedStream(object):
+    """ Read only file-like stream over `MappedFile`. Several streams may share
+one mapping because each stream has own position.
+    """
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self._mm = mapping.mm
+        self._pos = 0
+
+    def read(self, size = -1):
+        start = self._pos
+        if size is None or size < 0:
+            end = self.mapping.size
+        else:
+            end = min(start + size, self.mapping.size)
+
+        if end <= start:
+            return b""
+
+        self._pos = end
+        return self._mm[start:end]
+
+    def seek(self, offset, whence = SEEK_SET):
+        if whence == SEEK_SET:
+            pos = offset
+        elif whence == SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == SEEK_END:
+            pos = self.mapping.size + offset
+        else:
+            raise ValueError("Unknown whence %r" % whence)
+
+        if pos < 0:
+            raise ValueError("Negative seek position %d" % pos)
+
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+
+class MappedELFFile(_NamedELFFile):
+    """ Like `InMemoryELFFile` but the file is memory mapped instead of
+copying. So, the file content is shared with OS page cache.
+
+:param shared:
+    see `map_file`
+    """
+
+    def __init__(self, file_name, shared = False):
+        stream = MappedStream(map_file(file_name, shared = shared))
+        super(MappedELFFile, self).__init__(stream, file_name)
 
 
-def create_dwarf_cache(exec_file):
-    return InMemoryELFFile(exec_file).create_dwarf_cache()
+def create_dwarf_cache(exec_file, **kw):
+    return MappedELFFile(exec_file).create_dwarf_cache(**kw)
@@ -27,7 +27,11 @@ from common import (
     trie_build,
     trie_find,
     git_diff2delta_intervals,
-    pythonize
+    pythonize,
+    rename_replacing
+)
+from os import (
+    getpid
 )
 from .line_adapter import (
     LineAdapter
@@ -158,7 +162,11 @@ renaming for file name)
         return delta_map, rename
 
     def store_cache(self):
-        pythonize(self._cache, self.cache_file)
+        # Several processes can store the cache concurrently (e.g. device
+        # tree building workers). So, the file is replaced atomically.
+        tmp_file = "%s.%u.tmp" % (self.cache_file, getpid())
+        pythonize(self._cache, tmp_file)
+        rename_replacing(tmp_file, self.cache_file)
 
 
 class GitLineVersionAdapter(LineAdapter):
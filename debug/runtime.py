@@ -18,6 +18,8 @@ from itertools import (
 from common import (
     charcodes,
     bstr,
+    CoEvent,
+    ee,
     notifier,
     cached,
     reset_cache
@@ -28,6 +30,10 @@ from .value import (
 )
 
 
+# Target memory is read and cached by pages of that size. 0 disables caching.
+RT_PAGE_SIZE = ee("QDT_RT_PAGE_SIZE", "0x400")
+
+
 @notifier("break")
 class Breakpoints(object):
 
@@ -54,7 +60,11 @@ class Breakpoints(object):
 class Runtime(object):
     "A context of debug session with access to DWARF debug information."
 
-    def __init__(self, target, dic, return_reg_name = None, base_address = 0):
+    def __init__(self, target, dic,
+        return_reg_name = None,
+        base_address = 0,
+        page_size = RT_PAGE_SIZE
+    ):
         """
     :type target:
         pyrsp.rsp.RemoteTarget
@@ -66,6 +76,10 @@ class Runtime(object):
     :param dic:
         a global context
 
+    :param page_size:
+        target memory is read by pages of that size which are cached until
+        the target is resumed, 0 disables caching
+
         """
         self.target = target
         self.dic = dic
@@ -76,6 +90,11 @@ class Runtime(object):
         # cache of register values converted to integer
         self.regs = [None] * len(target.registers)
 
+        self.page_size = page_size
+        # cache of target memory: page number -> `bytes`, `None` means that
+        # the page cannot be read
+        self.pages = {}
+
         # support for `cached` decorator
         self.__lazy__ = []
 
@@ -120,6 +139,7 @@ not actual now.
         self.version += 1
 
         self.regs[:] = repeat(None, len(self.regs))
+        self.pages.clear()
 
         reset_cache(self)
 
@@ -128,15 +148,17 @@ not actual now.
         val = regs[idx]
 
         if val is None:
+            # Only requested register is converted because some others may be
+            # unavailable (e.g. "xxxxxxxx" or missing in "g" packet reply).
             tgt = self.target
-            val_hex = tgt.regs[tgt.registers[idx]]
-            val = int(val_hex, 16)
+            val = int(tgt.regs[tgt.registers[idx]], 16)
             regs[idx] = val
 
         return val
 
     def co_run_target(self):
         target = self.target
+        stopped = CoEvent()
 
         def run():
             try:
@@ -150,12 +172,14 @@ not actual now.
             except:
                 print_exc()
 
+            stopped.set()
+
         t = Thread(target = run)
         t.name = "RSP client"
         t.start()
 
-        while t.is_alive():
-            yield False
+        yield stopped
+        t.join()
 
     @cached
     def returned_value(self):
@@ -200,10 +224,84 @@ normally correct only when the target is stopped at the subprogram epilogue.
         stack.append(obj)
         return loc
 
+    def _iter_runs(self, ranges):
+        # Yields (first page, end page) of adjacent not cached pages covering
+        # `ranges`.
+        page_size = self.page_size
+        pages = self.pages
+
+        missing = set()
+        for addr, size in ranges:
+            if size <= 0:
+                continue
+            end = (addr + size - 1) // page_size + 1
+            for page in range(addr // page_size, end):
+                if page not in pages:
+                    missing.add(page)
+
+        start = end = None
+        for page in sorted(missing):
+            if page != end:
+                if start is not None:
+                    yield start, end
+                start = page
+            end = page + 1
+
+        if start is not None:
+            yield start, end
+
+    def prefetch(self, ranges):
+        """ Reads target memory covering `ranges` (iterable of address and size
+pairs) into the cache. Adjacent pages are read at once. So, reading of several
+values during one stop of the target results in few RSP round-trips.
+        """
+
+        page_size = self.page_size
+        if not page_size:
+            return
+
+        pages = self.pages
+        dump = self.target.dump
+
+        for start, end in self._iter_runs(ranges):
+            try:
+                data = dump((end - start) * page_size, start * page_size)
+            except RuntimeError:
+                # Some of those pages are not readable. Requested bytes will
+                # be read exactly, see `read`.
+                data = None
+
+            for page in range(start, end):
+                if data is None:
+                    pages[page] = None
+                else:
+                    offset = (page - start) * page_size
+                    pages[page] = data[offset:offset + page_size]
+
+    def read(self, addr, size):
+        "Returns `bytes` of target memory, the cache is used."
+
+        page_size = self.page_size
+        if not page_size:
+            return self.target.dump(size, addr)
+
+        self.prefetch(((addr, size),))
+
+        first = addr // page_size
+        end = (addr + size - 1) // page_size + 1
+
+        pages = self.pages
+        chunks = list(pages[page] for page in range(first, end))
+        if None in chunks:
+            return self.target.dump(size, addr)
+
+        offset = addr - first * page_size
+        return b"".join(chunks)[offset:offset + size]
+
     def get_val(self, addr, size):
         target = self.target
 
-        data = target.dump(size, addr)
+        data = self.read(addr, size)
 
         if target.arch["endian"]:
             data = reversed(data)
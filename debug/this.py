@@ -0,0 +1,19 @@
+from .cached_die import *
+from .dia import *
+from .dic import *
+from .dwarf_expr_builder import *
+from .dwarf_index import *
+from .elf import *
+from .expression import *
+from .git_repo_by_dwarf import *
+from .glob import *
+from .glv_adapter import *
+from .gv import *
+from .line_adapter import *
+from .preload import *
+from .rsp_watcher import *
+from .runtime import *
+from .symtab import *
+from .type import *
+from .value import *
+from .watcher import *
\ No newline at end of file
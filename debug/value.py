@@ -22,7 +22,8 @@ from .type import (
     Field,
     TYPE_CODE_PTR,
     TYPE_CODE_ARRAY,
-    TYPE_CODE_STRUCT
+    TYPE_CODE_STRUCT,
+    TYPE_CODE_TYPEDEF
 )
 from six import (
     integer_types
@@ -278,6 +279,25 @@ Related: `dereference`
 
         return fetched
 
+    def prefetch(self, size = None):
+        """ Reads whole value from target memory at once. Consequent fetches of
+its fields and elements use cached memory until the target is resumed.
+
+    :param size:
+        of the value, by default it's got from the type (DW_AT_byte_size)
+
+        """
+        if size is None:
+            _type = self.type
+            while _type.code == TYPE_CODE_TYPEDEF:
+                _type = _type.target_type
+            try:
+                size = _type.die.attributes["DW_AT_byte_size"].value
+            except (AttributeError, KeyError):
+                raise ValueError("Size of the value is unknown")
+
+        self.runtime.prefetch(((self.address, size),))
+
     def fetch_pointer(self):
         """ If a user is completely sure that the value is a pointer then this
 way to fetch it is faster than common `fetch()` because automatic size
@@ -303,14 +323,14 @@ evaluation is time consuming.
         if addr:
             value = deque()
             pos = -1
-            dump = self.runtime.target.dump
+            read = self.runtime.read
 
             while pos == -1:
                 if len(value) == limit:
                     raise RuntimeError("C string length limit exceeded")
 
                 try:
-                    substring = dump(64, addr)
+                    substring = read(addr, 64)
                 except RuntimeError:
                     # XXX: a workaround for a non-deterministic E01 error from
                     # gdb stub because of an unidentified reason
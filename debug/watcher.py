@@ -110,6 +110,9 @@ Leading spaces are ignored.
                     cb.__name__, loc_str, e
                 ))
 
+        # Next time breakpoints will be mapped faster.
+        dic.save_index()
+
     def init_runtime(self, rt):
         """ Setup breakpoint handlers
     :type rt: Runtime
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+from common import (
+    CLICoDispatcher,
+    CoPool,
+    execfile,
+    FailedCallee,
+    pythonize,
+)
+from qemu import (
+    MachineNode,
+    QProject,
+)
+import qdt
+from widgets import (
+    GUIProject,
+)
+
+from argparse import (
+    ArgumentParser,
+)
+from time import (
+    time,
+)
+
+
+def co_layout(project, desc, **kw):
+    print("Laying out %s (%u nodes)" % (desc.name, len(desc.id2node)))
+
+    t0 = time()
+    try:
+        yield project.co_auto_layout(desc, **kw)
+    except FailedCallee as e:
+        print("Failed to lay out %s:\n%s" % (
+            desc.name, "".join(e.callee.traceback_lines)
+        ))
+    else:
+        print("%s is laid out (%.1f sec)" % (desc.name, time() - t0))
+
+
+def main():
+    ap = ArgumentParser(
+        description = "Lays out machine diagrams of a project without GUI"
+    )
+    arg = ap.add_argument
+
+    arg("script",
+        help = "QDC GUI project script"
+    )
+    arg("-o", "--output",
+        metavar = "project.py",
+        help = "save the project to another file"
+    )
+    arg("-m", "--machine",
+        action = "append",
+        metavar = "NAME",
+        help = "lay out that machine only (can be given several times)"
+    )
+    arg("-r", "--reset",
+        action = "store_true",
+        help = "do not use current positions of nodes"
+    )
+    arg("-j", "--jobs",
+        type = int,
+        default = 1,
+        metavar = "N",
+        help = "lay out up to N machines in parallel"
+    )
+    arg("-e", "--eps",
+        type = float,
+        default = 0.1,
+        help = "the layout is settled when nodes move slower (pixels/tick)"
+    )
+    arg("-t", "--ticks",
+        type = int,
+        default = 2000,
+        help = "maximum amount of iterations per machine"
+    )
+
+    args = ap.parse_args()
+
+    loaded = dict(qdt.__dict__)
+    execfile(args.script, loaded)
+
+    qproj = None
+    for v in loaded.values():
+        if isinstance(v, GUIProject):
+            project = v
+            break
+        elif qproj is None and isinstance(v, QProject):
+            qproj = v
+    else:
+        if qproj is None:
+            print("No project is defined by " + args.script)
+            return 1
+        project = GUIProject.from_qproject(qproj)
+
+    descs = list(d for d in project.descriptions if isinstance(d, MachineNode)
+        and (args.machine is None or d.name in args.machine)
+    )
+    if not descs:
+        print("No machine to lay out")
+        return 1
+
+    # Machines are laid out concurrently, each one by a worker of the pool.
+    pool = None if args.jobs == 1 else CoPool(args.jobs)
+
+    disp = CLICoDispatcher()
+    for desc in descs:
+        disp.enqueue(co_layout(project, desc,
+            pool = pool,
+            reset = args.reset,
+            eps = args.eps,
+            ticks = args.ticks
+        ))
+
+    try:
+        disp.dispatch_all()
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    pythonize(project, args.output or args.script)
+
+
+if __name__ == "__main__":
+    exit(main() or 0)
@@ -0,0 +1,27 @@
+from qemu import (
+    load_qvc,
+    save_qvc,
+)
+
+from argparse import (
+    ArgumentParser,
+)
+
+
+def main():
+    ap = ArgumentParser(
+        description = "Converts QEMU Version Cache between binary (*.qvc) and"
+            " pythonized (*.py) formats. Format is defined by extension."
+    )
+    arg = ap.add_argument
+
+    arg("src")
+    arg("dst")
+
+    args = ap.parse_args()
+
+    save_qvc(load_qvc(args.src), args.dst)
+
+
+if __name__ == "__main__":
+    exit(main() or 0)
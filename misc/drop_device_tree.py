@@ -1,8 +1,6 @@
-from common import (
-    pythonize,
-)
 from qemu import (
     load_qvc,
+    save_qvc,
 )
 
 from argparse import (
@@ -29,7 +27,7 @@ def main():
     qvc.device_tree = None
 
     copy2(qvc_path, qvc_path_back)
-    pythonize(qvc, qvc_path)
+    save_qvc(qvc, qvc_path)
 
 
 if __name__ == "__main__":
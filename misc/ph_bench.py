@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+from common import (
+    box_reaction,
+    integrate_velocities,
+    PhBox,
+    SpatialHash,
+)
+
+from argparse import (
+    ArgumentParser,
+)
+from random import (
+    Random,
+)
+from time import (
+    time,
+)
+
+
+def gen_boxes(count, seed):
+    "Returns `count` device-like boxes piled in a small area."
+
+    rand = Random(seed)
+    side = int((count ** 0.5) * 100)
+
+    return list(
+        PhBox(
+            x = rand.randint(0, side),
+            y = rand.randint(0, side),
+            w = rand.randint(40, 160),
+            h = rand.randint(20, 40),
+        ) for __ in range(count)
+    )
+
+
+def iter_pairs_brute(boxes):
+    for i, n in enumerate(boxes):
+        for n1 in boxes[i + 1:]:
+            yield n, n1
+
+
+def iter_pairs_hash(boxes):
+    cell = sum(max(n.width, n.height) + 2 * n.spacing for n in boxes)
+    sh = SpatialHash(float(cell) / len(boxes))
+    sh.extend(boxes)
+    return sh.iter_pairs()
+
+
+def tick(boxes, iter_pairs, velocity_k = 0.05, velocity_limit = 10):
+    """ Does an iteration of box repulsion like `MachineDiagramWidget` does.
+Returns maximum velocity.
+    """
+
+    for n in boxes:
+        n.vx = n.vy = 0
+
+    for n, n1 in iter_pairs(boxes):
+        if not n.overlaps_box(n1):
+            continue
+
+        rx, ry = box_reaction(n, n1)
+
+        n.vx = n.vx + rx * velocity_k
+        n.vy = n.vy + ry * velocity_k
+        n1.vx = n1.vx - rx * velocity_k
+        n1.vy = n1.vy - ry * velocity_k
+
+    integrate_velocities(boxes, velocity_limit)
+
+    return max(max(abs(n.vx), abs(n.vy)) for n in boxes)
+
+
+def main():
+    ap = ArgumentParser(
+        description = "Headless benchmark of physical layout of machine diagram"
+    )
+    arg = ap.add_argument
+
+    arg("--boxes", "-b",
+        type = int,
+        default = 500,
+        help = "amount of boxes (devices & bus labels)"
+    )
+    arg("--ticks", "-t",
+        type = int,
+        default = 1000,
+        help = "maximum amount of iterations"
+    )
+    arg("--eps", "-e",
+        type = float,
+        default = 0.1,
+        help = "the layout is settled when boxes move slower (pixels/tick)"
+    )
+    arg("--seed",
+        type = int,
+        default = 0,
+    )
+    arg("--brute",
+        action = "store_true",
+        help = "check all pairs of boxes instead of spatial hashing"
+    )
+
+    args = ap.parse_args()
+
+    boxes = gen_boxes(args.boxes, args.seed)
+    iter_pairs = iter_pairs_brute if args.brute else iter_pairs_hash
+
+    t0 = time()
+    for i in range(1, args.ticks + 1):
+        v = tick(boxes, iter_pairs)
+        if v < args.eps:
+            print("settled after %u ticks" % i)
+            break
+    else:
+        print("not settled after %u ticks, max velocity %g" % (
+            args.ticks, v
+        ))
+    t = time() - t0
+
+    print("%.3f sec, %.1f ticks/sec" % (t, i / t))
+
+
+if __name__ == "__main__":
+    exit(main() or 0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+from qemu import (
+    QEMULog,
+)
+
+from argparse import (
+    ArgumentParser,
+)
+from os import (
+    close,
+    remove,
+)
+from random import (
+    Random,
+)
+from tempfile import (
+    mkstemp,
+)
+from time import (
+    time,
+)
+
+try:
+    import tracemalloc
+except ImportError: # Py2
+    tracemalloc = None
+
+
+def gen_tb(rand, addr):
+    "Returns in_asm lines of a TB starting at `addr` and its end address."
+
+    lines = ["IN: \n"]
+    for __ in range(rand.randint(2, 12)):
+        size = rand.randint(1, 6)
+        lines.append("0x%08x:  %-20s nop%d\n" % (
+            addr,
+            " ".join("90" for __ in range(size)),
+            size
+        ))
+        addr += size
+    lines.append("\n")
+    return lines, addr
+
+
+def gen_log(f, blocks, steps, seed):
+    """ Writes synthetic `-d in_asm,exec` log. The guest executes `blocks`
+code blocks in random order. Some blocks are re-translated from a shifted
+start address, i.e. their TBs overlap previous TBs.
+    """
+
+    rand = Random(seed)
+    w = f.write
+
+    starts = list(0x1000 + 0x100 * i for i in range(blocks))
+    translated = []
+
+    for __ in range(steps):
+        r = rand.random()
+
+        if not translated or r < 0.05:
+            start = rand.choice(starts)
+            if r < 0.02:
+                # re-translation from another address (self modifying code)
+                start += rand.randint(1, 5)
+            lines, __ = gen_tb(rand, start)
+            w("".join(lines))
+            translated.append(start)
+        elif r < 0.1 and len(translated) > 1:
+            a, b = rand.sample(translated, 2)
+            w("Linking TBs 0x7f0000%06x [%08x] index 0 -> 0x7f0000%06x"
+              " [%08x]\n" % (a & 0xFFFFFF, a, b & 0xFFFFFF, b)
+            )
+        else:
+            addr = rand.choice(translated)
+            w("Trace 0: 0x7f0000%06x [00000000/%08x/0x00000000] \n" % (
+                addr & 0xFFFFFF, addr
+            ))
+
+
+def main():
+    ap = ArgumentParser(
+        description = "QEMU log analysis (`QEMULog`) benchmark"
+    )
+    arg = ap.add_argument
+
+    arg("--blocks", "-b",
+        type = int,
+        default = 2000,
+        help = "amount of guest code blocks"
+    )
+    arg("--steps", "-s",
+        type = int,
+        default = 200000,
+        help = "amount of log records (TBs, traces and linkings)"
+    )
+    arg("--seed",
+        type = int,
+        default = 0,
+    )
+    arg("--jobs", "-j",
+        type = int,
+        default = 1,
+        help = "parse the log in parallel using that amount of processes"
+    )
+    arg("--log", "-l",
+        help = "use this log instead of generating a synthetic one"
+    )
+
+    args = ap.parse_args()
+
+    log = args.log
+    if log is None:
+        fd, log = mkstemp(suffix = ".qlog")
+        close(fd)
+        t0 = time()
+        with open(log, "w") as f:
+            gen_log(f, args.blocks, args.steps, args.seed)
+        print("generated in %.3f sec" % (time() - t0))
+
+    try:
+        if tracemalloc is not None:
+            tracemalloc.start()
+
+        t0 = time()
+        qlog = QEMULog(log, jobs = args.jobs)
+        instrs = sum(1 for __ in qlog.iter_instructions())
+        t1 = time()
+
+        print("%u instructions, %u traces, %u TBs, cache version %u" % (
+            instrs, len(qlog.trace), len(qlog.tbIdMap), qlog.cache.version
+        ))
+        print("parsed in %.3f sec" % (t1 - t0))
+
+        if tracemalloc is not None:
+            print("peak memory %.1f MiB" % (
+                tracemalloc.get_traced_memory()[1] / float(1 << 20)
+            ))
+    finally:
+        if args.log is None:
+            remove(log)
+
+
+if __name__ == "__main__":
+    exit(main() or 0)
@@ -1,6 +1,8 @@
 __all__ = [
     "register_in_build_system"
   , "register_src_in_build_system"
+  , "recording_build_system_registrations"
+  , "apply_build_system_registrations"
 ]
 
 from common import (
@@ -19,6 +21,9 @@ from codecs import (
 from collections import (
     defaultdict,
 )
+from contextlib import (
+    contextmanager,
+)
 from os.path import (
     isfile,
     join,
@@ -49,8 +54,39 @@ config_flags["hw"] = "CONFIG_SOFTMMU"
 # using other settings. But as this tool generates devices only. So, the
 # settings is chosen this way.
 
+# If not `None`, registrations are appended to it instead of patching of
+# build system files, see `recording_build_system_registrations`.
+_records = None
+
+
+@contextmanager
+def recording_build_system_registrations():
+    """ Within the context, build system registrations are recorded to
+`yield`ed list instead of patching of build system files. The records are
+applied by `apply_build_system_registrations` later. It allows to serialize
+patching when sources are generated by several processes.
+    """
+    global _records
+
+    prev_records, _records = _records, []
+    try:
+        yield _records
+    finally:
+        _records = prev_records
+
+
+def apply_build_system_registrations(records):
+    for func, args in records:
+        func(*args)
+
 
 def register_in_build_system(src_root, folder, known_targets):
+    if _records is not None:
+        _records.append((register_in_build_system,
+            (src_root, folder, known_targets)
+        ))
+        return
+
     tail, head = split(folder)
 
     if tail:
@@ -97,6 +133,12 @@ def register_in_build_system(src_root, folder, known_targets):
 
 
 def register_src_in_build_system(src_root, sname, directory):
+    if _records is not None:
+        _records.append((register_src_in_build_system,
+            (src_root, sname, directory)
+        ))
+        return
+
     build_system = get_vp("build system")
 
     if build_system == "Makefile":
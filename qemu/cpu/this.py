@@ -0,0 +1,7 @@
+from .code_generation import *
+from .constants import *
+from .cpu import *
+from .helpers import *
+from .info import *
+from .instruction import *
+from .parse_tree_code_builder import *
\ No newline at end of file
@@ -0,0 +1,338 @@
+__all__ = [
+    "MachineLayout"
+  , "co_layout_machine"
+  , "LAYOUT_SHOW_MESH"
+  , "LAYOUT_MESH_STEP"
+  , "LAYOUT_DYNAMIC"
+  , "LAYOUT_IRQ_LINES_POINTS"
+]
+
+from common import (
+    CoReturn,
+    find_empty_aabb,
+    integrate_velocities,
+    offload_progress,
+    PhBox,
+    PhCircle,
+    PhDiagram,
+)
+
+
+# Keys of `MachineDiagramWidget` layout configuration (`layout[-1]`).
+LAYOUT_SHOW_MESH = "show mesh"
+LAYOUT_MESH_STEP = "mesh step"
+LAYOUT_DYNAMIC = "physical layout" # this name difference is a legacy issue
+LAYOUT_IRQ_LINES_POINTS = "IRQ lines points"
+
+
+class NodeBox(PhBox):
+    "A device, a CPU or a bus label."
+
+    def __init__(self, node, text, char_width, char_height):
+        PhBox.__init__(self)
+
+        self.node = node
+        self.conn = None
+
+        self.text_width = len(text) * char_width
+        self.text_height = char_height
+        self.padding = 10
+
+        self.bus_padding = 20
+        self.bus_labels = []
+
+        self.width = self.text_width + self.padding
+        self.height = self.text_height + self.padding
+
+
+class BusLabelBox(NodeBox):
+
+    def __init__(self, bus, *a):
+        NodeBox.__init__(self, bus, bus.gen_child_name_for_bus(), *a)
+
+        self.cap_size = 0.5
+        self.height = (1 + 2 * self.cap_size) * self.height
+        self.offset = [self.width / 2, 0]
+
+        self.busline = BusLineBox(self)
+
+
+class BusLineBox(PhBox):
+
+    def __init__(self, bl):
+        PhBox.__init__(self,
+            w = 1,
+            h = 50 * 2,
+        )
+        self.extra_length = 50
+
+        self.buslabel = bl
+
+
+class ConnectionLineBox(PhBox):
+
+    def __init__(self, dev_node, bus_node):
+        PhBox.__init__(self, h = 1)
+        self.dev_node = dev_node
+        self.bus_node = bus_node
+
+        self.update()
+
+    def update(self):
+        dev_node, bus_node = self.dev_node, self.bus_node
+        dev_x = dev_node.x + dev_node.width / 2
+
+        self.y = dev_node.y + dev_node.height / 2
+        self.x = min(bus_node.x, dev_x)
+        self.width = max(bus_node.x, dev_x) - self.x
+
+
+class HubCircle(PhCircle):
+
+    def __init__(self, hub):
+        PhCircle.__init__(self, spacing = 5)
+        self.node = hub
+
+
+def node_text(node):
+    text = node.qom_type
+    if text.startswith("TYPE_"):
+        text = text[5:]
+    return text
+
+
+class MachineLayout(PhDiagram):
+    """ Physical layout of a machine diagram without GUI. The model is same as
+`MachineDiagramWidget` one (see `PhDiagram`) except for IRQ line points which
+are not used. Text sizes are estimated by character size of the font.
+
+:param mach: `MachineDescription`
+:param layout: a `MachineDiagramWidget` layout to start from, nodes missing
+    in it are placed in empty space
+
+    """
+
+    velocity_k = 0.05
+    velocity_limit = 10
+    bus_velocity_k = 0.05
+
+    def __init__(self, mach, layout = None, char_width = 8, char_height = 15):
+        self.mach = mach
+        self.layout = layout = {} if layout is None else layout
+
+        # devices and CPUs
+        self.nodes = []
+        self.buslabels = []
+        self.buses = []
+        self.conns = []
+        # IRQ hubs
+        self.circles = []
+
+        self.dev2node = {}
+
+        metrics = (char_width, char_height)
+
+        # The order is same as in `MachineDiagramWidget.update`.
+        for cpu in mach.cpus:
+            self.add_node(NodeBox(cpu, node_text(cpu), *metrics))
+
+        for hub in mach.irq_hubs:
+            self.add_hub(HubCircle(hub))
+
+        for bus in mach.buses:
+            self.add_buslabel(BusLabelBox(bus, *metrics))
+
+        dev2node = self.dev2node
+        for dev in mach.devices:
+            node = NodeBox(dev, node_text(dev), *metrics)
+            node.bus_labels = list(dev2node[bus] for bus in dev.buses)
+            self.add_node(node)
+
+        for dev in mach.devices:
+            pb = dev.parent_bus
+            if pb not in dev2node:
+                continue
+
+            node = dev2node[dev]
+            node.conn = conn = ConnectionLineBox(node, dev2node[pb].busline)
+            self.conns.append(conn)
+
+        self.sync()
+
+    def iter_objects(self):
+        for n in self.nodes:
+            yield n
+            c = n.conn
+            if c is not None:
+                yield c
+        for bl in self.buslabels:
+            yield bl
+            yield bl.busline
+        for h in self.circles:
+            yield h
+
+    def place(self, obj):
+        try:
+            obj.x, obj.y = self.layout[obj.node.id][:2]
+        except KeyError:
+            pass
+        else:
+            return
+
+        left, top, right, bottom = find_empty_aabb(self.iter_objects(),
+            minw = obj.width + 4 * obj.spacing,
+            minh = obj.height + 4 * obj.spacing
+        )
+
+        if left is None:
+            if right is not None:
+                obj.x = right - obj.width - 2 * obj.spacing
+        else:
+            obj.x = left + 2 * obj.spacing
+
+        if top is None:
+            if bottom is not None:
+                obj.y = bottom - obj.height - 2 * obj.spacing
+        else:
+            obj.y = top + 2 * obj.spacing
+
+    def add_node(self, node):
+        self.place(node)
+        self.nodes.append(node)
+        self.dev2node[node.node] = node
+
+    def add_hub(self, hub):
+        self.place(hub)
+        self.circles.append(hub)
+        self.dev2node[hub.node] = hub
+
+    def add_buslabel(self, bl):
+        self.place(bl)
+        self.buslabels.append(bl)
+        self.buses.append(bl.busline)
+        self.dev2node[bl.node] = bl
+
+    def ph_bus_parent(self, bus):
+        return self.dev2node.get(bus.buslabel.node.parent_device)
+
+    def sync(self):
+        "Updates sizes of devices with child buses, bus lines and connections."
+
+        dev2node = self.dev2node
+
+        for n in self.nodes:
+            if not n.bus_labels:
+                continue
+
+            min_x = n.x + n.width + n.bus_padding
+            max_x = n.x - n.bus_padding
+
+            for bl in n.bus_labels:
+                min_x = min(min_x, bl.x + bl.offset[0] - n.bus_padding)
+                max_x = max(max_x, bl.x + bl.offset[0] + n.bus_padding)
+
+            n.width = max(max_x - min_x, n.text_width + n.padding)
+            if n.x > min_x:
+                n.x = min_x
+            if n.x + n.width < max_x:
+                n.x = max_x - n.width
+
+        for b in self.buses:
+            bl = b.buslabel
+            bus = bl.node
+
+            parent_node = dev2node.get(bus.parent_device)
+            if parent_node is None:
+                min_y = b.y + b.height + b.extra_length
+                max_y = b.y - b.extra_length
+            else:
+                min_y = parent_node.y - b.extra_length
+                max_y = parent_node.y + parent_node.height + b.extra_length
+
+            for n in [bl] + list(dev2node[dev] for dev in bus.devices
+                if dev in dev2node
+            ):
+                min_y = min(min_y, n.y - b.extra_length)
+                max_y = max(max_y, n.y + n.height + b.extra_length)
+
+            b.x = bl.x + bl.offset[0]
+            b.y = min_y
+            b.height = max_y - min_y
+
+        for c in self.conns:
+            c.update()
+
+    def tick(self):
+        """ Does an iteration of the simulation. Returns maximum displacement of
+an object. Note that velocity is not used because `sync` may hold an object,
+e.g. a device is held by its child bus labels.
+        """
+
+        dynamic = list(n for n in self.nodes + self.buslabels + self.circles
+            if not n.static
+        )
+
+        if not dynamic:
+            return 0
+
+        for n in dynamic:
+            n.vx = n.vy = 0
+
+        for __ in self.ph_co_reactions():
+            pass
+
+        prev = list((n.x, n.y) for n in dynamic)
+
+        integrate_velocities(dynamic, self.velocity_limit)
+
+        self.sync()
+
+        return max(max(abs(n.x - x), abs(n.y - y))
+            for n, (x, y) in zip(dynamic, prev)
+        )
+
+    def co_settle(self, eps = 0.1, ticks = 2000):
+        """ Iterates the simulation until objects are moving slower than `eps`
+(pixels per iteration) but no more than `ticks` times. Returns amount of done
+iterations. It's cancellable if offloaded to a `CoPool`.
+        """
+
+        i = 0
+        while i < ticks:
+            i += 1
+            if self.tick() < eps:
+                break
+
+            offload_progress()
+            yield True
+
+        raise CoReturn(i)
+
+    def gen_layout(self):
+        "Returns `MachineDiagramWidget` layout with dynamic layout disabled."
+
+        layout = {}
+
+        for n in self.nodes + self.buslabels + self.circles:
+            layout[n.node.id] = (n.x, n.y)
+
+        conf = dict(self.layout.get(-1, {}))
+        conf[LAYOUT_DYNAMIC] = False
+        # IRQ lines are straight
+        conf[LAYOUT_IRQ_LINES_POINTS] = dict(
+            (irq.id, []) for irq in self.mach.irqs
+        )
+        layout[-1] = conf
+
+        return layout
+
+
+def co_layout_machine(mach, layout = None, eps = 0.1, ticks = 2000, **kw):
+    """ Lays out machine description `mach` (see `MachineLayout` for
+arguments) and returns `MachineDiagramWidget` layout. It can be offloaded to
+a `CoPool`.
+    """
+
+    ml = MachineLayout(mach, layout = layout, **kw)
+    yield ml.co_settle(eps = eps, ticks = ticks)
+    raise CoReturn(ml.gen_layout())
@@ -8,6 +8,7 @@ __all__ = [
       , "PCIDeviceId"
       , "PCIClassId"
   , "PCIClassification"
+  , "pci_id_key"
 ]
 
 from re import (
@@ -18,10 +19,11 @@ from source import (
     Macro
 )
 from common import (
-    co_find_eq
+    co_find_eq,
+    lazy
 )
-from six.moves import (
-    range as xrange
+from six import (
+    integer_types
 )
 
 re_pci_vendor = compile("PCI_VENDOR_ID_([A-Z0-9_]+)")
@@ -48,6 +50,54 @@ class PCIVendorIdMismatch(ValueError):
 # TODO: create named exception instead of any Exception
 
 
+def pci_id_key(_id):
+    """ Returns key of PCI ID value (`int` or `str`) for indexes of
+`PCIClassification`. Numeric IDs have same key regardless of notation.
+    """
+    if isinstance(_id, integer_types):
+        return _id
+    try:
+        return int(_id, 0)
+    except ValueError:
+        return _id.upper()
+
+
+class IdBitmap(object):
+    "A set of IDs in [0, size) with fast search of the least unused ID."
+
+    def __init__(self, size):
+        self.size = size
+        self.bits = bytearray((size + 7) >> 3)
+        # All IDs below are used.
+        self.first_free = 0
+
+    def add(self, _id):
+        if isinstance(_id, integer_types) and 0 <= _id < self.size:
+            self.bits[_id >> 3] |= 1 << (_id & 7)
+
+    def __contains__(self, _id):
+        return bool(self.bits[_id >> 3] & (1 << (_id & 7)))
+
+    def find_free(self):
+        "Returns the least unused ID or `None`."
+
+        bits = self.bits
+        size = self.size
+        i = self.first_free
+
+        while i < size:
+            if not i & 7 and bits[i >> 3] == 0xFF:
+                # whole byte is used
+                i += 8
+            elif bits[i >> 3] & (1 << (i & 7)):
+                i += 1
+            else:
+                break
+
+        self.first_free = i
+        return i if i < size else None
+
+
 class PCIId(object):
     db = None # at the end of module the value will be defined
 
@@ -67,15 +117,16 @@ class PCIId(object):
 class PCIVendorId(PCIId):
 
     def __init__(self, vendor_name, vendor_id):
-        if vendor_name in PCIId.db.vendors.keys():
+        if vendor_name in PCIId.db.vendors:
             raise PCIVendorIdAlreadyExists(vendor_name)
 
         PCIId.__init__(self, vendor_name, vendor_id)
 
-        self.device_pattern = compile(
-                "PCI_DEVICE_ID_%s_([A-Z0-9_]+)" % self.name)
+        PCIId.db.add_vendor(self)
 
-        PCIId.db.vendors[self.name] = self
+    @lazy
+    def device_pattern(self):
+        return compile("PCI_DEVICE_ID_%s_([A-Z0-9_]+)" % self.name)
 
     def find_macro(self):
         return Type["PCI_VENDOR_ID_%s" % self.name]
@@ -91,18 +142,18 @@ class PCIDeviceId(PCIId):
 
     def __init__(self, vendor_name, device_name, device_id):
         dev_key = PCIClassification.gen_device_key(vendor_name, device_name)
-        if dev_key in PCIId.db.devices.keys():
+        if dev_key in PCIId.db.devices:
             raise PCIDeviceIdAlreadyExists("Vendor %s, Device %s" % vendor_name,
                     device_name)
 
         PCIId.__init__(self, device_name, device_id)
 
-        if vendor_name not in PCIId.db.vendors.keys():
+        if vendor_name not in PCIId.db.vendors:
             self.vendor = PCIVendorId(vendor_name, 0xFFFF)
         else:
             self.vendor = PCIId.db.vendors[vendor_name]
 
-        PCIId.db.devices[dev_key] = self
+        PCIId.db.add_device(dev_key, self)
 
     def find_macro(self):
         return Type["PCI_DEVICE_ID_%s_%s" % (self.vendor.name, self.name)]
@@ -118,12 +169,12 @@ class PCIDeviceId(PCIId):
 class PCIClassId(PCIId):
 
     def __init__(self, class_name, class_id):
-        if class_name in PCIId.db.classes.keys():
+        if class_name in PCIId.db.classes:
             raise Exception("PCI class %s already exists" % class_name)
 
         PCIId.__init__(self, class_name, class_id)
 
-        PCIId.db.classes[self.name] = self
+        PCIId.db.add_class(self)
 
     def find_macro(self):
         return Type["PCI_CLASS_%s" % self.name]
@@ -136,27 +187,127 @@ class PCIClassId(PCIId):
 
 
 class PCIClassification(object):
+    """ Database of PCI IDs. Besides name mappings, it maintains indexes:
+
+- `pci_id_key` -> list of vendors/devices/classes with such ID
+- trie of vendor name parts to get vendor of a device by macro name
+- bitmaps of used vendor and device IDs to generate unique IDs
+
+    """
 
     def __init__(self, built = False):
-        self.vendors = {}
-        self.devices = {}
-        self.classes = {}
         self.built = built
+        self._reset()
 
-    def clear(self):
+    def _reset(self):
         self.vendors = {}
         self.devices = {}
         self.classes = {}
+
+        self.vendors_by_id = {}
+        self.devices_by_id = {}
+        self.classes_by_id = {}
+
+        # Vendor name part -> subtrie. `None` key refers to `PCIVendorId`.
+        self.vendor_trie = {}
+
+        self.used_vids = IdBitmap(0xFFFF)
+        self.used_dids = IdBitmap(0xFFFF)
+
+    def clear(self):
+        self._reset()
         self.built = False
 
+    # Indexes are not pickled (e.g., into QVC cache) but rebuilt on loading.
+
+    def __getstate__(self):
+        return dict(
+            built = self.built,
+            vendors = self.vendors,
+            devices = self.devices,
+            classes = self.classes,
+        )
+
+    def __setstate__(self, state):
+        self.built = state["built"]
+        self._reset()
+
+        for vendor in state["vendors"].values():
+            self.add_vendor(vendor)
+
+        for dev_key, device in state["devices"].items():
+            self.add_device(dev_key, device)
+
+        for _class in state["classes"].values():
+            self.add_class(_class)
+
+    def add_vendor(self, vendor):
+        self.vendors[vendor.name] = vendor
+        key = pci_id_key(vendor.id)
+        self.vendors_by_id.setdefault(key, []).append(vendor)
+        self.used_vids.add(key)
+
+        node = self.vendor_trie
+        for part in vendor.name.split("_"):
+            node = node.setdefault(part, {})
+        node[None] = vendor
+
+    def add_device(self, dev_key, device):
+        self.devices[dev_key] = device
+        key = pci_id_key(device.id)
+        self.devices_by_id.setdefault(key, []).append(device)
+        self.used_dids.add(key)
+
+    def add_class(self, _class):
+        self.classes[_class.name] = _class
+        key = pci_id_key(_class.id)
+        self.classes_by_id.setdefault(key, []).append(_class)
+
+    def vendor_of_device(self, device_suffix):
+        """ Looks a vendor up by a device macro name without "PCI_DEVICE_ID_"
+prefix. If several vendor names are prefixes of the name, longest one is used.
+
+:returns: `PCIVendorId` and device name or `None`
+
+        """
+        parts = device_suffix.split("_")
+        node = self.vendor_trie
+        found = None
+
+        # at least one part is for the device name
+        for i in range(len(parts) - 1):
+            node = node.get(parts[i])
+            if node is None:
+                break
+            vendor = node.get(None)
+            if vendor is not None:
+                found = vendor, "_".join(parts[i + 1:])
+
+        return found
+
+    @staticmethod
+    def _find(index, values, kw):
+        try:
+            _id = kw["id"]
+        except KeyError:
+            return co_find_eq(values, **kw)
+
+        # Indexed candidates are checked against the request including exact
+        # ID value.
+        try:
+            key = pci_id_key(_id)
+        except (AttributeError, TypeError):
+            return co_find_eq(values, **kw)
+        return co_find_eq(index.get(key, ()), **kw)
+
     def find_vendors(self, **kw):
-        return co_find_eq(self.vendors.values(), **kw)
+        return self._find(self.vendors_by_id, self.vendors.values(), kw)
 
     def find_devices(self, **kw):
-        return co_find_eq(self.devices.values(), **kw)
+        return self._find(self.devices_by_id, self.devices.values(), kw)
 
     def find_classes(self, **kw):
-        return co_find_eq(self.classes.values(), **kw)
+        return self._find(self.classes_by_id, self.classes.values(), kw)
 
     def __gen_code__(self, gen):
         gen.reset_gen(self)
@@ -180,26 +331,18 @@ class PCIClassification(object):
         gen.line("del " + gen.nameof(self) + ".tmp")
 
     def gen_uniq_vid(self):
-        for i in xrange(0, 0xFFFF):
-            uid = "0x%X" % i
-            for v in self.vendors.values():
-                if v.id.upper() == uid:
-                    break
-            else:
-                return uid
-        # no uniq ID
-        return "0xDEAD"
+        uid = self.used_vids.find_free()
+        if uid is None:
+            # no uniq ID
+            return "0xDEAD"
+        return "0x%X" % uid
 
     def gen_uniq_did(self):
-        for i in xrange(0, 0xFFFF):
-            uid = "0x%X" % i
-            for d in self.devices.values():
-                if d.id.upper() == uid:
-                    break
-            else:
-                return uid
-        # no uniq ID
-        return "0xBEAF"
+        uid = self.used_dids.find_free()
+        if uid is None:
+            # no uniq ID
+            return "0xBEAF"
+        return "0x%X" % uid
 
     @staticmethod
     def build():
@@ -208,6 +351,8 @@ class PCIClassification(object):
         if db.built:
             db.clear()
 
+        devices = []
+
         for t in Type.reg.values():
             if type(t) == Macro:
                 mi = re_pci_vendor.match(t.name)
@@ -221,17 +366,17 @@ class PCIClassification(object):
                     PCIClassId(mi.group(1), t.text)
                     continue
 
-        # All PCI vendors must be defined before any device.
-        for t in Type.reg.values():
-            if type(t) == Macro:
                 mi = re_pci_device.match(t.name)
                 if mi:
-                    for v in db.vendors.values():
-                        mi = v.device_pattern.match(t.name)
-                        if mi:
-                            PCIDeviceId(v.name, mi.group(1), t.text)
-                            break
-                    continue
+                    devices.append((mi.group(1), t.text))
+
+        # All PCI vendors must be defined before any device.
+        vendor_of_device = db.vendor_of_device
+        for suffix, text in devices:
+            found = vendor_of_device(suffix)
+            if found is not None:
+                vendor, device_name = found
+                PCIDeviceId(vendor.name, device_name, text)
 
         db.built = True
 
@@ -292,16 +437,16 @@ class PCIClassification(object):
                 if did is None:
                     raise Exception("No identification information was got!")
                 # Return first device with such ID
-                for d in self.devices.values():
+                for d in self.devices_by_id.get(pci_id_key(did), ()):
                     if did.upper() == d.id.upper():
                         return d
                 raise Exception("No device with id %s was found!" % did.upper())
             # Try get vendor by device name
-            for v in self.vendors.values():
-                if v.device_pattern.match(name):
-                    break
-            else:
+            mi = re_pci_device.match(name)
+            found = mi and self.vendor_of_device(mi.group(1))
+            if not found:
                 raise Exception("Cannot get vendor by device name %s." % name)
+            v = found[0]
 
         if name is not None:
             dev_key = PCIClassification.gen_device_key(v.name, name)
@@ -343,7 +488,7 @@ class PCIClassification(object):
             return v
         elif vid is not None:
             v = None
-            for ven in self.vendors.values():
+            for ven in self.vendors_by_id.get(pci_id_key(vid), ()):
                 if ven.id == vid:
                     v = ven
                     break
@@ -3,12 +3,15 @@ __all__ = [
 ]
 
 from .build import (
+    apply_build_system_registrations,
+    recording_build_system_registrations,
     register_in_build_system,
     register_src_in_build_system,
 )
 from common import (
     callco,
     co_find_eq,
+    CoPool,
     makedirs,
     same_sets,
     shadow_open,
@@ -31,6 +34,9 @@ from .version_description import (
 from itertools import (
     count,
 )
+from multiprocessing import (
+    get_start_method,
+)
 from os.path import (
     isabs,
     join,
@@ -40,6 +46,30 @@ from os.path import (
 )
 
 
+# The project being generated by `QProject.co_gen_parallel` in a worker
+# process, see `_init_gen_worker`.
+_worker_project = None
+
+
+def _init_gen_worker(project):
+    # Workers are forked. So, the project is not pickled.
+    global _worker_project
+    _worker_project = project
+
+
+def _gen_in_worker(desc_idx, qemu_src, gen_cfg):
+    project = _worker_project
+    desc = project.descriptions[desc_idx]
+
+    if isinstance(desc, MachineNode):
+        desc.link()
+
+    with recording_build_system_registrations() as records:
+        callco(project.co_gen(desc, qemu_src, **gen_cfg))
+
+    return records
+
+
 class QProject(object):
 
     def __init__(self,
@@ -82,7 +112,13 @@ class QProject(object):
         "Backward compatibility wrapper for co_gen_all"
         callco(self.co_gen_all(*args, **kw))
 
-    def co_gen_all(self, qemu_src, **gen_cfg):
+    def co_gen_all(self, qemu_src, jobs = 1, **gen_cfg):
+        """
+    :param jobs:
+        if greater than 1, devices and machines are generated in parallel by
+        up to `jobs` processes, see `co_gen_parallel`
+
+        """
         disable_auto_lock_inclusions()
         qvd = QemuVersionDescription.current
 
@@ -97,31 +133,80 @@ class QProject(object):
             )
 
         # Firstly, generate all CPUs
+        if new_targets:
+            stc = qvd.qvc.stc
+            # Each CPU is generated in isolation to prevent problems with same
+            # named types. Restoring of the snapshot is much cheaper than
+            # re-initialization of the cache.
+            snapshot = stc.snapshot()
+
+        # Note that CPU generation patches many common files of Qemu. So,
+        # CPUs are always generated sequentially.
         for desc in self.descriptions:
             if isinstance(desc, CPUDescription):
                 yield desc.gen_type().co_gen(qemu_src, **gen_cfg)
+                stc.restore(snapshot)
 
-                enable_auto_lock_inclusions()
-                # Re-init cache to prevent problems with same named types
-                qvd.forget_cache()
-                yield qvd.co_init_cache()
-                # Replace forgotten dirty cache with new clean one
-                qvd.qvc.use()
-                disable_auto_lock_inclusions()
-
-        # Secondly, generate all devices
+        devices = []
+        machines = []
         for desc in self.descriptions:
-            if not isinstance(desc, (CPUDescription, MachineNode)):
+            if isinstance(desc, MachineNode):
+                machines.append(desc)
+            elif not isinstance(desc, CPUDescription):
+                devices.append(desc)
+
+        # fork is required to inherit the state of this process
+        parallel = jobs > 1 and get_start_method() == "fork"
+
+        # Secondly, generate all devices.
+        # Machines use types of devices. So, if there are machines,
+        # devices are generated in this process.
+        if parallel and not machines:
+            yield self.co_gen_parallel(devices, qemu_src, jobs, **gen_cfg)
+        else:
+            for desc in devices:
                 yield self.co_gen(desc, qemu_src, **gen_cfg)
 
         # Lastly, generate machines
-        for desc in self.descriptions:
-            if isinstance(desc, MachineNode):
+        if parallel:
+            yield self.co_gen_parallel(machines, qemu_src, jobs, **gen_cfg)
+        else:
+            for desc in machines:
                 desc.link()
                 yield self.co_gen(desc, qemu_src, **gen_cfg)
 
         enable_auto_lock_inclusions()
 
+    def co_gen_parallel(self, descriptions, qemu_src, jobs, **gen_cfg):
+        """ Generates independent `descriptions` by worker processes forked
+from this one. So, each worker has own copy of current `SourceTreeContainer`.
+Build system is patched by this process after all, in order of
+`descriptions`. So, the result is same as of sequential generation.
+        """
+        if not descriptions:
+            return
+
+        pool = CoPool(min(jobs, len(descriptions)),
+            initializer = _init_gen_worker,
+            initargs = (self,)
+        )
+
+        try:
+            tasks = list(
+                pool.offload(_gen_in_worker,
+                    self.descriptions.index(desc), qemu_src, gen_cfg
+                ) for desc in descriptions
+            )
+
+            all_records = []
+            for task in tasks:
+                all_records.append((yield task))
+        finally:
+            pool.terminate()
+
+        for records in all_records:
+            apply_build_system_registrations(records)
+
     def gen(self, *args, **kw):
         "Backward compatibility wrapper for co_gen"
         callco(self.co_gen(*args, **kw))
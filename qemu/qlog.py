@@ -6,21 +6,53 @@ __all__ = [
   , "TBCache"
   , "QTrace"
   , "QEMULog"
+  , "QLogIndex"
 ]
 
 
 from common import (
+    BadSectionFile,
+    dump_sections,
     ee,
     limit_stage,
+    LineIndex,
+    makedirs,
     pipeline,
+    qdtdirs,
+    rename_replacing,
+    SectionFile,
 )
 
+from bisect import (
+    bisect_left,
+    bisect_right,
+)
+from collections import (
+    deque,
+)
+from hashlib import (
+    md5,
+)
 from itertools import (
     count,
 )
+from multiprocessing import (
+    Pool,
+)
+from os import (
+    stat,
+)
+from os.path import (
+    isfile,
+    join,
+    realpath,
+)
 from re import (
     compile,
 )
+from six import (
+    PY3,
+)
 from traceback import (
     print_exc,
 )
@@ -29,6 +61,18 @@ from traceback import (
 # less value = more info
 DEBUG = ee("QLOG_DEBUG", "3")
 
+# Logs are read in binary mode because byte offsets (e.g., of `LineIndex`) are
+# given to `seek`. Lines are decoded by that function.
+if PY3:
+    def decode_line(line):
+        return line.decode("utf-8")
+else:
+    def decode_line(line):
+        return line
+
+# Default amount of log lines parsed by a worker at once in parallel mode.
+PARALLEL_CHUNK_LINES = ee("QLOG_PARALLEL_CHUNK_LINES", str(1 << 16))
+
 # Looks like Chain is a fast jump to already translated TB (searched in
 # the cache) using non constant address (e.g. from a guest register),
 # while linking is a redirection to constant address (e.g. from an
@@ -228,79 +272,115 @@ class CPUIORecompile(object):
         self.lineno = lineno
 
 
-class undefined: pass
-
 class TBCache(object):
+    """ Versioned cache of translated instructions, TBs and links between TBs.
 
-    def __init__(self, back):
-        self.map = {}
-        self.links = {}
+A new version is started each time a translated instruction overlaps an
+instruction of current version (i.e., guest code is re-translated) and on each
+linking. A lookup can be done in any version.
+
+Instead of a layer per version, the cache keeps one record per instruction
+start address. It's the instruction, if there is only one version of it, or
+a list of `(version, instruction)` pairs sorted by version. Only intervals of
+instructions of current version are kept to detect overlapping.
+    """
+
+    def __init__(self):
+        self.version = 0
+
+        # start address -> instruction or list of (version, instruction)
+        self.instrs = {}
+        # start address -> last TB index
         self.tbMap = {}
-        self.back = back
-
-        # remembers resolutions by `back` reference
-        self.back_map_lookup_cache = {}
-
-    def lookTBDown(self, addr):
-        "Returns TB index and corresponding cache or None"
-        c = self
-        while c:
-            if addr in c.tbMap:
-                return (c.tbMap[addr], c)
-            c = c.back
-        return None
+        # TB index -> list of (version, TB index)
+        self.links = {}
 
-    def lookLinkDown(self, start_id):
-        c = self
-        while c:
-            if start_id in c.links:
-                return (c.links[start_id], c)
-            c = c.back
-        return None
+        # Sorted not overlapping intervals of instructions of current version.
+        self.starts = []
+        self.ends = []
+
+    def new_version(self):
+        self.version += 1
+        self.starts = []
+        self.ends = []
+
+    def lookTB(self, addr):
+        "Returns index of last TB starting at `addr` or `None`."
+        return self.tbMap.get(addr, None)
+
+    def lookLink(self, start_id, version = None):
+        "Returns TB index linked to TB `start_id` in `version` or `None`."
+
+        links = self.links.get(start_id, None)
+        if links is None:
+            return None
+
+        return _look_version(links, self.version if version is None
+            else version
+        )
+
+    def lookInstr(self, addr, version = None):
+        "Returns instruction starting at `addr` in `version` or `None`."
+
+        i = self.instrs.get(addr, None)
+        if i is None:
+            return None
+
+        if version is None:
+            version = self.version
+
+        if isinstance(i, list):
+            return _look_version(i, version)
+
+        if i.cache_version <= version:
+            return i
 
-    def lookInstrDown(self, addr):
-        upper_mlc = None
-        mlc = None
-
-        c = self
-        while c:
-            i = c.map.get(addr, None)
-            # `addr` is not at the beginning of `i`. Hence, `i` probably
-            # overwrites the instruction a caller looks for.
-            if i is not None and i.addr == addr:
-                res = (i, c)
-                if upper_mlc is not None:
-                    upper_mlc[addr] = res
-                return res
-
-            upper_mlc = mlc
-
-            mlc = c.back_map_lookup_cache
-            res = mlc.get(addr, undefined)
-            if res is not undefined:
-                if upper_mlc is not None:
-                    upper_mlc[addr] = res
-                return res
-
-            c = c.back
-
-        # Backing caches are considered constant.
-        # So, we can remember misses in too.
-        self.back_map_lookup_cache[addr] = None
         return None
 
     def commit(self, instr):
-        m = self.map
-        for addr in range(instr.addr, instr.addr + instr.size):
-            m[addr] = instr
+        addr = instr.addr
+        version = self.version
+
+        instr.cache_version = version
+
+        instrs = self.instrs
+        prev = instrs.get(addr, None)
+        if prev is None:
+            instrs[addr] = instr
+        elif isinstance(prev, list):
+            prev.append((version, instr))
+        else:
+            instrs[addr] = [(prev.cache_version, prev), (version, instr)]
+
+        idx = bisect_left(self.starts, addr)
+        self.starts.insert(idx, addr)
+        self.ends.insert(idx, addr + instr.size)
+
+    def add_link(self, start_id, end_id):
+        self.links.setdefault(start_id, []).append((self.version, end_id))
 
     def overlaps(self, addr, size):
-        m = self.map
-        for addr in range(addr, addr + size):
-            if addr in m:
-                return True
+        "Does [`addr`, `addr` + `size`) overlap an instruction of current version?"
+
+        # Last interval starting before the end of given one.
+        idx = bisect_left(self.starts, addr + size) - 1
+        return idx >= 0 and self.ends[idx] > addr
 
-        return False
+
+def _look_version(versions, version):
+    "Returns last value of sorted (version, value) list not newer `version`."
+
+    lo, hi = 0, len(versions)
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if versions[mid][0] <= version:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    if lo:
+        return versions[lo - 1][1]
+    return None
 
 
 hexDigits = set("0123456789abcdefABCDEF")
@@ -374,14 +454,133 @@ class EOL:
 
 EMPTY = tuple()
 
+def parse_in_asm(in_asm):
+    "Returns `InInstr`s of in_asm record lines. Multiline ones are joined."
+
+    instrs = []
+
+    prev_instr = None
+    for l in in_asm:
+        try:
+            instr = InInstr(l)
+        except:
+            print("Bad instruction: '%s'" % l.rstrip())
+            print_exc()
+            continue
+
+        if not instr.opcode:
+            if prev_instr is None:
+                raise RuntimeError(
+                    "in_asm record starts with an instruction tail:\n" +
+                    "\n".join(in_asm) + "\n"
+                )
+            if DEBUG < 3:
+                print("Join multiline instruction '%s' + '%s'" % (
+                    prev_instr, instr
+                ))
+            prev_instr.bytes += instr.bytes
+            prev_instr.size += instr.size
+            prev_instr.l += "\n" + instr.l
+        else:
+            if prev_instr is None:
+                instr.first = True
+            else:
+                # Some QEMU disassembler implementations do not provide
+                # bytes of instructions.
+                if prev_instr.size is None:
+                    prev_instr.size = instr.addr - prev_instr.addr
+
+                instrs.append(prev_instr)
+
+            prev_instr = instr
+
+    if prev_instr is None:
+        # All instructions are bad or in_asm is empty?
+        return instrs
+
+    if prev_instr.size is None:
+        # TODO: how to get it if disassembler did not provide bytes?
+        prev_instr.size = 1
+
+    instrs.append(prev_instr)
+    return instrs
+
+
+def parse_trace(trace, skipped, lineno):
+    "Returns `QTrace` of trace record lines or `None` if it's not executed."
+
+    if DEBUG < 1:
+        print("--- trace")
+        print("".join(trace))
+
+    if skipped:
+        addr = trace[-1][37:].split()[0]
+        if addr in trace[0]:
+            if DEBUG < 2:
+                print("Skipping not executed trace at line %s:\n%s" % (
+                    lineno, "".join(trace)
+                ))
+            return None
+        elif DEBUG < 3:
+            # We don't skip the trace because at least one TB is executed.
+            # Getting really executed TB's is an interesting problem...
+            # Don't use linking (not chaining) if you want a precise log.
+            # The situation is a corner case, so print it in less verbose
+            # debug mode too.
+            print("TB chain with skipped tail at line " + str(lineno))
+
+    return QTrace(trace, lineno)
+
+
 class QEMULog(object):
+    """ Execution trace reconstructed from a QEMU log. The log is parsed
+lazily by `iter_instructions`.
+
+:param index: `QLogIndex` of the log, it allows to `seek`
+:param jobs: if greater than 1, the log is parsed in two phases. First,
+    `jobs` worker processes split chunks of the log into records (see
+    `_parse_chunk`). Then, the records are applied sequentially. The result is
+    the same. `limit` disables it.
+:param chunk_lines: amount of log lines given to a worker at once, it's
+    rounded up to `LineIndex.lines_chunk`
+:param keep_trace: keep all `QTrace`s in `trace` list and link them by `prev`
+    & `next`. Without it, memory consumption does not grow during parsing.
 
-    def __init__(self, file_name, limit = None):
+    """
+
+    def __init__(self, file_name,
+        limit = None,
+        index = None,
+        jobs = 1,
+        chunk_lines = PARALLEL_CHUNK_LINES,
+        keep_trace = True
+    ):
         self.file_name = file_name
+        self.limit = limit
+        self.index = index
+        self.jobs = jobs
+        self.chunk_lines = chunk_lines
+        self.keep_trace = keep_trace
+
+        # `QLogIndex` sets those lists while it's being built.
+        # (icount, line number, cache version) of traces
+        self.checkpoints = None
+        self.checkpoint_interval = None
+        # line numbers of in_asm & linking records
+        self.cache_records = None
+
+        self.file = None
+        self._line_index = None
+        self.reset()
+
+    def reset(self, checkpoint = None):
+        """ Restarts parsing from the beginning or from given `checkpoint` of
+the `index`.
+        """
+
         self.trace = []
-        self.in_asm = []
 
-        self.current_cache = TBCache(None)
+        self.cache = TBCache()
         self.tbCounter = count(0)
         # across all caches
         # id -> (first addr, cache version)
@@ -391,42 +590,199 @@ class QEMULog(object):
 
         self.prevTrace = None
 
-        stages = [qlog_reader_stage(open(file_name, "r"))]
-        if limit is not None:
-            stages.append(limit_stage(limit))
-        stages.append(self.feed())
-        stages.append(self.trace_stage())
+        if self.file is not None:
+            self.file.close()
+        self.file = f = open(self.file_name, "rb")
+
+        if checkpoint is None:
+            lineno = 1
+            icount = 0
+            offset = 0
+        else:
+            icount, lineno, offset, version = checkpoint
+
+            self.replay_cache_records(f, offset)
+            if self.cache.version != version:
+                raise ValueError("Index does not match log " + self.file_name)
+
+            f.seek(offset)
+
+        if self.jobs > 1 and self.limit is None:
+            stages = [
+                self.iter_parallel_records(lineno - 1, offset),
+                self.feed_records(),
+            ]
+        else:
+            stages = [qlog_reader_stage(f)]
+            if self.limit is not None:
+                stages.append(limit_stage(self.limit))
+            stages.append(self.feed(lineno))
+        stages.append(self.trace_stage(icount))
 
         self.pipeline = pipeline(*stages)
 
+    def replay_cache_records(self, f, offset):
+        """ Applies in_asm and linking records of the log `f` those are
+before `offset` to the cache. Offsets of the records are taken from the
+`index`.
+        """
+
+        match = re_line.match
+        readline = f.readline
+        seek = f.seek
+
+        for record in self.index.cache_records:
+            if record >= offset:
+                break
+
+            seek(record)
+            l = decode_line(readline())
+
+            if match(l).lastgroup == "l":
+                self.new_linking(l)
+                continue
+
+            in_asm = []
+            while True:
+                l = decode_line(readline())
+                if not l or match(l).lastgroup != "i":
+                    break
+                in_asm.append(l)
+
+            self.new_in_asm(in_asm)
+
+    @property
+    def line_index(self):
+        "`LineIndex` of the log. It's taken from the `index`, if ready."
+
+        index = self.index
+        if index is not None and index.ready:
+            return index.line_index
+
+        line_index = self._line_index
+        if line_index is None:
+            line_index = self._line_index = LineIndex()
+            with open(self.file_name, "rb") as f:
+                line_index.build(f)
+        return line_index
+
+    def iter_parallel_records(self, lineidx, offset):
+        """ Yields records of the log starting from `lineidx`-th line at
+`offset`. Chunks are split into records by worker processes. First phase of
+parallel parsing.
+        """
+
+        line_index = self.line_index
+        lines_chunk = line_index.lines_chunk
+        total_lines = line_index.total_lines
+        chunk_lines = -(-self.chunk_lines // lines_chunk) * lines_chunk
+
+        def iter_jobs():
+            start, start_offset = lineidx, offset
+            first = True
+            while start < total_lines:
+                end = (start // chunk_lines + 1) * chunk_lines
+                yield (self.file_name, start, start_offset, end - start, first)
+                first = False
+                start = end
+                if start < total_lines:
+                    start_offset = line_index.lookup(start)[1]
+
+        jobs = self.jobs
+        pool = Pool(jobs)
+        try:
+            jobs_iter = iter_jobs()
+            pending = deque()
+
+            # Results of not too many chunks are waiting in memory.
+            for job in jobs_iter:
+                pending.append(pool.apply_async(_parse_chunk, job))
+                if len(pending) >= 2 * jobs:
+                    break
+
+            while pending:
+                records = pending.popleft().get()
+                for job in jobs_iter:
+                    pending.append(pool.apply_async(_parse_chunk, job))
+                    break
+
+                for record in records:
+                    yield record
+        finally:
+            pool.terminate()
+
+        # `feed_records` will terminate the pipeline.
+        while True:
+            yield EOL
+
+    def feed_records(self):
+        """ Applies records from `iter_parallel_records`. Second phase of
+parallel parsing. It yields same steps at same moments as `feed` does.
+        """
+
+        to_yield = None
+
+        record = yield
+        while record is not EOL:
+            kind, lineno, obj = record
+
+            if kind == "a":
+                self.commit_in_asm(obj, lineno)
+                record = yield
+            elif kind == "l":
+                self.new_linking(obj, lineno)
+                record = yield
+            else:
+                if kind == "t" and obj is not None:
+                    obj = self.commit_trace(obj)
+                # "I" & "R" records are ready steps.
+                record = yield to_yield
+                to_yield = obj
+
+        yield to_yield
+        yield EOL
+
+    def seek(self, icount):
+        """ Restarts parsing from nearest `index` checkpoint before `icount`-th
+execution step. Only in_asm and linking records of the log before the
+checkpoint are parsed (to restore the cache).
+        """
+        self.reset(self.index.lookup(icount))
+
     def iter_instructions(self):
         for chunk in self.pipeline:
             for i in chunk:
                 yield i
 
+    def iter_window(self, start, end = None):
+        "Yields execution steps with icount in [`start`, `end`)."
+
+        self.seek(start)
+
+        for i in self.iter_instructions():
+            icount = i.icount
+            if icount < start:
+                continue
+            if end is not None and icount >= end:
+                break
+            yield i
+
     def lookInstr(self, addr, fromCache = None):
-        if fromCache is None:
-            return self.current_cache.lookInstrDown(addr)
-        elif fromCache == len(self.in_asm):
-            return self.current_cache.lookInstrDown(addr)
-        else:
-            return self.in_asm[fromCache].lookInstrDown(addr)
+        "Returns instruction at `addr` in given cache version or `None`."
+        return self.cache.lookInstr(addr, fromCache)
 
     def lookLink(self, start_id, fromCache = None):
+        "Returns index of TB linked to TB `start_id` or `None`."
         if start_id > self.max_linked_tb:
             return None
 
-        if fromCache is None:
-            return self.current_cache.lookLinkDown(start_id)
-        elif fromCache == len(self.in_asm):
-            return self.current_cache.lookLinkDown(start_id)
-        else:
-            return self.in_asm[fromCache].lookLinkDown(start_id)
+        return self.cache.lookLink(start_id, fromCache)
 
-    def trace_stage(self):
+    def trace_stage(self, next_icount = 0):
         ready_instrs = []
 
-        next_icount = 0
+        checkpoints = self.checkpoints
+        next_checkpoint = next_icount
 
         t = yield
         while True:
@@ -452,12 +808,16 @@ class QEMULog(object):
                     yield ready_instrs
                 break
 
+            if checkpoints is not None and next_icount >= next_checkpoint:
+                # No execution steps are pending here. So, parsing can be
+                # restarted from this trace.
+                checkpoints.append((next_icount, t.lineno, t.cacheVersion))
+                next_checkpoint = next_icount + self.checkpoint_interval
+
             addr = t.firstAddr
             instr = self.lookInstr(addr, t.cacheVersion)
 
             if instr is not None:
-                instr = instr[0]
-
                 instr = TraceInstr(instr, t, next_icount)
                 next_icount += 1
 
@@ -484,12 +844,8 @@ class QEMULog(object):
 
                     nextTB = False
 
-                    if nextInstr is None:
+                    if nextInstr is None or nextInstr.tb != tb:
                         nextTB = True
-                    else:
-                        nextInstr = nextInstr[0]
-                        if nextInstr.tb != tb:
-                            nextTB = True
 
                     if nextTB:
                         nextTbIdx = self.lookLink(tb, t.cacheVersion)
@@ -497,8 +853,6 @@ class QEMULog(object):
                             # chain is over
                             break
 
-                        nextTbIdx = nextTbIdx[0]
-
                         if nextTbIdx in visitedTb:
                             if DEBUG < 2:
                                 print("link loop %u -> ... -> %u" % (
@@ -519,8 +873,6 @@ class QEMULog(object):
                         if nextInstr is None:
                             break
 
-                        nextInstr = nextInstr[0]
-
                     instr = TraceInstr(nextInstr, None, next_icount)
                     next_icount += 1
 
@@ -531,9 +883,7 @@ class QEMULog(object):
                 t = (yield EMPTY)
 
     def cache_overwritten(self):
-        cur = self.current_cache
-        self.in_asm.append(cur)
-        self.current_cache = TBCache(cur)
+        self.cache.new_version()
 
     def new_int(self, lines, lineno):
         if DEBUG < 1:
@@ -547,76 +897,39 @@ class QEMULog(object):
 
         return CPUIORecompile(line, lineno)
 
-    def new_in_asm(self, in_asm):
+    def new_in_asm(self, in_asm, lineno = None):
         if DEBUG < 1:
             print("--- in_asm")
             print("".join(in_asm))
 
+        self.commit_in_asm(parse_in_asm(in_asm), lineno)
+
+    def commit_in_asm(self, instrs, lineno = None):
+        records = self.cache_records
+        if records is not None:
+            records.append(lineno)
+
         tb = next(self.tbCounter)
 
         # cache reference
         commit_instr = self.commit_instr
 
-        prev_instr = None
-        for l in in_asm:
-            try:
-                instr = InInstr(l)
-            except:
-                print("Bad instruction: '%s'" % l.rstrip())
-                print_exc()
-                continue
-
-            if not instr.opcode:
-                if prev_instr is None:
-                    raise RuntimeError(
-                        "in_asm record starts with an instruction tail:\n" +
-                        "\n".join(in_asm) + "\n"
-                    )
-                if DEBUG < 3:
-                    print("Join multiline instruction '%s' + '%s'" % (
-                        prev_instr, instr
-                    ))
-                prev_instr.bytes += instr.bytes
-                prev_instr.size += instr.size
-                prev_instr.l += "\n" + instr.l
-            else:
-                instr.tb = tb
-
-                if prev_instr is None:
-                    instr.first = True
-                else:
-                    # Some QEMU disassembler implementations do not provide
-                    # bytes of instructions.
-                    if prev_instr.size is None:
-                        prev_instr.size = instr.addr - prev_instr.addr
-
-                    commit_instr(prev_instr, tb)
-
-                prev_instr = instr
-
-        if prev_instr is None:
-            # All instructions are bad or in_asm is empty?
-            return
-
-        if prev_instr.size is None:
-            # TODO: how to get it if disassembler did not provide bytes?
-            prev_instr.size = 1
-
-        commit_instr(prev_instr, tb)
+        for instr in instrs:
+            instr.tb = tb
+            commit_instr(instr, tb)
 
     def commit_instr(self, instr, tb):
-        cache = self.current_cache
+        cache = self.cache
         if cache.overlaps(instr.addr, instr.size):
             self.cache_overwritten()
-            cache = self.current_cache
 
             # if at least one instruction of a TB overlaps another TB,
             # the overlapping TB becomes related to new cache version.
             if not instr.first:
-                self.tbIdMap[tb][1] = len(self.in_asm)
+                self.tbIdMap[tb][1] = cache.version
 
         if instr.first:
-            self.tbIdMap[tb] = [instr.addr, len(self.in_asm)]
+            self.tbIdMap[tb] = [instr.addr, cache.version]
 
             # It looks like, only first byte of an instruction is
             # really needed to be accounted in tbMap.
@@ -625,28 +938,16 @@ class QEMULog(object):
         cache.commit(instr)
 
     def new_trace(self, trace, skipped, lineno):
-        if DEBUG < 1:
-            print("--- trace")
-            print("".join(trace))
-
-        if skipped:
-            addr = trace[-1][37:].split()[0]
-            if addr in trace[0]:
-                if DEBUG < 2:
-                    print("Skipping not executed trace at line %s:\n%s" % (
-                        lineno, "".join(trace)
-                    ))
-                return None
-            elif DEBUG < 3:
-                # We don't skip the trace because at least one TB is executed.
-                # Getting really executed TB's is an interesting problem...
-                # Don't use linking (not chaining) if you want a precise log.
-                # The situation is a corner case, so print it in less verbose
-                # debug mode too.
-                print("TB chain with skipped tail at line " + str(lineno))
-
-        t = QTrace(trace, lineno)
-        t.cacheVersion = len(self.in_asm)
+        t = parse_trace(trace, skipped, lineno)
+        if t is None:
+            return None
+        return self.commit_trace(t)
+
+    def commit_trace(self, t):
+        t.cacheVersion = self.cache.version
+
+        if not self.keep_trace:
+            return t
 
         t.prev = self.prevTrace
         if self.prevTrace is not None:
@@ -658,10 +959,14 @@ class QEMULog(object):
 
         return t
 
-    def new_linking(self, linking):
+    def new_linking(self, linking, lineno = None):
         if DEBUG < 1:
             print("--- linking")
 
+        records = self.cache_records
+        if records is not None:
+            records.append(lineno)
+
         self.cache_overwritten()
 
         try:
@@ -673,9 +978,9 @@ class QEMULog(object):
             start = int(start_addr, base = 16)
             end = int(end_addr, base = 16)
 
-            c = self.current_cache
-            start_tb = c.lookTBDown(start)
-            end_tb = c.lookTBDown(end)
+            c = self.cache
+            start_tb = c.lookTB(start)
+            end_tb = c.lookTB(end)
         except:
             print("linking bad: " + linking)
             print_exc()
@@ -691,13 +996,12 @@ class QEMULog(object):
             print("End " + end_tb + " TB is not found")
             return
 
-        link_start = start_tb[0]
-        if link_start > self.max_linked_tb:
-            self.max_linked_tb = link_start
+        if start_tb > self.max_linked_tb:
+            self.max_linked_tb = start_tb
 
-        c.links[link_start] = end_tb[0]
+        c.add_link(start_tb, end_tb)
         if DEBUG < 1:
-            print("%x:%u -> %x:%u" % (start, start_tb[0], end, end_tb[0]))
+            print("%x:%u -> %x:%u" % (start, start_tb, end, end_tb))
 
     def new_unrecognized(self, l, lineno):
         l = l.rstrip()
@@ -705,9 +1009,8 @@ class QEMULog(object):
             print("--- new_unrecognized line %d" % lineno)
             print(l)
 
-    def feed(self):
+    def feed(self, lineno = 1):
         match = re_line.match
-        lineno = 1
         l0 = yield
 
         if l0 is not EOL:
@@ -718,6 +1021,7 @@ class QEMULog(object):
         while l0 is not EOL:
             if g0 == "a":
                 in_asm = []
+                in_asm_lineno = lineno
                 l1 = yield; lineno += 1 # Those operations are always together.
                 while l1 is not EOL:
                     g1 = match(l1).lastgroup
@@ -731,7 +1035,7 @@ class QEMULog(object):
                 else:
                     l0 = l1
 
-                self.new_in_asm(in_asm)
+                self.new_in_asm(in_asm, in_asm_lineno)
                 continue
 
             if g0 == "t":
@@ -771,7 +1075,7 @@ class QEMULog(object):
                 continue
 
             if g0 == "l":
-                self.new_linking(l0)
+                self.new_linking(l0, lineno)
                 l0 = yield; lineno += 1
                 if l0 is not EOL:
                     g0 = match(l0).lastgroup
@@ -826,12 +1130,256 @@ class QEMULog(object):
 
 
 def qlog_reader_stage(f):
-    yield
-
+    # Note, first stage of a pipeline is never `send`-ed input. So, it must
+    # not `yield` `None` at start. Else, `feed` gets it as a log line.
     for line in f:
-        yield line
+        yield decode_line(line)
 
     # Note, `QEMULog.feed` will terminate the pipeline.
     while True:
         yield EOL
 
+
+class _ChunkParser(QEMULog):
+    "Accumulates records `feed` gives to it. See `_parse_chunk`."
+
+    def __init__(self):
+        # (kind, line number, object)
+        self.records = []
+
+    def new_in_asm(self, in_asm, lineno = None):
+        self.records.append(("a", lineno, parse_in_asm(in_asm)))
+
+    def new_trace(self, trace, skipped, lineno):
+        self.records.append(("t", lineno,
+            parse_trace(trace, skipped, lineno)
+        ))
+
+    def new_linking(self, linking, lineno = None):
+        self.records.append(("l", lineno, linking))
+
+    def new_int(self, lines, lineno):
+        self.records.append(("I", lineno,
+            QEMULog.new_int(self, lines, lineno)
+        ))
+
+    def new_cpu_io_recompile(self, line, lineno):
+        self.records.append(("R", lineno,
+            QEMULog.new_cpu_io_recompile(self, line, lineno)
+        ))
+
+
+def _is_record_start(line, match = re_line.match):
+    # `feed` always starts a new record at those lines.
+    return match(line).lastgroup in ("a", "t")
+
+
+def _parse_chunk(file_name, lineidx, offset, lines, first):
+    """ Splits the log into records. Only records starting at lines from
+`lineidx` to `lineidx` + `lines` are returned. Lines before first in_asm or
+trace record belong to previous chunk, unless the chunk is `first`. Last record
+of the chunk ends in next chunk.
+    """
+
+    parser = _ChunkParser()
+    lineno = lineidx + 1 # `LineIndex` is 0-based
+    end = lineno + lines
+
+    feed = None
+    with open(file_name, "rb") as f:
+        f.seek(offset)
+        for l in f:
+            l = decode_line(l)
+            if feed is None:
+                if lineno >= end:
+                    break
+                if first or _is_record_start(l):
+                    feed = parser.feed(lineno)
+                    next(feed)
+                else:
+                    lineno += 1
+                    continue
+            elif lineno >= end and _is_record_start(l):
+                break
+
+            feed.send(l)
+            lineno += 1
+
+    if feed is not None:
+        # flush last record
+        feed.send(EOL)
+
+    return parser.records
+
+
+# Persistent QEMU log index file format identifier. Change it if the format or
+# the parser is changed.
+QLI_MAGIC = b"QDT_QLI\x02"
+
+# Extension of persistent QEMU log index file.
+QLI_EXT = u".qli"
+
+QLOG_INDEXES_DIR = join(qdtdirs.user_cache_dir, "qlog_index")
+
+# Default amount of execution steps between checkpoints.
+CHECKPOINT_INTERVAL = 10000
+
+QLI_KEY = "key"
+QLI_LINE_INDEX = "line_index"
+QLI_CHECKPOINTS = "checkpoints"
+QLI_CACHE_RECORDS = "cache_records"
+QLI_COUNT = "count"
+
+
+class QLogIndex(object):
+    """ Persistent index of a QEMU log for `QEMULog.seek`. It's built by one
+full parsing of the log.
+
+The index contains checkpoints of the parser state. A checkpoint is a tuple of
+icount of first step of a trace record, its line number, file offset and the
+version of `TBCache`. The cache is restored by replaying in_asm and linking
+records before the checkpoint. So, offsets of those records are indexed too.
+`LineIndex` of the log is preserved for random access to the log lines.
+
+Usage:
+
+    index = QLogIndex.for_log(file_name)
+    if not index.ready:
+        index.build()
+        index.save()
+    qlog = QEMULog(file_name, index = index)
+    for instr in qlog.iter_window(1000000, 1001000):
+        ...
+
+    """
+
+    def __init__(self, file_name, key,
+        path = None,
+        sections = None,
+        checkpoint_interval = CHECKPOINT_INTERVAL
+    ):
+        self.file_name = file_name
+        self.key = key
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.changed = False
+
+        self.line_index = None
+        # (icount, line number, offset, cache version), sorted by icount
+        self.checkpoints = []
+        # offsets of in_asm & linking records
+        self.cache_records = []
+        # amount of execution steps
+        self.count = None
+
+        if sections is not None:
+            self.line_index = sections[QLI_LINE_INDEX]
+            self.checkpoints = sections[QLI_CHECKPOINTS]
+            self.cache_records = sections[QLI_CACHE_RECORDS]
+            self.count = sections[QLI_COUNT]
+
+    @classmethod
+    def for_log(klass, file_name, **kw):
+        """ Loads the index of the log or creates an empty one (not `ready`).
+        """
+
+        st = stat(file_name)
+        key = ("stat", st.st_size, st.st_mtime)
+
+        makedirs(QLOG_INDEXES_DIR, exist_ok = True)
+        path_hash = md5(realpath(file_name).encode("utf-8")).hexdigest()
+        path = join(QLOG_INDEXES_DIR, path_hash + QLI_EXT)
+
+        if isfile(path):
+            try:
+                sections = SectionFile(path, QLI_MAGIC)
+                if sections[QLI_KEY] == key:
+                    return klass(file_name, key,
+                        path = path,
+                        sections = sections,
+                        **kw
+                    )
+            except (BadSectionFile, EnvironmentError, EOFError, ValueError,
+                KeyError
+            ):
+                print("Bad QEMU log index file %s, it will be rebuilt" % path)
+
+        return klass(file_name, key, path = path, **kw)
+
+    @property
+    def ready(self):
+        return self.line_index is not None
+
+    def build(self):
+        for __ in self.co_build():
+            pass
+
+    def co_build(self):
+        file_name = self.file_name
+
+        line_index = LineIndex()
+        with open(file_name, "rb") as f:
+            for __ in line_index.co_build(f):
+                yield True
+
+        qlog = QEMULog(file_name)
+        qlog.checkpoints = checkpoints = []
+        qlog.checkpoint_interval = self.checkpoint_interval
+        qlog.cache_records = records = []
+
+        count = 0
+        for chunk in qlog.pipeline:
+            count += len(chunk)
+            yield True
+
+        qlog.file.close()
+
+        # Line numbers are 1-based, unlike `LineIndex`.
+        with open(file_name, "rb") as f:
+            offsets = line_index.iter_offsets(f,
+                (lineno - 1 for __, lineno, __ in checkpoints)
+            )
+            self.checkpoints = list(
+                (icount, lineno, offset, version)
+                for (icount, lineno, version), offset in zip(checkpoints,
+                    offsets
+                )
+            )
+            self.cache_records = list(line_index.iter_offsets(f,
+                (lineno - 1 for lineno in records)
+            ))
+
+        self.line_index = line_index
+        self.count = count
+        self.changed = True
+
+    def lookup(self, icount):
+        "Returns last checkpoint not after `icount` or `None`."
+
+        checkpoints = self.checkpoints
+        i = bisect_right(checkpoints, (icount, float("inf")))
+        if i:
+            return checkpoints[i - 1]
+        return None
+
+    def iter_sections(self):
+        yield QLI_KEY, self.key
+        yield QLI_LINE_INDEX, self.line_index
+        yield QLI_CHECKPOINTS, self.checkpoints
+        yield QLI_CACHE_RECORDS, self.cache_records
+        yield QLI_COUNT, self.count
+
+    def save(self):
+        "Writes the index to `path` if it's changed."
+
+        if not self.changed or self.path is None:
+            return
+
+        data = dump_sections(QLI_MAGIC, self.iter_sections())
+
+        tmp_path = self.path + u".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        rename_replacing(tmp_path, self.path)
+
+        self.changed = False
@@ -0,0 +1,295 @@
+__all__ = [
+    "TraceColumns"
+  , "TraceColumnsWriter"
+  , "export_columns"
+  , "STEP_INSTR"
+  , "STEP_INT"
+]
+
+from .qlog import (
+    LogInt,
+)
+from common import (
+    makedirs,
+)
+
+from array import (
+    array,
+)
+from collections import (
+    Counter,
+)
+from itertools import (
+    compress,
+)
+from operator import (
+    not_,
+)
+from os.path import (
+    join,
+)
+from six.moves.cPickle import (
+    dump,
+    load,
+)
+from sys import (
+    byteorder,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Columnar trace format identifier. Change it if the format is changed.
+TC_MAGIC = b"QDT_QTC\x01"
+
+TC_META = "meta"
+TC_EXT = ".bin"
+
+# Values of "kind" column.
+STEP_INSTR = 0
+STEP_INT = 1
+
+
+def _int64_typecode(codes):
+    for c in codes:
+        try:
+            if array(c).itemsize == 8:
+                return c
+        except ValueError: # no such type code (Py2)
+            pass
+    raise RuntimeError("No 64-bit array type code among " + repr(codes))
+
+
+I64 = _int64_typecode("ql")
+U64 = _int64_typecode("QL")
+
+# Name and `array` type code of each column.
+# Fields of an interrupt step those are meaningless are -1 (addr is 0).
+COLUMNS = (
+    ("icount", U64),
+    ("addr", U64),
+    ("tb", I64),
+    ("version", I64),
+    ("kind", "B"),
+)
+
+
+class TraceColumnsWriter(object):
+    """ Writes execution steps (`TraceInstr` & `LogInt`) of `QEMULog` to
+`path` directory in columnar form. Each column is a file of native machine
+values. Steps are buffered in `array`s and written by chunks. So, the memory
+consumption does not depend on the trace size.
+    """
+
+    def __init__(self, path, flush_steps = 1 << 16):
+        self.path = path
+        self.flush_steps = flush_steps
+        self.count = 0
+
+        makedirs(path, exist_ok = True)
+
+        self.buffers = list(array(tc) for __, tc in COLUMNS)
+        self.files = list(open(join(path, name + TC_EXT), "wb")
+            for name, __ in COLUMNS
+        )
+
+    def append(self, step):
+        icount, addr, tb, version, kind = self.buffers
+
+        icount.append(step.icount)
+
+        if isinstance(step, LogInt):
+            addr.append(0)
+            tb.append(-1)
+            version.append(-1)
+            kind.append(STEP_INT)
+        else:
+            addr.append(step.addr)
+            tb.append(step.tb)
+            version.append(step.cache_version)
+            kind.append(STEP_INSTR)
+
+        if len(kind) >= self.flush_steps:
+            self.flush()
+
+    def extend(self, steps):
+        append = self.append
+        for step in steps:
+            append(step)
+
+    def flush(self):
+        buffers = self.buffers
+        self.count += len(buffers[0])
+
+        for i, (buf, f) in enumerate(zip(buffers, self.files)):
+            buf.tofile(f)
+            buffers[i] = array(buf.typecode)
+
+    def close(self):
+        self.flush()
+
+        for f in self.files:
+            f.close()
+
+        meta = dict(
+            magic = TC_MAGIC,
+            count = self.count,
+            columns = COLUMNS,
+            byteorder = byteorder,
+        )
+        with open(join(self.path, TC_META), "wb") as f:
+            dump(meta, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *__):
+        self.close()
+
+
+def export_columns(qlog, path, **kw):
+    "Writes all steps of `QEMULog` to `path` and returns `TraceColumns`."
+
+    with TraceColumnsWriter(path, **kw) as w:
+        w.extend(qlog.iter_instructions())
+
+    return TraceColumns(path)
+
+
+class TraceColumns(object):
+    """ Columnar execution trace written by `TraceColumnsWriter`.
+
+Columns are: "icount", "addr", "tb" (TB id), "version" (`TBCache` version
+of the instruction) and "kind" (`STEP_INSTR` or `STEP_INT`).
+
+If NumPy is available, columns are memory mapped (`view`) and queries are
+vectorized. Else, columns are processed by chunks of `array`s.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(join(path, TC_META), "rb") as f:
+            meta = load(f)
+
+        if meta.get("magic") != TC_MAGIC:
+            raise ValueError("Not a columnar trace: " + path)
+        if meta["byteorder"] != byteorder:
+            raise ValueError("Columnar trace %s has foreign byte order" % path)
+
+        self.count = meta["count"]
+        self.typecodes = dict(meta["columns"])
+
+    def __len__(self):
+        return self.count
+
+    def column_file(self, name):
+        return join(self.path, name + TC_EXT)
+
+    def view(self, name):
+        "Returns read-only memory mapped NumPy array of the column."
+
+        if numpy is None:
+            raise RuntimeError("NumPy is not available")
+
+        if not self.count:
+            return numpy.empty(0, dtype = self.typecodes[name])
+
+        return numpy.memmap(self.column_file(name),
+            dtype = numpy.dtype(self.typecodes[name]),
+            mode = "r",
+            shape = (self.count,)
+        )
+
+    def column(self, name, start = 0, end = None):
+        "Returns `array` of the column values from `start` to `end`."
+
+        count = self.count
+        if end is None or end > count:
+            end = count
+
+        a = array(self.typecodes[name])
+        if start >= end:
+            return a
+
+        with open(self.column_file(name), "rb") as f:
+            f.seek(start * a.itemsize)
+            a.fromfile(f, end - start)
+        return a
+
+    def iter_chunks(self, name, start = 0, end = None, chunk = 1 << 20):
+        "Yields `array`s of consequent column values."
+
+        if end is None or end > self.count:
+            end = self.count
+
+        while start < end:
+            yield self.column(name, start, min(end, start + chunk))
+            start += chunk
+
+    def _iter_instr_values(self, name):
+        # Values of instruction (not interrupt) steps.
+        for values, kinds in zip(self.iter_chunks(name),
+            self.iter_chunks("kind")
+        ):
+            for v in compress(values, map(not_, kinds)):
+                yield v
+
+    def addr_histogram(self):
+        "Returns `dict`: address -> amount of executions."
+
+        if numpy is None:
+            return dict(Counter(self._iter_instr_values("addr")))
+
+        addrs = self.view("addr")[self.view("kind") == STEP_INSTR]
+        values, counts = numpy.unique(addrs, return_counts = True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def hot_tbs(self, n = None):
+        """ Returns list of (TB id, amount of executed instructions) pairs,
+hottest first. `n` limits the list length.
+        """
+
+        if numpy is None:
+            return Counter(self._iter_instr_values("tb")).most_common(n)
+
+        tbs = self.view("tb")
+        counts = numpy.bincount(tbs[tbs >= 0])
+        order = numpy.argsort(counts, kind = "stable")[::-1]
+        order = order[counts[order] > 0]
+        if n is not None:
+            order = order[:n]
+        return list(zip(order.tolist(), counts[order].tolist()))
+
+    def first_difference(self, other, name = "addr"):
+        """ Returns index of first step those column values differ in this and
+`other` traces. If one trace is a prefix of another, length of the shorter
+one is returned. `None` means equal traces.
+        """
+
+        common = min(self.count, other.count)
+
+        if numpy is not None and common:
+            diff = numpy.flatnonzero(
+                self.view(name)[:common] != other.view(name)[:common]
+            )
+            if len(diff):
+                return int(diff[0])
+        else:
+            start = 0
+            for a, b in zip(self.iter_chunks(name, end = common),
+                other.iter_chunks(name, end = common)
+            ):
+                # chunks are compared by C code
+                if a != b:
+                    for i, (va, vb) in enumerate(zip(a, b)):
+                        if va != vb:
+                            return start + i
+                start += len(a)
+
+        if self.count != other.count:
+            return common
+        return None
@@ -0,0 +1,274 @@
+__all__ = [
+    "TraceHashes"
+  , "Divergence"
+  , "co_trace_hashes"
+  , "co_find_divergence"
+  , "find_divergence"
+  , "first_different_window"
+  , "iter_steps"
+  , "mark_differences"
+  , "steps_differ"
+]
+
+from .qlog import (
+    LogInt,
+    QEMULog,
+    TraceInstr,
+)
+from .qlog_columns import (
+    U64,
+)
+from common import (
+    callco,
+    CoReturn,
+)
+
+from array import (
+    array,
+)
+from hashlib import (
+    md5,
+)
+from itertools import (
+    islice,
+)
+from six import (
+    PY3,
+)
+
+
+# Default amount of steps in a hashed window.
+DIVERGENCE_WINDOW = 1 << 12
+
+# Key of `LogInt` steps. It cannot be an instruction address.
+INT_KEY = (1 << 64) - 1
+
+_array_bytes = array.tobytes if PY3 else array.tostring
+
+
+def step_key(step):
+    if isinstance(step, TraceInstr):
+        return step.addr
+    return INT_KEY
+
+
+def steps_differ(s1, s2):
+    "Steps comparison used by divergence search. It's address based only."
+
+    if type(s1) is not type(s2):
+        return True
+    if isinstance(s1, TraceInstr):
+        return s1.addr != s2.addr
+    return False
+
+
+class TraceHashes(object):
+    """ Chained md5 digests of windows of step keys of a trace.
+`prefixes[k]` identifies first `k + 1` windows (i.e. `(k + 1) * window`
+steps). Last window can be incomplete.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.prefixes = []
+
+
+def co_trace_hashes(qlog, window = DIVERGENCE_WINDOW):
+    "Computes `TraceHashes` of all steps of `QEMULog`."
+
+    hashes = TraceHashes(window)
+    prefixes = hashes.prefixes
+    digest = b""
+
+    keys = array(U64)
+    append = keys.append
+
+    for step in qlog.iter_instructions():
+        append(step_key(step))
+
+        if len(keys) == window:
+            digest = md5(digest + _array_bytes(keys)).digest()
+            prefixes.append(digest)
+            hashes.count += window
+
+            keys = array(U64)
+            append = keys.append
+
+            yield True
+
+    if keys:
+        prefixes.append(md5(digest + _array_bytes(keys)).digest())
+        hashes.count += len(keys)
+
+    raise CoReturn(hashes)
+
+
+def _log_hashes(file_name, window):
+    # A `CoPool` job. `QEMULog` cannot be given to a worker process.
+    return co_trace_hashes(QEMULog(file_name), window)
+
+
+def first_different_window(a, b):
+    """ Returns index of first window those `TraceHashes` `a` and `b` differ
+in or `None`. Windows are binary searched because a difference in a window
+results in different prefix digests for all next windows.
+    """
+
+    pa, pb = a.prefixes, b.prefixes
+    n = min(len(pa), len(pb))
+
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if pa[mid] == pb[mid]:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    if lo < n:
+        return lo
+
+    if a.count != b.count:
+        # A trace is a prefix of another one.
+        return n
+
+    return None
+
+
+def iter_steps(qlog, start, end = None):
+    """ Yields steps of `QEMULog` from `start` to `end`. `QEMULog.index` is
+used to skip the log beginning, if it's ready. Else, the log is parsed from the
+beginning again.
+    """
+
+    index = qlog.index
+    if index is not None and index.ready:
+        return qlog.iter_window(start, end)
+
+    qlog.reset()
+    return islice(qlog.iter_instructions(), start, end)
+
+
+def mark_differences(steps_lists):
+    """ Compares steps of first list with steps of other lists in lockstep.
+A different step of first list gets `difference` attribute referring to the
+step of other list.
+
+:returns: index of first difference or end of a list (if the lists have
+    different lengths) or `None`
+
+    """
+
+    main = steps_lists[0]
+    first = None
+
+    for steps in steps_lists[1:]:
+        for i, (s1, s2) in enumerate(zip(main, steps)):
+            if steps_differ(s1, s2):
+                s1.difference = s2
+                if first is None or i < first:
+                    first = i
+
+        if len(steps) != len(main):
+            end = min(len(steps), len(main))
+            if first is None or end < first:
+                first = end
+
+    return first
+
+
+class Divergence(object):
+    """ First difference of traces.
+
+:index: of the step
+:steps: steps of the traces at `index`, `None` if a trace is over
+:start: index of first step in `steps_lists`
+:steps_lists: compared steps of the traces around `index`, differences are
+    marked (see `mark_differences`)
+
+    """
+
+    def __init__(self, index, steps, start, steps_lists):
+        self.index = index
+        self.steps = steps
+        self.start = start
+        self.steps_lists = steps_lists
+
+    def __str__(self):
+        lines = ["divergence at step %d" % self.index]
+        for step in self.steps:
+            if step is None:
+                lines.append("  (trace is over)")
+            elif isinstance(step, TraceInstr):
+                lines.append("  0x%08X: %s" % (step.addr, step.disas))
+            elif isinstance(step, LogInt):
+                lines.append("  " + str(step))
+            else:
+                lines.append("  " + repr(step))
+        return "\n".join(lines)
+
+
+def co_find_divergence(qlogs,
+    window = DIVERGENCE_WINDOW,
+    pool = None,
+    before = 0,
+    after = 0
+):
+    """ Finds first difference of execution traces of `QEMULog`s.
+
+Windows of steps of each trace are hashed. Then the first different window is
+binary searched and only that window is compared step by step.
+
+:param pool: a `CoPool` to hash the logs in parallel, `QEMULog`s are
+    recreated in workers by file names
+:param before: amount of steps before the different window to include in
+    `Divergence.steps_lists`
+:param after: same as `before` but after the window
+
+:returns: `Divergence` or `None` if the traces are equal
+
+    """
+
+    if pool is None:
+        all_hashes = []
+        for qlog in qlogs:
+            all_hashes.append((yield co_trace_hashes(qlog, window)))
+    else:
+        tasks = list(pool.offload(_log_hashes, qlog.file_name, window)
+            for qlog in qlogs
+        )
+        all_hashes = []
+        for task in tasks:
+            all_hashes.append((yield task))
+
+    main = all_hashes[0]
+    diff_window = None
+    for hashes in all_hashes[1:]:
+        w = first_different_window(main, hashes)
+        if w is not None and (diff_window is None or w < diff_window):
+            diff_window = w
+
+    if diff_window is None:
+        raise CoReturn(None)
+
+    start = max(0, diff_window * window - before)
+    end = (diff_window + 1) * window + after
+
+    steps_lists = list(list(iter_steps(qlog, start, end)) for qlog in qlogs)
+    yield True
+
+    idx = mark_differences(steps_lists)
+    if idx is None:
+        # md5 collision?
+        raise CoReturn(None)
+
+    steps = list(
+        (steps[idx] if idx < len(steps) else None) for steps in steps_lists
+    )
+    raise CoReturn(Divergence(start + idx, steps, start, steps_lists))
+
+
+def find_divergence(qlogs, **kw):
+    "Synchronous version of `co_find_divergence`."
+    return callco(co_find_divergence(qlogs, **kw))
@@ -0,0 +1,142 @@
+__all__ = [
+    "QLogSteps"
+]
+
+from .qlog_diverge import (
+    mark_differences,
+)
+from common import (
+    LRUCache,
+)
+
+
+class _Cursor(object):
+    "Current parsing position of a log."
+
+    def __init__(self, qlog, start):
+        self.next = start
+        self.steps = qlog.iter_window(start)
+
+
+class QLogSteps(object):
+    """ Random access to execution steps of `QEMULog`s with ready
+`QLogIndex`es. Steps are parsed by blocks on demand. Only `blocks` recently
+used blocks are kept in memory. Steps of first (main) log in a block are
+compared with steps of other logs (see `mark_differences`).
+
+Indexing of `QLogSteps` itself is indexing of main log steps.
+
+Sequential block requests continue parsing. Others result in `QEMULog.seek`.
+
+:param block: amount of steps in a block
+:param blocks: amount of blocks in memory
+
+    """
+
+    def __init__(self, qlogs, block = 1 << 8, blocks = 1 << 6):
+        for qlog in qlogs:
+            index = qlog.index
+            if index is None or not index.ready:
+                raise ValueError("Log %s is not indexed" % qlog.file_name)
+
+        self.qlogs = qlogs
+        self.block = block
+        self.counts = list(qlog.index.count for qlog in qlogs)
+
+        # block number -> list of step lists (one per log)
+        self._blocks = LRUCache(blocks)
+        self._cursors = [None] * len(qlogs)
+
+    def __len__(self):
+        return self.counts[0]
+
+    def _log_steps(self, log_idx, start, end):
+        qlog = self.qlogs[log_idx]
+        cursor = self._cursors[log_idx]
+
+        # Skipping of at most one checkpoint interval is not slower than
+        # seeking.
+        if (cursor is None
+            or start < cursor.next
+            or start - cursor.next > qlog.index.checkpoint_interval
+        ):
+            cursor = self._cursors[log_idx] = _Cursor(qlog, start)
+
+        steps = []
+        append = steps.append
+
+        for step in cursor.steps:
+            i = step.icount
+            cursor.next = i + 1
+            if i < start:
+                continue
+            append(step)
+            if cursor.next >= end:
+                break
+
+        return steps
+
+    def get_block(self, n):
+        "Returns step lists of logs in `n`-th block."
+
+        blocks = self._blocks
+        steps_lists = blocks.get(n)
+
+        if steps_lists is None:
+            start = n * self.block
+            end = start + self.block
+
+            steps_lists = list(
+                self._log_steps(i, start, end) for i in range(len(self.qlogs))
+            )
+            mark_differences(steps_lists)
+            blocks[n] = steps_lists
+
+        return steps_lists
+
+    def get(self, log_idx, idx):
+        "Returns `idx`-th step of `log_idx`-th log or raises `IndexError`."
+
+        if idx < 0 or idx >= self.counts[log_idx]:
+            raise IndexError(idx)
+
+        n, i = divmod(idx, self.block)
+        return self.get_block(n)[log_idx][i]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self.get(0, key)
+
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("Only continuous slices are supported")
+
+        res = []
+        block = self.block
+        while start < stop:
+            n, i = divmod(start, block)
+            steps = self.get_block(n)[0]
+            chunk = steps[i:i + stop - start]
+            if not chunk:
+                break
+            res.extend(chunk)
+            start += len(chunk)
+
+        return res
+
+    def log(self, log_idx):
+        "Returns a view of `log_idx`-th log steps with `IndexError` support."
+        return _LogSteps(self, log_idx)
+
+
+class _LogSteps(object):
+
+    def __init__(self, steps, log_idx):
+        self.steps = steps
+        self.log_idx = log_idx
+
+    def __len__(self):
+        return self.steps.counts[self.log_idx]
+
+    def __getitem__(self, idx):
+        return self.steps.get(self.log_idx, idx)
@@ -1,24 +1,41 @@
 __all__ = [
     "QType"
   , "co_update_device_tree"
+  , "co_harvest_device_tree"
   , "co_fill_children"
+  , "co_introspect_device_tree"
+  , "IntrospectionUnsupported"
+  , "qmp_fill_device_tree"
 ]
 
 from .qemu_watcher import (
     QOMTreeReverser
 )
 from debug import (
-    InMemoryELFFile,
+    MappedELFFile,
     Runtime,
     GitLineVersionAdapter
 )
 from common import (
+    CancelledCallee,
+    co_find_eq,
+    CoReturn,
+    FailedCallee,
     pypath,
-    co_find_eq
+    QMPClient,
 )
 from subprocess import (
     Popen
 )
+from os import (
+    devnull
+)
+from sys import (
+    exc_info,
+)
+from traceback import (
+    format_exception,
+)
 # use ours pyrsp
 with pypath("..pyrsp"):
     from pyrsp.rsp import (
@@ -159,8 +176,10 @@ def co_fill_children(qomtr_node, qtype_node, arch):
         yield co_fill_children(c, qt, arch)
 
 
-def co_update_device_tree(qemu_exec, src_path, arch_name, root):
-    elf = InMemoryELFFile(qemu_exec)
+def co_update_device_tree(qemu_exec, src_path, arch_name, root,
+    port = None
+):
+    elf = MappedELFFile(qemu_exec)
     dic = elf.create_dwarf_cache()
 
     gvl_adptr = GitLineVersionAdapter(src_path)
@@ -176,7 +195,8 @@ def co_update_device_tree(qemu_exec, src_path, arch_name, root):
 
     gvl_adptr.cm.store_cache()
 
-    port = find_free_port(4321)
+    if port is None:
+        port = find_free_port(4321)
     qemu_debug_addr = "localhost:%u" % port
     Popen(["gdbserver", qemu_debug_addr, qemu_exec])
 
@@ -204,6 +224,10 @@ def co_update_device_tree(qemu_exec, src_path, arch_name, root):
 
     yield rt.co_run_target()
 
+    # Next device tree updating with this binary (or another binary of same
+    # build) will not parse DWARF again.
+    dic.save_index()
+
     device_subtree = qomtr.tree.name2type.get("device", None)
 
     if device_subtree is None:
@@ -216,3 +240,154 @@ def co_update_device_tree(qemu_exec, src_path, arch_name, root):
         root,
         arch_name
     )
+
+
+class IntrospectionUnsupported(RuntimeError):
+    "Qemu does not provide data required to build the device tree by QMP."
+
+
+def qmp_fill_device_tree(qmp, root, arch_name):
+    """ Fills `root` `QType` ("device") with QOM types got by `qom-list-types`
+QMP command. `arch_name` is added to `arches` of all filled types.
+
+:type qmp: QMPClient
+
+    """
+
+    types = qmp("qom-list-types",
+        implements = root.name,
+        abstract = True
+    )["return"]
+
+    parents = {}
+    for t in types:
+        try:
+            parents[t["name"]] = t["parent"]
+        except KeyError:
+            # Qemu < 2.11 does not report parents.
+            raise IntrospectionUnsupported("QOM type parent is not reported")
+
+    nodes = { root.name: root }
+
+    for name in parents:
+        path = []
+        while name not in nodes:
+            path.append(name)
+            try:
+                name = parents[name]
+            except KeyError:
+                raise IntrospectionUnsupported(
+                    "QOM type %s is not derived from %s" % (path[0], root.name)
+                )
+
+        node = nodes[name]
+        for name in reversed(path):
+            children = node.children
+            if name in children:
+                child = children[name]
+            else:
+                child = QType(name)
+                node.add_child(child)
+
+            child.arches.add(arch_name)
+            nodes[name] = node = child
+
+
+def co_introspect_device_tree(qemu_exec, arch_name, root, port = None):
+    """ Like `co_update_device_tree` but the device tree is got by QMP from
+Qemu launched without a machine. Neither debug build nor DWARF are needed.
+    """
+
+    if port is None:
+        port = find_free_port(4321)
+
+    with open(devnull, "wb") as null:
+        qemu = Popen([qemu_exec,
+                "-machine", "none",
+                "-nodefaults",
+                "-display", "none",
+                "-S",
+                "-qmp", "tcp:localhost:%u,server,nowait" % port
+            ],
+            stdout = null,
+            stderr = null
+        )
+
+    try:
+        if not wait_for_tcp_port(port):
+            raise RuntimeError("Qemu does not listen QMP port %u" % port)
+
+        yield True
+
+        qmp = QMPClient(port)
+        try:
+            qmp_fill_device_tree(qmp, root, arch_name)
+
+            try:
+                qmp("quit")
+            except Exception:
+                pass # Qemu can close the connection before the response
+        finally:
+            qmp.close()
+    finally:
+        if qemu.poll() is None:
+            qemu.kill()
+        qemu.wait()
+
+
+def _failure_lines(title, e):
+    lines = ["\n", title, "\n"]
+    if isinstance(e, (CancelledCallee, FailedCallee)):
+        lines.extend(e.callee.traceback_lines)
+    else:
+        lines.extend(format_exception(*exc_info()))
+    return lines
+
+
+def co_harvest_device_tree(binaries, src_path, arch_name,
+    port = None,
+    introspect = True
+):
+    """ Gets device tree of an architecture using first suitable Qemu binary
+among `binaries`. It can be offloaded to a `CoPool` worker. Then distinct
+`port`s must be given for concurrent workers.
+
+:param introspect: try `co_introspect_device_tree` first, DWARF based
+    `co_update_device_tree` is only used if introspection fails
+
+:returns: `QType` "device" tree (or `None` if all binaries are absent/useless)
+    and list of failure message lines
+
+    """
+
+    message = []
+
+    for qemu_exec in binaries:
+        if introspect:
+            root = QType("device")
+            try:
+                yield co_introspect_device_tree(qemu_exec, arch_name, root,
+                    port = port
+                )
+            except Exception as e:
+                message.extend(_failure_lines(
+                    "Introspection failure for binary '%s':\n" % qemu_exec, e
+                ))
+            else:
+                root.arches.add(arch_name)
+                raise CoReturn((root, message))
+
+        root = QType("device")
+        try:
+            yield co_update_device_tree(qemu_exec, src_path, arch_name, root,
+                port = port
+            )
+        except Exception as e:
+            message.extend(_failure_lines(
+                "Failure for binary '%s':\n" % qemu_exec, e
+            ))
+        else:
+            root.arches.add(arch_name)
+            raise CoReturn((root, message))
+
+    raise CoReturn((None, message))
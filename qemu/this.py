@@ -0,0 +1,32 @@
+from .build import *
+from .cpu import *
+from .machine import *
+from .machine_description import *
+from .machine_editing import *
+from .machine_layout import *
+from .machine_nodes import *
+from .makefile_patching import *
+from .model_state import *
+from .parsetab import *
+from .pci_ids import *
+from .pcie import *
+from .project import *
+from .project_editing import *
+from .project_history_tracker import *
+from .qemu_watcher import *
+from .qlog import *
+from .qlog_columns import *
+from .qlog_diverge import *
+from .qlog_steps import *
+from .qom import *
+from .qom_common import *
+from .qom_desc import *
+from .qom_editing import *
+from .qom_hierarchy import *
+from .qom_type_state_field import *
+from .qtn import *
+from .register import *
+from .runtime_qemu_model import *
+from .sysbusdevice import *
+from .version import *
+from .version_description import *
\ No newline at end of file
@@ -14,38 +14,48 @@ __all__ = [
   , "load_build_path_list"
   , "account_build_path"
   , "load_qvc"
+  , "save_qvc"
+  , "qvc_dumps"
 ]
 
 from common import (
+    BadSectionFile,
     callco,
-    CancelledCallee,
     co_process,
-    CommitDesc,
+    CommitGraph,
+    CoPool,
+    CoReturn,
+    dump_sections,
     ee,
     execfile,
     FailedCallee,
     fast_repo_clone,
     fixpath,
     get_cleaner,
+    git_export_tree,
     git_find_commit,
     lazy,
     makedirs,
     mlget as _,
+    PortPool,
     pythonize,
     qdtdirs,
+    RawSection,
     remove_file,
     rename_replacing,
+    SectionFile,
 )
 from .pci_ids import (
     PCIClassification,
     PCIId,
 )
 from .qom_hierarchy import (
-    co_update_device_tree,
+    co_harvest_device_tree,
     QType,
 )
 from source import (
     co_build_inclusions,
+    co_update_header_db,
     Macro,
     SourceTreeContainer,
     Type,
@@ -62,15 +72,21 @@ from collections import (
     defaultdict,
 )
 from git import (
+    GitCommandError,
     Repo,
 )
+from hashlib import (
+    md5,
+)
 from os import (
     listdir,
 )
 from os.path import (
     isfile,
     join,
+    realpath,
     sep,
+    splitext,
 )
 from shutil import (
     copy2,
@@ -79,15 +95,9 @@ from shutil import (
 from six import (
     u,
 )
-from sys import (
-    exc_info,
-)
 from time import (
     time,
 )
-from traceback import (
-    format_exception,
-)
 
 
 bp_file_name = "build_path_list"
@@ -207,14 +217,23 @@ def qvds_load_with_cache():
     qvds_load()
     qvds_init_cache()
 
-class QemuCommitDesc(CommitDesc):
-    def __init__(self, *a, **kw):
-        super(QemuCommitDesc, self).__init__(*a, **kw)
+# Attributes of `QemuVersionCache` those are sections of binary QVC file.
+QVC_SECTIONS = (
+    "version_desc",
+    "known_targets",
+    "list_headers",
+    "device_tree",
+    "pci_c",
+)
+
+# Binary QVC file format identifier. Change it if the format is changed.
+QVC_MAGIC = b"QDT_QVC\x01"
+
+# Extension of pythonized QVC file (legacy format).
+QVC_PY_EXT = u".py"
+# Extension of binary QVC file.
+QVC_EXT = u".qvc"
 
-        # dict of QEMUVersionParameterDescription new_value parameters
-        self.param_nval = {}
-        # dict of QEMUVersionParameterDescription old_value parameters
-        self.param_oval = {}
 
 class QemuVersionCache(object):
     current = None
@@ -224,62 +243,124 @@ class QemuVersionCache(object):
         device_tree = None,
         known_targets = None,
         version_desc = None,
-        pci_classes = None
+        pci_classes = None,
+        sections = None,
     ):
+        """
+:param sections: `SectionFile` of binary QVC. If given, `QVC_SECTIONS`
+    attributes are loaded from it on first access and other arguments are
+    ignored.
+        """
+
+        # Create source tree container
+        self.stc = SourceTreeContainer()
+
+        self.sections = sections
+        if sections is not None:
+            # See `__getattr__`
+            return
+
         self.device_tree = device_tree
         self.known_targets = known_targets
         self.list_headers = list_headers
         self.version_desc = version_desc
-
-        # Create source tree container
-        self.stc = SourceTreeContainer()
         self.pci_c = PCIClassification() if pci_classes is None else pci_classes
 
+    def __getattr__(self, name):
+        # It's only called for attributes those are not loaded yet.
+        sections = self.__dict__.get("sections")
+        if sections is None or name not in QVC_SECTIONS:
+            raise AttributeError(name)
+
+        if name in sections:
+            val = sections[name]
+        else:
+            val = None
+
+        if name == "version_desc":
+            if val is not None:
+                val = QVHDict(val)
+        elif name == "pci_c":
+            if val is None:
+                val = PCIClassification()
+
+        self.__dict__[name] = val
+        return val
+
+    def iter_sections(self):
+        "Yields name & value pairs for `dump_sections`."
+
+        sections = self.sections
+        loaded = self.__dict__
+
+        for name in QVC_SECTIONS:
+            if name in loaded or sections is None or name not in sections:
+                val = getattr(self, name)
+                if name == "version_desc" and val is not None:
+                    # `QVHDict` converts values on assignment. Use raw ones.
+                    val = dict(val)
+                yield name, val
+            else:
+                # Never loaded section is not changed.
+                yield name, RawSection(sections.read_raw(name))
+
     def co_computing_parameters(self, repo, version):
-        print("Build QEMU Git graph...")
-        self.commit_desc_nodes = {}
-        yield QemuCommitDesc.co_build_git_graph(repo, self.commit_desc_nodes)
-        print("QEMU Git graph was built")
+        print("Update QEMU Git graph...")
+        graph = yield co_load_commit_graph(repo)
+        print("QEMU Git graph was updated")
+
+        self.commit_graph = graph
+        n = len(graph)
 
-        yield self.co_propagate_param()
+        # Per commit (index in the graph) dicts of
+        # QEMUVersionParameterDescription new_value & old_value parameters.
+        self.param_nval = list({} for __ in range(n))
+        self.param_oval = list({} for __ in range(n))
 
-        c = self.commit_desc_nodes[repo.commit(version).hexsha]
-        param = self.version_desc = QVHDict()
-        for k, v in c.param_nval.items():
-            param[k] = v
-        for k, v in c.param_oval.items():
-            param[k] = v
+        try:
+            yield self.co_propagate_param()
+
+            c = graph.sha2idx[repo.commit(version).hexsha]
+            param = self.version_desc = QVHDict()
+            for k, v in self.param_nval[c].items():
+                param[k] = v
+            for k, v in self.param_oval[c].items():
+                param[k] = v
+        finally:
+            # Per commit data is only required during the propagation.
+            del self.commit_graph, self.param_nval, self.param_oval
 
     def co_propagate_param(self):
         vd = qemu_heuristic_db
+        sha2idx = self.commit_graph.sha2idx
         vd_list = []
 
         unknown_vd_keys = set()
         for k in vd.keys():
-            if k in self.commit_desc_nodes:
-                vd_list.append((k, self.commit_desc_nodes[k].num))
+            if k in sha2idx:
+                vd_list.append(sha2idx[k])
             else:
                 unknown_vd_keys.add(k)
                 print("WARNING: Unknown SHA1 %s in QEMU heuristic database" % k)
 
-        sorted_tuple = sorted(vd_list, key = lambda x: x[1])
-        sorted_vd_keys = [t[0] for t in sorted_tuple]
+        # Indices of the commit graph are topologically sorted.
+        sorted_vd_idxs = sorted(vd_list)
 
         yield True
 
         # first, need to propagate the new labels
         print("Propagation params in graph of commit's description...")
-        yield self.co_propagate_new_param(sorted_vd_keys, vd)
-        yield self.co_propagate_old_param(sorted_vd_keys, unknown_vd_keys, vd)
+        yield self.co_propagate_new_param(sorted_vd_idxs, vd)
+        yield self.co_propagate_old_param(sorted_vd_idxs, unknown_vd_keys, vd)
         print("Params in graph of commit's description were propagated")
 
-    def co_propagate_new_param(self, sorted_vd_keys, vd):
+    def co_propagate_new_param(self, sorted_vd_idxs, vd):
         """ This method propagate QEMUVersionParameterDescription.new_value
         in graph of commits. It must be called before old_value propagation.
 
-    :param sorted_vd_keys:
-        keys of qemu_heuristic_db sorted in ascending order by num of
-        QemuCommitDesc (elder first). It's necessary to optimize the graph
+    :param sorted_vd_idxs:
+        indices of qemu_heuristic_db keys in `commit_graph` sorted in
+        ascending order (elder first). It's necessary to optimize the graph
         traversal.
 
     :param vd:
@@ -288,14 +369,17 @@ class QemuVersionCache(object):
 
         t0 = time()
 
+        shas = self.commit_graph.shas
+        children = self.commit_graph.children
+        param_nval = self.param_nval
+
         # iterations to yield
         i2y = QVD_HP_IBY
 
-        for key in sorted_vd_keys:
-            cur_vd = vd[key]
-            cur_node = self.commit_desc_nodes[key]
-            for vpd in cur_vd:
-                cur_node.param_nval[vpd.name] = vpd.new_value
+        for idx in sorted_vd_idxs:
+            cur_nval = param_nval[idx]
+            for vpd in vd[shas[idx]]:
+                cur_nval[vpd.name] = vpd.new_value
 
             if i2y == 0:
                 yield True
@@ -303,38 +387,40 @@ class QemuVersionCache(object):
             else:
                 i2y -= 1
 
-        # vd_keys_set is used to accelerate propagation
-        vd_keys_set = set(sorted_vd_keys)
+        # vd_idxs_set is used to accelerate propagation
+        vd_idxs_set = set(sorted_vd_idxs)
 
         # old_val contains all old_value that are in ancestors
         old_val = {}
-        for key in sorted_vd_keys:
-            stack = [self.commit_desc_nodes[key]]
-            for vpd in vd[key]:
+        for idx in sorted_vd_idxs:
+            stack = [idx]
+            for vpd in vd[shas[idx]]:
                 try:
                     old_val[vpd.name].append(vpd.old_value)
                 except KeyError:
                     old_val[vpd.name] = [vpd.old_value]
             while stack:
-                cur_node = stack.pop()
-                for c in cur_node.children:
-                    if c.sha in vd_keys_set:
+                cur = stack.pop()
+                cur_nval = param_nval[cur]
+                for c in children(cur):
+                    c_nval = param_nval[c]
+                    if c in vd_idxs_set:
                         # if the child is vd, only the parameters that are not
                         # in vd's param_nval are added
-                        for p in cur_node.param_nval:
-                            if p not in c.param_nval:
-                                c.param_nval[p] = cur_node.param_nval[p]
-                        # no need to add element to stack, as it's in the sorted_vd_keys
+                        for p in cur_nval:
+                            if p not in c_nval:
+                                c_nval[p] = cur_nval[p]
+                        # no need to add element to stack, as it's in the sorted_vd_idxs
                     else:
                         # the child is't vd
-                        for p in cur_node.param_nval:
-                            if p in c.param_nval:
-                                if cur_node.param_nval[p] != c.param_nval[p]:
+                        for p in cur_nval:
+                            if p in c_nval:
+                                if cur_nval[p] != c_nval[p]:
                                     exc_raise = False
                                     if p in old_val:
-                                        if cur_node.param_nval[p] not in old_val[p]:
-                                            if c.param_nval[p] in old_val[p]:
-                                                c.param_nval[p] = cur_node.param_nval[p]
+                                        if cur_nval[p] not in old_val[p]:
+                                            if c_nval[p] in old_val[p]:
+                                                c_nval[p] = cur_nval[p]
                                                 stack.append(c)
                                             else:
                                                 exc_raise = True
@@ -344,10 +430,10 @@ class QemuVersionCache(object):
                                         # Hint: try to add `old_value` equal to
                                         #       previous `new_value`.
                                         raise Exception("Contradictory definition of param " \
-"'%s' in commit %s (%s != %s)" % (p, c.sha, cur_node.param_nval[p], c.param_nval[p])
+"'%s' in commit %s (%s != %s)" % (p, shas[c], cur_nval[p], c_nval[p])
                                         )
                             else:
-                                c.param_nval[p] = cur_node.param_nval[p]
+                                c_nval[p] = cur_nval[p]
                                 stack.append(c)
 
                 if i2y == 0:
@@ -359,16 +445,16 @@ class QemuVersionCache(object):
         t1 = time()
         print("co_propagate_new_param work time " + str(t1 - t0))
 
-    def co_propagate_old_param(self, sorted_vd_keys, unknown_vd_keys, vd):
+    def co_propagate_old_param(self, sorted_vd_idxs, unknown_vd_keys, vd):
         """ This method propagate QEMUVersionParameterDescription.old_value
         in graph of commits. It must be called after new_value propagation.
 
-    :param sorted_vd_keys:
-        keys of qemu_heuristic_db sorted in ascending order by num of
-        QemuCommitDesc. It's necessary to optimize the graph traversal.
+    :param sorted_vd_idxs:
+        indices of qemu_heuristic_db keys in `commit_graph` sorted in
+        ascending order. It's necessary to optimize the graph traversal.
 
     :param unknown_vd_keys:
-        set of keys which are not in commit_desc_nodes.
+        set of keys which are not in `commit_graph`.
 
     :param vd:
         qemu_heuristic_db
@@ -376,6 +462,12 @@ class QemuVersionCache(object):
 
         t0 = time()
 
+        graph = self.commit_graph
+        shas = graph.shas
+        parents = graph.parents
+        children = graph.children
+        param_oval = self.param_oval
+
         # message for exceptions
         msg = "Conflict with param '%s' in commit %s (old_val (%s) != old_val (%s))"
 
@@ -384,7 +476,7 @@ class QemuVersionCache(object):
 
         # Assume unknown SHA1 corresponds to an ancestor of a known node.
         # Therefore, old value must be used for all commits.
-        for commit in self.commit_desc_nodes.values():
+        for commit in range(len(graph)):
             for vd_keys in unknown_vd_keys:
                 self.init_commit_old_val(commit, vd[vd_keys])
 
@@ -393,32 +485,33 @@ class QemuVersionCache(object):
                     yield True
                     i2y = QVD_HP_IBY
 
-        vd_keys_set = set(sorted_vd_keys)
+        param_nval = self.param_nval
+        vd_idxs_set = set(sorted_vd_idxs)
         visited_vd = set()
-        for key in sorted_vd_keys[::-1]:
+        for idx in sorted_vd_idxs[::-1]:
             stack = []
             # used to avoid multiple processing of one node
-            visited_nodes = set([key])
-            visited_vd.add(key)
+            visited_nodes = set([idx])
+            visited_vd.add(idx)
 
-            node = self.commit_desc_nodes[key]
-            for p in node.parents:
+            node_oval = param_oval[idx]
+            for p in parents(idx):
                 stack.append(p)
 
                 # propagate old_val from node to their parents
-                p.param_oval.update()
-                for param, oval in node.param_oval.items():
+                p_oval = param_oval[p]
+                for param, oval in node_oval.items():
                     try:
-                        other = p.param_oval[param]
+                        other = p_oval[param]
                     except KeyError:
-                        p.param_oval[param] = oval
+                        p_oval[param] = oval
                     else:
                         if other != oval:
-                            raise Exception(msg % (param, p.sha, oval, other))
+                            raise Exception(msg % (param, shas[p], oval, other))
 
                 # init old_val of nodes that consist of vd's parents
                 # and check conflicts
-                self.init_commit_old_val(p, vd[key])
+                self.init_commit_old_val(p, vd[shas[idx]])
 
                 i2y -= 1
                 if not i2y:
@@ -426,28 +519,31 @@ class QemuVersionCache(object):
                     i2y = QVD_HP_IBY
 
             while stack:
-                cur_node = stack.pop()
-                visited_nodes.add(cur_node.sha)
+                cur = stack.pop()
+                visited_nodes.add(cur)
+                cur_oval = param_oval[cur]
 
-                for commit in cur_node.parents + cur_node.children:
-                    if commit.sha in visited_nodes:
+                for commit in list(parents(cur)) + list(children(cur)):
+                    if commit in visited_nodes:
                         continue
-                    for param_name in cur_node.param_oval:
-                        if param_name in commit.param_nval:
+                    commit_nval = param_nval[commit]
+                    commit_oval = param_oval[commit]
+                    for param_name in cur_oval:
+                        if param_name in commit_nval:
                             continue
-                        elif param_name in commit.param_oval:
-                            if commit.param_oval[param_name] != cur_node.param_oval[param_name]:
+                        elif param_name in commit_oval:
+                            if commit_oval[param_name] != cur_oval[param_name]:
                                 raise Exception(msg % (
-param_name, commit.sha, commit.param_oval[param_name], cur_node.param_oval[param_name]
+param_name, shas[commit], commit_oval[param_name], cur_oval[param_name]
                                 ))
                         else:
-                            commit.param_oval[param_name] = cur_node.param_oval[param_name]
-                            if commit.sha not in vd_keys_set:
+                            commit_oval[param_name] = cur_oval[param_name]
+                            if commit not in vd_idxs_set:
                                 stack.append(commit)
                             # if we have visited vd before, it is necessary
                             # to propagate the param, otherwise we do it
                             # in the following iterations of the outer loop
-                            elif commit.sha in visited_vd:
+                            elif commit in visited_vd:
                                 stack.append(commit)
 
                 i2y -= 1
@@ -464,19 +560,24 @@ param_name, commit.sha, commit.param_oval[param_name], cur_node.param_oval[param
         msg1 = "Conflict with param '%s' in commit %s (old_val (%s) != new_val (%s))"
         msg2 = "Conflict with param '%s' in commit %s (old_val (%s) != old_val (%s))"
 
+        commit_nval = self.param_nval[commit]
+        commit_oval = self.param_oval[commit]
+
         for param in vd:
-            if param.name in commit.param_nval:
-                if commit.param_nval[param.name] != param.old_value:
+            if param.name in commit_nval:
+                if commit_nval[param.name] != param.old_value:
                     raise Exception(msg1 % (
-param.name, commit.sha, param.old_value, commit.param_nval[param.name]
+param.name, self.commit_graph.shas[commit], param.old_value,
+commit_nval[param.name]
                     ))
-            elif param.name in commit.param_oval:
-                if commit.param_oval[param.name] != param.old_value:
+            elif param.name in commit_oval:
+                if commit_oval[param.name] != param.old_value:
                     raise Exception(msg2 % (
-param.name, commit.sha, param.old_value, commit.param_oval[param.name]
+param.name, self.commit_graph.shas[commit], param.old_value,
+commit_oval[param.name]
                     ))
             else:
-                commit.param_oval[param.name] = param.old_value
+                commit_oval[param.name] = param.old_value
 
     __pygen_deps__ = ("pci_c", "device_tree")
 
@@ -508,11 +609,37 @@ param.name, commit.sha, param.old_value, commit.param_oval[param.name]
         QemuVersionCache.current = self
         return previous
 
+def qvc_dumps(qvc):
+    "Serializes `qvc` to binary QVC format."
+    return dump_sections(QVC_MAGIC, qvc.iter_sections())
+
+def save_qvc(qvc, path):
+    """ Saves `qvc` to the file. Pythonized (legacy) format is used if `path`
+has `QVC_PY_EXT`ension. Binary format is used otherwise.
+    """
+    if splitext(path)[1] == QVC_PY_EXT:
+        pythonize(qvc, path)
+        return
+
+    # Serialization can be long enough.
+    # Do not touch target file until it ended.
+    data = qvc_dumps(qvc)
+
+    with open(path, "wb") as f:
+        f.write(data)
+
 def load_qvc(path):
+    """ Loads QVC from the file in either format, see `save_qvc`. Sections of
+binary QVC are loaded on demand.
+    """
     if not isfile(path):
         raise Exception("%s does not exists." % path)
 
     print("Loading QVC from " + path)
+
+    if splitext(path)[1] != QVC_PY_EXT:
+        return QemuVersionCache(sections = SectionFile(path, QVC_MAGIC))
+
     variables = {}
     context = {
         "QemuVersionCache": QemuVersionCache,
@@ -566,8 +693,67 @@ QVD_QH_HASH = "qh_hash"
 
 QVCs_DIR = join(qdtdirs.user_cache_dir, "qvcs")
 
+# Extension of persistent QEMU commit graph file.
+QCG_EXT = u".qcg"
+
+
+def commit_graph_path(repo):
+    "Commit graph file is shared by all QVCs of a QEMU repository."
+    key = md5(realpath(repo.git_dir).encode("utf-8")).hexdigest()
+    makedirs(QVCs_DIR, exist_ok = True)
+    return join(QVCs_DIR, u"commit_graph_" + key + QCG_EXT)
+
+
+def co_load_commit_graph(repo):
+    """ Loads persistent commit graph of `repo` and appends commits those were
+added to `repo` since last time.
+
+:returns: (`CoReturn`) `CommitGraph`
+    """
+
+    path = commit_graph_path(repo)
+
+    graph = None
+    if isfile(path):
+        try:
+            graph = CommitGraph.load(path)
+        except (BadSectionFile, EnvironmentError, EOFError, ValueError):
+            print("Bad commit graph file %s, it will be rebuilt" % path)
+
+    if graph is None:
+        new_commits = 0
+    else:
+        try:
+            new_commits = yield graph.co_update(repo)
+        except FailedCallee:
+            # E.g., a known commit has been removed from the repository.
+            print("Commit graph %s is outdated, it will be rebuilt" % path)
+            graph = None
+
+    if graph is None:
+        graph = CommitGraph()
+        new_commits = yield graph.co_update(repo)
+
+    if new_commits:
+        tmp_path = path + u".tmp"
+        graph.save(tmp_path)
+        rename_replacing(tmp_path, path)
+
+    raise CoReturn(graph)
+
+
 class QemuVersionDescription(object):
     REQUIRE_DEVICE_TREE = ee("QDT_REQUIRE_DEVICE_TREE", "True")
+    # Maximum distance (amount of commits) to other Qemu version which QVC
+    # can be updated incrementally instead of full source tree analysis.
+    # 0 disables incremental updating.
+    INCREMENTAL_DISTANCE = ee("QDT_QVC_INCREMENTAL_DISTANCE", "0")
+    # Amount of worker processes getting device trees of architectures in
+    # parallel. `None` means CPU count. 1 disables workers.
+    DEVICE_TREE_JOBS = ee("QDT_DEVICE_TREE_JOBS", "None")
+    # Get device tree by QMP introspection of Qemu. Debug information of Qemu
+    # binaries is only used if the introspection fails.
+    DEVICE_TREE_INTROSPECTION = ee("QDT_DEVICE_TREE_INTROSPECTION", "True")
 
     current = None
     # Current version of the QVD. Please use notation `u"_v{number}"` for next
@@ -654,18 +840,31 @@ class QemuVersionDescription(object):
             self.qvc = None
             self.qvc_is_ready = False
             remove_file(self.qvc_path)
+            # Else, it will be imported during next initialization.
+            remove_file(self.qvc_py_path)
+
+    @lazy
+    def qvc_base_name(self):
+        return u"qvc" + QemuVersionDescription.version + u"_" + self.commit_sha
 
     @lazy
     def qvc_file_name(self):
-        return (u"qvc" + QemuVersionDescription.version + u"_" +
-            self.commit_sha + u".py"
-        )
+        return self.qvc_base_name + QVC_EXT
 
     @lazy
     def qvc_path(self):
         makedirs(QVCs_DIR, exist_ok = True)
         return join(QVCs_DIR, self.qvc_file_name)
 
+    @lazy
+    def qvc_py_file_name(self):
+        "Pythonized QVC is imported if there is no binary QVC."
+        return self.qvc_base_name + QVC_PY_EXT
+
+    @lazy
+    def qvc_py_path(self):
+        return join(QVCs_DIR, self.qvc_py_file_name)
+
     def co_init_cache(self):
         if self.qvc is not None:
             print("Multiple QVC initialization " + self.src_path)
@@ -676,40 +875,49 @@ class QemuVersionDescription(object):
         yield True
 
         # Copy cache from old location.
-        old_qvc_path = join(self.build_path, self.qvc_file_name)
-        if isfile(old_qvc_path) and not isfile(self.qvc_path):
-            copy2(old_qvc_path, self.qvc_path)
-
-        if not isfile(self.qvc_path):
+        old_qvc_path = join(self.build_path, self.qvc_py_file_name)
+        if (isfile(old_qvc_path)
+            and not isfile(self.qvc_path)
+            and not isfile(self.qvc_py_path)
+        ):
+            copy2(old_qvc_path, self.qvc_py_path)
+
+        if not (isfile(self.qvc_path) or isfile(self.qvc_py_path)):
             self.qvc = QemuVersionCache()
 
-            # Check out Qemu source to a temporary directory and analyze it
-            # there. This avoids problems with user changes in main working
-            # directory.
-
-            print("Checking out temporary source tree...")
-
-            # Note. Alternatively, checking out can be performed without
-            # cloning. Instead, a magic might be casted on GIT_DIR and
-            # GIT_WORK_TREE environment variables. But, this approach resets
-            # staged files in src_path repository which can be inconvenient
-            # for a user.
-            # `fast_repo_clone` relies on external library functions which
-            # grab control for a long time. Hence, we should call it in a
-            # dedicated process.
-            tmp_repo = yield co_process(
-                fast_repo_clone,
-                self.repo, self.commit_sha, "qdt-qemu"
-            )
-            tmp_work_dir = tmp_repo.working_tree_dir
+            if self.INCREMENTAL_DISTANCE > 0:
+                base = self.find_base_qvc()
+            else:
+                base = None
+
+            if base is None:
+                # Check out Qemu source to a temporary directory and analyze
+                # it there. This avoids problems with user changes in main
+                # working directory.
+
+                print("Checking out temporary source tree...")
+
+                # Note. Alternatively, checking out can be performed without
+                # cloning. Instead, a magic might be casted on GIT_DIR and
+                # GIT_WORK_TREE environment variables. But, this approach
+                # resets staged files in src_path repository which can be
+                # inconvenient for a user.
+                # `fast_repo_clone` relies on external library functions which
+                # grab control for a long time. Hence, we should call it in a
+                # dedicated process.
+                tmp_repo = yield co_process(
+                    fast_repo_clone,
+                    self.repo, self.commit_sha, "qdt-qemu"
+                )
+                tmp_work_dir = tmp_repo.working_tree_dir
 
-            # Qemu source tree analysis is too long process and temporary
-            # clone of Qemu is big enough. If the process is terminated, the
-            # clone junks file system. Use `Cleaner`, a dedicated process,
-            # to remove the clone in that case.
-            clean_work_dir_task = get_cleaner().rmtree(tmp_work_dir)
+                # Qemu source tree analysis is too long process and temporary
+                # clone of Qemu is big enough. If the process is terminated,
+                # the clone junks file system. Use `Cleaner`, a dedicated
+                # process, to remove the clone in that case.
+                clean_work_dir_task = get_cleaner().rmtree(tmp_work_dir)
 
-            print("Temporary source tree: %s" % tmp_work_dir)
+                print("Temporary source tree: %s" % tmp_work_dir)
 
             # make new QVC active and begin construction
             prev_qvc = self.qvc.use()
@@ -723,9 +931,27 @@ class QemuVersionDescription(object):
             # set Qemu version heuristics according to current version
             initialize_version(self.qvc.version_desc)
 
-            yield co_build_inclusions(tmp_work_dir, self.include_paths)
+            if base is None:
+                yield co_build_inclusions(tmp_work_dir, self.include_paths)
 
-            self.qvc.list_headers = self.qvc.stc.create_header_db()
+                self.qvc.list_headers = self.qvc.stc.create_header_db()
+            else:
+                # Only files required by analysis are exported. Note that
+                # `include_paths` depends on version heuristics.
+                paths = [p for p, __ in self.include_paths]
+                paths.append("/".join(get_vp("default-configs suffix")))
+
+                print("Exporting temporary source tree...")
+
+                tmp_work_dir = yield co_process(
+                    git_export_tree,
+                    self.repo, self.commit_sha, paths, "qdt-qemu"
+                )
+                clean_work_dir_task = get_cleaner().rmtree(tmp_work_dir)
+
+                print("Temporary source tree: %s" % tmp_work_dir)
+
+                yield self.co_inherit_header_db(base[1], base[2], tmp_work_dir)
 
             yield self.co_gen_known_targets(tmp_work_dir)
 
@@ -805,8 +1031,85 @@ class QemuVersionDescription(object):
 
         self.qvc_is_ready = True
 
+    def find_base_qvc(self):
+        """ Looks for QVC of nearest (in Git graph) other Qemu version. It
+can be updated incrementally, see `co_update_header_db`.
+
+:returns: tuple of the distance (amount of commits), SHA1 of the version and
+    path to the QVC or `None` if there is no QVC within `INCREMENTAL_DISTANCE`
+        """
+        prefix = u"qvc" + QemuVersionDescription.version + u"_"
+
+        base = None
+
+        for name in listdir(QVCs_DIR):
+            if not name.startswith(prefix):
+                continue
+
+            sha, ext = splitext(name[len(prefix):])
+            if ext not in (QVC_EXT, QVC_PY_EXT) or sha == self.commit_sha:
+                continue
+
+            try:
+                # Commits reachable from only one of the versions.
+                distance = int(self.repo.git.rev_list("--count",
+                    sha + "..." + self.commit_sha
+                ))
+            except GitCommandError:
+                # The commit may be absent in this repository.
+                continue
+
+            if distance > self.INCREMENTAL_DISTANCE:
+                continue
+
+            if base is None or distance < base[0]:
+                base = (distance, sha, join(QVCs_DIR, name))
+
+        return base
+
+    def co_inherit_header_db(self, base_sha, base_qvc_path, work_dir):
+        """ Initializes header DB of the QVC using header DB of other version.
+Only headers changed between versions are parsed.
+        """
+        base_qvc = load_qvc(base_qvc_path)
+        list_headers = base_qvc.list_headers
+        del base_qvc
+
+        if list_headers is None:
+            print("QVC for %s has no header DB" % base_sha)
+
+            yield co_build_inclusions(work_dir, self.include_paths)
+
+            self.qvc.list_headers = self.qvc.stc.create_header_db()
+            return
+
+        print("Updating header DB of QVC for %s..." % base_sha)
+
+        diff = self.repo.git.diff("--name-only", "--no-renames",
+            base_sha, self.commit_sha, "--",
+            *(path for path, __ in self.include_paths)
+        )
+        changed_files = diff.splitlines()
+
+        print("Files changed: %u" % len(changed_files))
+
+        list_headers = yield co_update_header_db(list_headers, work_dir,
+            self.include_paths, changed_files
+        )
+
+        self.qvc.list_headers = list_headers
+
+        yield self.qvc.stc.co_load_header_db(list_headers)
+
     def co_overwrite_cache(self):
         qvc_path = self.qvc_path
+        qvc = self.qvc
+
+        # Serialization can be long enough.
+        # Do not touch the cache file until it ended.
+        data = qvc_dumps(qvc)
+
+        yield True
 
         if isfile(qvc_path):
             cleaner = get_cleaner()
@@ -817,7 +1120,7 @@ class QemuVersionDescription(object):
             rename_replacing(qvc_path, back)
             yield True
 
-            # If user stops the interpreter during `pythonize`...
+            # If user stops the interpreter during writing...
             revert_task = cleaner.schedule(rename_replacing, back, qvc_path)
 
             yield True
@@ -825,7 +1128,8 @@ class QemuVersionDescription(object):
             back = None
 
         try:
-            pythonize(self.qvc, qvc_path)
+            with open(qvc_path, "wb") as f:
+                f.write(data)
         except:
             if back is not None:
                 rename_replacing(back, qvc_path)
@@ -839,8 +1143,16 @@ class QemuVersionDescription(object):
             if back is not None:
                 cleaner.cancel(revert_task)
 
+        if qvc.sections is not None:
+            # Not loaded sections are at other offsets now.
+            qvc.sections = SectionFile(qvc_path, QVC_MAGIC)
+
     def load_cache(self):
-        self.qvc = load_qvc(self.qvc_path)
+        if isfile(self.qvc_path):
+            self.qvc = load_qvc(self.qvc_path)
+        else:
+            # Binary QVC will be written during initialization.
+            self.qvc = load_qvc(self.qvc_py_path)
 
     def co_check_modified_files(self):
         # A diff between the index and the working tree
@@ -929,48 +1241,40 @@ class QemuVersionDescription(object):
             yield self.co_get_install_prefix()
 
         arches_count = len(root.arches)
-        for arch in targets:
-            # Try to get QOM tree using binaries from different places.
-            # Installed binary is tried first because in this case Qemu
-            # launched as during normal operation.
-            # However, if user did not install Qemu, we should try to use
-            # binary from build directory.
-            install_dir = join(self.install_prefix, "bin")
-            build_dir = join(self.build_path, arch + "-softmmu")
-
-            binaries = [
-                join(install_dir, "qemu-system-" + arch),
-                join(build_dir, "qemu-system-" + arch)
-            ]
-
-            message = []
-
-            for qemu_exec in binaries:
-                try:
-                    yield co_update_device_tree(
-                        qemu_exec,
+
+        jobs = self.DEVICE_TREE_JOBS
+        if jobs == 1 or len(targets) < 2:
+            for arch in targets:
+                res = yield co_harvest_device_tree(
+                    self.device_tree_binaries(arch),
+                    self.src_path,
+                    arch,
+                    introspect = self.DEVICE_TREE_INTROSPECTION
+                )
+                self._account_device_tree(root, arch, *res)
+        elif targets:
+            # Each architecture is handled by a worker with own gdbserver.
+            port_pool = PortPool()
+            pool = CoPool(jobs)
+            try:
+                tasks = []
+                for arch in targets:
+                    tasks.append((arch, pool.offload(co_harvest_device_tree,
+                        self.device_tree_binaries(arch),
                         self.src_path,
                         arch,
-                        root
-                    )
-                except Exception as e:
-                    message.extend([
-                        "\n",
-                        "Failure for binary '%s':\n" % qemu_exec,
-                        "\n",
-                    ])
-                    if isinstance(e, (CancelledCallee, FailedCallee)):
-                        message.extend(e.callee.traceback_lines)
-                    else:
-                        message.extend(format_exception(*exc_info()))
-                else:
-                    root.arches.add(arch)
-                    # Stop on first successful update.
-                    break
-            else:
-                # All binaries are absent/useless.
-                message.insert(0, "Device Tree for %s isn't created:\n" % arch)
-                print("".join(message))
+                        port = port_pool.alloc_port(),
+                        introspect = self.DEVICE_TREE_INTROSPECTION
+                    )))
+
+                for arch, task in tasks:
+                    try:
+                        res = yield task
+                    except FailedCallee as e:
+                        res = (None, e.callee.traceback_lines)
+                    self._account_device_tree(root, arch, *res)
+            finally:
+                pool.terminate()
 
         if not root.children:
             # Device Tree was not built
@@ -991,6 +1295,31 @@ class QemuVersionDescription(object):
         yield self.co_add_dt_macro(self.qvc.device_tree.children, t2m)
         print("Macros were added to device tree")
 
+    def device_tree_binaries(self, arch):
+        """ Qemu binaries to try getting device tree of `arch` with.
+
+Installed binary is tried first because in this case Qemu launched as during
+normal operation. However, if user did not install Qemu, we should try to use
+binary from build directory.
+        """
+        install_dir = join(self.install_prefix, "bin")
+        build_dir = join(self.build_path, arch + "-softmmu")
+
+        return [
+            join(install_dir, "qemu-system-" + arch),
+            join(build_dir, "qemu-system-" + arch)
+        ]
+
+    @staticmethod
+    def _account_device_tree(root, arch, tree, message):
+        if tree is None:
+            # All binaries are absent/useless.
+            message = list(message)
+            message.insert(0, "Device Tree for %s isn't created:\n" % arch)
+            print("".join(message))
+        else:
+            root.merge(tree)
+
     def co_get_install_prefix(self):
         prefix_loc = get_vp("install prefix location")
         if prefix_loc == "config-host.mak":
@@ -86,6 +86,14 @@ def main():
         help = "Disable optimizations when building an instruction tree."
     )
 
+    parser.add_argument(
+        "--jobs", "-j",
+        default = 1,
+        type = int,
+        metavar = "N",
+        help = "Generate up to N devices or machines in parallel."
+    )
+
     parser.add_argument(
         "script",
         help = "A Python script containing definition of a project to generate."
@@ -146,7 +154,8 @@ def main():
         instruction_tree_optimizations = (
             not arguments.no_instruction_tree_optimizations
         ),
-        include_paths = tuple(path for path, __ in qvd.include_paths)
+        include_paths = tuple(path for path, __ in qvd.include_paths),
+        jobs = arguments.jobs
     )
 
     return 0
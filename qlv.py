@@ -6,13 +6,19 @@ from __future__ import (
 )
 
 from common import (
+    callco,
+    CoPool,
     ee,
     EPS,
+    LRUCache,
     mlget as _,
 )
 from qemu import (
+    co_find_divergence,
     LogInt,
     QEMULog,
+    QLogIndex,
+    QLogSteps,
     TraceInstr,
 )
 from widgets import (
@@ -45,6 +51,9 @@ from six.moves.tkinter import (
     Scrollbar,
     VERTICAL,
 )
+from six.moves.tkinter_simpledialog import (
+    askinteger,
+)
 from six.moves.tkinter_ttk import (
     Style,
 )
@@ -77,6 +86,9 @@ TV_WINDOW_SIZE = 1 << 10
 
 TV_WINDOW_HALF = TV_WINDOW_SIZE >> 1
 
+# Formatted rows are cached for steps near the window.
+TV_ROWS_CACHE = TV_WINDOW_SIZE << 2
+
 INSTR_ADDR_FMT = "0x%08X"
 
 class InstructionsTreeview(VarTreeview, object):
@@ -112,7 +124,11 @@ class InstructionsTreeview(VarTreeview, object):
             foreground = "#FFFFFF"
         )
 
+        # A sequence of steps: a `list` or a virtual one (e.g., `QLogSteps`).
+        # Rows are only created for steps within the window.
         self._all_instructions = []
+        # (icount, tags) -> (text, tags, values)
+        self._rows = LRUCache(TV_ROWS_CACHE)
 
         self._window_start = 0
 
@@ -135,6 +151,33 @@ class InstructionsTreeview(VarTreeview, object):
         self.update_window_shift(100)
         self.do_yscrollcommand(100)
 
+    def set_source(self, steps):
+        """ Shows `steps` instead of current ones. `steps` is a sequence with
+`len` and continuous slices support.
+        """
+
+        self.delete(*self.get_children())
+        self._rows.clear()
+        self._window_start = 0
+        self._all_instructions = steps
+
+        self._fill_window()
+        self.do_yscrollcommand(100)
+
+    def see_icount(self, icount):
+        "Shows and selects the step with `icount` (steps are continuous)."
+
+        steps = self._all_instructions
+        total = len(steps)
+        if not total:
+            return
+
+        idx = max(0, min(total - 1, icount - steps[0].icount))
+        self.see_instruction(idx)
+
+        iid = self.get_children()[idx - self._window_start]
+        self.selection_set(iid)
+
     def see_instruction(self, idx):
         # We trying to keep user view in the middle of the window
         shift = int(idx - TV_WINDOW_HALF - self._window_start)
@@ -361,40 +404,18 @@ class InstructionsTreeview(VarTreeview, object):
         return iid
 
     def _insert_step_ignore_diff(self, parent, insert_index, step, tags):
-        if isinstance(step, TraceInstr):
-            return self._insert_instruction_row(parent, insert_index, step,
-                tags
-            )
-        elif isinstance(step, LogInt):
-            return self._insert_interrupt_row(parent, insert_index, step,
-                tags
-            )
-        else:
-            tags = STYLE_DEFAULT if tags is None else tags
-            return self.insert(parent, insert_index,
-                text = str(step.icount),
-                tags = tags,
-                values = ("-", "-", str(step))
-            )
-
-    def _insert_interrupt_row(self, parent, insert_index, interrupt, tags):
-        if tags is None:
-            tags = STYLE_INTERRUPT
-
-        return self.insert(parent, insert_index,
-            text = str(interrupt.icount),
-            tags = tags,
-            values = ("-", "-", str(interrupt))
-        )
+        key = (step.icount, tags)
+        rows = self._rows
 
-    def _insert_instruction_row(self, parent, insert_index, inst, tags):
-        if tags is None:
-            tags = STYLE_FIRST if inst.first else STYLE_DEFAULT
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = format_step_row(step, tags)
 
+        text, tags, values = row
         return self.insert(parent, insert_index,
-            text = str(inst.icount),
+            text = text,
             tags = tags,
-            values = (INSTR_ADDR_FMT % inst.addr, "-", str(inst))
+            values = values
         )
 
     @property
@@ -413,6 +434,24 @@ class InstructionsTreeview(VarTreeview, object):
         return idx + self._window_start
 
 
+def format_step_row(step, tags):
+    "Returns text, tags and values of `InstructionsTreeview` row."
+
+    if isinstance(step, TraceInstr):
+        if tags is None:
+            tags = STYLE_FIRST if step.first else STYLE_DEFAULT
+        values = (INSTR_ADDR_FMT % step.addr, "-", str(step))
+    else:
+        if tags is None:
+            if isinstance(step, LogInt):
+                tags = STYLE_INTERRUPT
+            else:
+                tags = STYLE_DEFAULT
+        values = ("-", "-", str(step))
+
+    return str(step.icount), tags, values
+
+
 # Trace text (CPU state) styles.
 TAG_FILE = "file"
 TAG_LINK = "link"
@@ -439,6 +478,7 @@ class QLVWindow(GUITk):
 
         hk = self.hk
         hk(self._hk_copy, 54, symbol = "C")
+        hk(self._hk_goto, 42, symbol = "G")
 
         self.columnconfigure(0, weight = 1)
 
@@ -511,7 +551,27 @@ class QLVWindow(GUITk):
             self.clipboard_clear()
             self.clipboard_append(text)
 
-    def show_logs(self, qlogs):
+    def _hk_goto(self):
+        icount = askinteger(_("Go to").get(), _("Step number").get(),
+            parent = self,
+            minvalue = 0
+        )
+        if icount is not None:
+            self.tv_instructions.see_icount(icount)
+
+    def show_logs(self, qlogs, diverge = False, pool = None, index = False,
+        limit = None
+    ):
+        """
+    :param index:
+        `qlogs` have `QLogIndex`es. Not ready ones are built (and saved) in
+        background. Then `qlogs` are shown virtually (see `QLogSteps`), i.e.
+        without loading of whole logs, or the divergence is searched.
+    :param limit:
+        number of lines of `qlogs` shown while indexes are being built
+
+        """
+
         panes_trace_text = self.panes_trace_text
         qlog_trace_texts = self.qlog_trace_texts
         windows_menu = self._windows_menu
@@ -556,7 +616,14 @@ class QLVWindow(GUITk):
 
             text_view_windows[file_name] = w
 
-        self.task_manager.enqueue(self.co_trace_builder(qlogs))
+        if index:
+            self.task_manager.enqueue(
+                self.co_index_viewer(qlogs, diverge, pool, limit)
+            )
+        elif diverge:
+            self.task_manager.enqueue(self.co_divergence_viewer(qlogs, pool))
+        else:
+            self.task_manager.enqueue(self.co_trace_builder(qlogs))
 
     def _on_link_double_1(self, e):
         trace_text = e.widget
@@ -693,6 +760,71 @@ class QLVWindow(GUITk):
         t2 = time()
         print("In %f second(s)" % (t2 - t1))
 
+    def co_index_viewer(self, qlogs, diverge, pool, limit):
+        """ Builds not ready indexes of `qlogs`. Meanwhile, first `limit` lines
+of the logs are shown (if not `diverge`).
+        """
+
+        indexes = list(qlog.index for qlog in qlogs if not qlog.index.ready)
+
+        if indexes and not diverge:
+            yield self.co_trace_builder(list(
+                QEMULog(qlog.file_name, limit) for qlog in qlogs
+            ))
+
+        for index in indexes:
+            print("Indexing " + index.file_name)
+            t1 = time()
+            yield index.co_build()
+            index.save()
+            print("In %f second(s)" % (time() - t1))
+
+        if diverge:
+            yield self.co_divergence_viewer(qlogs, pool)
+            return
+
+        steps = QLogSteps(qlogs)
+
+        self.qlogs = qlogs
+        self.all_instructions = list(
+            steps.log(i) for i in range(len(qlogs))
+        )
+        self.tv_instructions.set_source(steps)
+        self.var_inst_n.set(len(steps))
+
+    def co_divergence_viewer(self, qlogs, pool):
+        "Finds first divergence of logs and shows steps around it."
+
+        t1 = time()
+
+        tv = self.tv_instructions
+
+        self.qlogs = qlogs
+        self.all_instructions = list(list() for __ in qlogs)
+
+        print("Searching for divergence")
+        # Few differences after the first one are shown too.
+        divergence = yield co_find_divergence(qlogs,
+            pool = pool,
+            before = TV_WINDOW_HALF,
+            after = 3
+        )
+
+        t2 = time()
+        print("In %f second(s)" % (t2 - t1))
+
+        if divergence is None:
+            print("No divergence found")
+            return
+
+        print(divergence)
+
+        self.all_instructions = steps_lists = divergence.steps_lists
+
+        tv.append_instructions(steps_lists[0])
+        self.var_inst_n.set(tv.total_instructions)
+        tv.see_instruction(divergence.index - divergence.start)
+
     def _on_instruction_selected(self, __):
         qlog_trace_texts = self.qlog_trace_texts
         qlogs = self.qlogs
@@ -801,21 +933,81 @@ def main():
     ap.add_argument("-l",
         metavar = "N",
         default = DEFAULT_LIMIT,
-        help = "limit number of log lines (default %s)" % DEFAULT_LIMIT
+        help = "limit number of log lines (default %s), also used while"
+            " indexes are being built (-i)" % DEFAULT_LIMIT
+    )
+    ap.add_argument("-d", "--diverge",
+        action = "store_true",
+        help = "search for first divergence of logs in whole logs"
+            " (-l is ignored) using hashes of step windows"
+    )
+    ap.add_argument("-n", "--no-gui",
+        action = "store_true",
+        help = "print divergence and exit, requires -d"
+    )
+    ap.add_argument("-i", "--index",
+        action = "store_true",
+        help = "use (build, if required) persistent log indexes to parse"
+            " only required parts of logs: during divergence search (-d) or"
+            " to show whole logs (-l is ignored) virtually; indexes are"
+            " built in background, but with -n they are built before the"
+            " divergence search"
+    )
+    ap.add_argument("-j", "--jobs",
+        type = int,
+        default = 1,
+        metavar = "N",
+        help = "hash logs in N processes during divergence search"
     )
     # Note, code below assumes that there is at least one log.
     ap.add_argument("qlog", nargs = "+")
 
     args = ap.parse_args()
 
+    if args.no_gui and not args.diverge:
+        ap.error("-n/--no-gui requires -d/--diverge")
+
     qlogs = []
     for qlogFN in args.qlog:
-        print("Start feeding of " + qlogFN)
+        if args.diverge or args.index:
+            index = None
+            if args.index:
+                index = QLogIndex.for_log(qlogFN)
+                # GUI builds indexes in background, see `co_index_viewer`.
+                if args.no_gui and not index.ready:
+                    print("Indexing " + qlogFN)
+                    index.build()
+                    index.save()
+
+            qlog = QEMULog(qlogFN,
+                index = index,
+                # Only few steps are in memory at a time.
+                keep_trace = args.diverge
+            )
+        else:
+            print("Start feeding of " + qlogFN)
 
-        qlog = QEMULog(qlogFN, int(args.l))
+            qlog = QEMULog(qlogFN, int(args.l))
 
         qlogs.append(qlog)
 
+    pool = None
+    if args.diverge and args.jobs > 1:
+        pool = CoPool(args.jobs)
+
+    if args.no_gui:
+        try:
+            divergence = callco(co_find_divergence(qlogs, pool = pool))
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        if divergence is None:
+            print("No divergence found")
+        else:
+            print(divergence)
+        return
+
     if len(qlogs) > 1:
         print("Comparison mode")
 
@@ -825,11 +1017,25 @@ def main():
     tkstyle = Style()
     tkstyle.configure("Treeview", font = ("Courier", 10))
 
-    print("Building full trace(s)")
-    # Launch trace building (and comparison).
-    tk.show_logs(qlogs)
-
-    tk.mainloop()
+    if args.index:
+        tk.show_logs(qlogs,
+            diverge = args.diverge,
+            pool = pool,
+            index = True,
+            limit = int(args.l)
+        )
+    elif args.diverge:
+        tk.show_logs(qlogs, diverge = True, pool = pool)
+    else:
+        print("Building full trace(s)")
+        # Launch trace building (and comparison).
+        tk.show_logs(qlogs)
+
+    try:
+        tk.mainloop()
+    finally:
+        if pool is not None:
+            pool.terminate()
 
 
 if __name__ == "__main__":
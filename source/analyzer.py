@@ -1,13 +1,18 @@
 __all__ = [
     "co_build_inclusions"
+  , "co_update_header_db"
 ]
 
 
 from common import (
+    CoPool,
+    CoReturn,
+    ee,
     path2tuple,
     pypath,
 )
 from .model import (
+    HDB_MACRO_NAME,
     Macro,
     Type,
 )
@@ -25,6 +30,10 @@ with pypath("..ply"):
     exec("from ply.cpp import t_" + ", t_".join(tokens))
 from .source_file import (
     Header,
+    HDB_HEADER_INCLUSIONS,
+    HDB_HEADER_IS_GLOBAL,
+    HDB_HEADER_MACROS,
+    HDB_HEADER_PATH,
 )
 from .tools import (
     get_cpp_search_paths,
@@ -36,12 +45,18 @@ from os import (
 from os.path import (
     dirname,
     isdir,
+    isfile,
     join,
     splitext,
 )
 import sys
 
 
+# Number of processes parsing headers in `co_build_inclusions` by default.
+# 1 means sequential parsing in current process.
+HEADER_PARSING_JOBS = ee("QDT_HEADER_PARSING_JOBS", "1")
+
+
 class ParsePrintFilter(object):
 
     def __init__(self, out):
@@ -72,7 +87,7 @@ else:
             return file.read()
 
 
-def _include(cpp, start_dir, tokens):
+def _include(cpp, start_dir, on_include, tokens):
     "Customized copy of ply.cpp.Preprocessor.include"
     # Try to extract the filename and then process an include file
     if not tokens:
@@ -122,7 +137,7 @@ def _include(cpp, start_dir, tokens):
             else:
                 inclusion = filename
 
-            _on_include(cpp.source, inclusion, is_global)
+            on_include(cpp.source, inclusion, is_global)
 
             prev_temp_path = cpp.temp_path
             dname = dirname(iname)
@@ -138,7 +153,7 @@ def _include(cpp, start_dir, tokens):
             pass
     else:
         print("Couldn't find '%s'" % filename)
-        _on_include(cpp.source, filename, is_global)
+        on_include(cpp.source, filename, is_global)
 
 
 def _on_include(includer, inclusion, is_global):
@@ -154,9 +169,10 @@ def _on_include(includer, inclusion, is_global):
 
 class _MacrosCatcher(dict):
 
-    def __init__(self, cpp):
+    def __init__(self, cpp, on_define):
         dict.__init__(self)
         self._cpp = cpp
+        self._on_define = on_define
         self.update(cpp.macros)
         cpp.macros = self
 
@@ -166,51 +182,74 @@ class _MacrosCatcher(dict):
             definer = self._cpp.source
         except AttributeError:
             return
-        _on_define(definer, macro)
-
+        # macro is ply.cpp.Macro
+        self._on_define(definer, macro.name,
+            None if macro.arglist is None else list(macro.arglist),
+            "".join(tok.value for tok in macro.value)
+        )
 
-def _on_define(definer, macro):
-    # macro is ply.cpp.Macro
 
-    if "__FILE__" == macro.name:
+def _on_define(definer, name, args, text):
+    if "__FILE__" == name:
         return
 
     h = Header[definer]
 
     try:
-        m = Type[macro.name]
+        m = Type[name]
         if not m.definer.path == definer:
             print("Info: multiple definitions of macro %s in %s and %s" % (
-                macro.name, m.definer.path, definer
+                name, m.definer.path, definer
             ))
     except:
         m = Macro(
-            name = macro.name,
-            args = (
-                None if macro.arglist is None else list(macro.arglist)
-            ),
-            text = "".join(tok.value for tok in macro.value)
+            name = name,
+            args = args,
+            text = text
         )
         h.add_type(m)
 
 
-def _build_inclusions(start_dir, prefix, recursive):
+def _start_preprocessing(start_dir, prefix, on_include, on_define):
+    p = Preprocessor(lex())
+    p.add_path(start_dir)
+
+    for path in cpp_search_paths:
+        p.add_path(path)
+
+    # Avoid `ply.cpp.Preprocessor` modification.
+    p.include = lambda *a: _include(p, start_dir, on_include, *a)
+    _MacrosCatcher(p, on_define)
+
+    header_input = read_include_file(join(start_dir, prefix))
+
+    p.parse(input = header_input, source = prefix)
+
+    return p
+
+
+def _iter_headers(start_dir, prefix, recursive):
+    "Yields `prefix`es of headers in same order as `_build_inclusions` does."
+
     full_name = join(start_dir, prefix)
     if isdir(full_name):
         if not recursive:
             return
         for entry in listdir(full_name):
-            yield _build_inclusions(
-                start_dir,
-                join(prefix, entry),
-                True
-            )
+            for header in _iter_headers(start_dir, join(prefix, entry), True):
+                yield header
         return
 
     ext = splitext(prefix)[1]
     if ext != ".h":
         return
 
+    yield prefix
+
+
+def _begin_header(prefix):
+    "Returns `True` if the header must be parsed now."
+
     if path2tuple(prefix) not in Header.reg:
         h = Header(path = prefix, is_global = False)
         h.parsed = False
@@ -218,25 +257,34 @@ def _build_inclusions(start_dir, prefix, recursive):
         h = Header[prefix]
 
     if h.parsed:
-        return
+        return False
 
     h.parsed = True
     print("Info: parsing " + prefix)
+    return True
 
-    p = Preprocessor(lex())
-    p.add_path(start_dir)
 
-    global cpp_search_paths
-    for path in cpp_search_paths:
-        p.add_path(path)
+def _build_inclusions(start_dir, prefix, recursive):
+    full_name = join(start_dir, prefix)
+    if isdir(full_name):
+        if not recursive:
+            return
+        for entry in listdir(full_name):
+            yield _build_inclusions(
+                start_dir,
+                join(prefix, entry),
+                True
+            )
+        return
 
-    # Avoid `ply.cpp.Preprocessor` modification.
-    p.include = lambda *a: _include(p, start_dir, *a)
-    _MacrosCatcher(p)
+    ext = splitext(prefix)[1]
+    if ext != ".h":
+        return
 
-    header_input = read_include_file(full_name)
+    if not _begin_header(prefix):
+        return
 
-    p.parse(input = header_input, source = prefix)
+    p = _start_preprocessing(start_dir, prefix, _on_include, _on_define)
 
     yields_per_current_header = 0
 
@@ -254,10 +302,108 @@ def _build_inclusions(start_dir, prefix, recursive):
     yields_per_header.append(yields_per_current_header)
 
 
+# Events recorded by `_parse_header` refer handlers by index.
+_event_handlers = (_on_include, _on_define)
+
+# Iterations Between Yields of recorded events replaying
+REPLAY_IBY = 1000
+
+
+def _init_worker(search_paths):
+    global cpp_search_paths
+    cpp_search_paths = search_paths
+
+    # Messages are printed by main process during events replaying.
+    if not isinstance(sys.stdout, ParsePrintFilter):
+        sys.stdout = ParsePrintFilter(sys.stdout)
+
+
+def _parse_header(start_dir, prefix):
+    """ Parses the header in a worker process. Header DB is not touched.
+Instead, inclusions and macro definitions are recorded to be replayed by main
+process in the order `_build_inclusions` would do.
+
+:returns: the events and amount of yields sequential parsing would do
+    """
+
+    events = []
+
+    p = _start_preprocessing(start_dir, prefix,
+        lambda *a: events.append((0, a)),
+        lambda *a: events.append((1, a)),
+    )
+
+    yields = 0
+
+    tokens_before_yield = 0
+    while p.token():
+        if not tokens_before_yield:
+            yields += 1
+            tokens_before_yield = 1000
+        else:
+            tokens_before_yield -= 1
+
+    return events, yields
+
+
+def _co_build_inclusions_parallel(work_dir, include_paths, jobs):
+    pool = CoPool(jobs,
+        initializer = _init_worker,
+        initargs = (cpp_search_paths,)
+    )
+    try:
+        # Headers are parsed independently. It's required because a header
+        # parsed as an inclusion of a preceding one must be skipped. But it's
+        # not known in advance.
+        results = []
+        for path, recursive in include_paths:
+            dname = join(work_dir, path)
+            for entry in listdir(dname):
+                for prefix in _iter_headers(dname, entry, recursive):
+                    results.append((prefix,
+                        pool.offload(_parse_header, dname, prefix)
+                    ))
+        pool.close()
+
+        yield True
+
+        i2y = REPLAY_IBY
+        for prefix, result in results:
+            if not _begin_header(prefix):
+                continue
+
+            events, yields = yield result
+            yields_per_header.append(yields)
+
+            for handler, args in events:
+                _event_handlers[handler](*args)
+
+                if i2y == 0:
+                    yield True
+                    i2y = REPLAY_IBY
+                else:
+                    i2y -= 1
+    finally:
+        pool.terminate()
+
+
 def co_build_inclusions(work_dir, include_paths,
+    jobs = None,
     # the reference is saved at class creation time
     _sys_stdout_recovery = sys.stdout
 ):
+    """ Parses headers in `include_paths` (relative to `work_dir`) filling
+header DB of current `SourceTreeContainer`.
+
+:param include_paths: pairs of path and recursion flag
+:param jobs: amount of processes to parse headers. 1 means sequential parsing
+    in current process. Header DB is the same regardless of this value.
+    Default is `HEADER_PARSING_JOBS`.
+    """
+
+    if jobs is None:
+        jobs = HEADER_PARSING_JOBS
+
     # Default include search folders should be specified to
     # locate and parse standard headers.
     # parse `cpp -v` output to get actual list of default
@@ -274,10 +420,13 @@ def co_build_inclusions(work_dir, include_paths,
     for h in Header.reg.values():
         h.parsed = False
 
-    for path, recursive in include_paths:
-        dname = join(work_dir, path)
-        for entry in listdir(dname):
-            yield _build_inclusions(dname, entry, recursive)
+    if jobs > 1:
+        yield _co_build_inclusions_parallel(work_dir, include_paths, jobs)
+    else:
+        for path, recursive in include_paths:
+            dname = join(work_dir, path)
+            for entry in listdir(dname):
+                yield _build_inclusions(dname, entry, recursive)
 
     for h in Header.reg.values():
         del h.parsed
@@ -303,3 +452,145 @@ yields_total / float(len(yields_per_header))
         print("Headers not found")
 
     del yields_per_header
+
+
+def _iter_changed_headers(include_paths, changed_files):
+    for f in changed_files:
+        # Git always uses "/"
+        for path, recursive in include_paths:
+            if path in (".", ""):
+                rel = f
+            else:
+                dname = "/".join(path2tuple(path)) + "/"
+                if not f.startswith(dname):
+                    continue
+                rel = f[len(dname):]
+
+            if not recursive and "/" in rel:
+                continue
+            if splitext(rel)[1] != ".h":
+                continue
+
+            yield path, join(*rel.split("/"))
+
+
+def co_update_header_db(list_headers, work_dir, include_paths, changed_files,
+    # the reference is saved at class creation time
+    _sys_stdout_recovery = sys.stdout
+):
+    """ Updates header DB (see `SourceTreeContainer.create_header_db`) built
+for other version of the source tree. Only headers among `changed_files` are
+re-parsed. The DB is not modified.
+
+A re-parsed header is parsed stand-alone and only its own inclusions & macros
+are accounted. So, the result may differ from `co_build_inclusions` in corner
+cases. E.g. when a header was parsed only as an inclusion and its content
+depends on macros of includer. Or when a macro is defined in several headers.
+
+:param work_dir, include_paths: see `co_build_inclusions`
+:param changed_files: paths (relative to `work_dir`, "/" separated, as
+    given by "git diff --name-only") of modified, added and removed files.
+:returns: (`CoReturn`) updated header DB
+
+    """
+
+    global cpp_search_paths
+    cpp_search_paths = get_cpp_search_paths()
+
+    entries = list(dict(e) for e in list_headers)
+    path2entry = dict((e[HDB_HEADER_PATH], e) for e in entries)
+
+    def get_entry(path, is_global):
+        try:
+            return path2entry[path]
+        except KeyError:
+            e = path2entry[path] = {
+                HDB_HEADER_PATH: path,
+                HDB_HEADER_IS_GLOBAL: is_global,
+                HDB_HEADER_INCLUSIONS: [],
+                HDB_HEADER_MACROS: [],
+            }
+            entries.append(e)
+            return e
+
+    changed = list(_iter_changed_headers(include_paths, changed_files))
+    changed_prefixes = set(prefix for __, prefix in changed)
+
+    # macro name -> definer, first definition is used like `_on_define` does
+    macro_definers = {}
+    for e in entries:
+        if e[HDB_HEADER_PATH] in changed_prefixes:
+            continue
+        for m in e[HDB_HEADER_MACROS]:
+            macro_definers.setdefault(m[HDB_MACRO_NAME], e[HDB_HEADER_PATH])
+
+    if not isinstance(sys.stdout, ParsePrintFilter):
+        sys.stdout = ParsePrintFilter(sys.stdout)
+
+    for path, prefix in changed:
+        start_dir = join(work_dir, path)
+
+        if not isfile(join(start_dir, prefix)):
+            e = path2entry.get(prefix)
+            if e is not None:
+                e[HDB_HEADER_INCLUSIONS] = []
+                e[HDB_HEADER_MACROS] = []
+            continue
+
+        print("Info: re-parsing " + prefix)
+
+        events, __ = _parse_header(start_dir, prefix)
+
+        inclusions = []
+        macros = []
+
+        for handler, args in events:
+            if handler == 0:
+                includer, inclusion, is_global = args
+                get_entry(inclusion, is_global)
+                if includer == prefix and inclusion not in inclusions:
+                    inclusions.append(inclusion)
+            else:
+                definer, name, margs, text = args
+                if definer != prefix or "__FILE__" == name:
+                    continue
+                if name in macro_definers:
+                    continue
+                macro_definers[name] = prefix
+                macros.append(Macro.gen_dict_for(name, margs, text))
+
+        e = get_entry(prefix, False)
+        e[HDB_HEADER_INCLUSIONS] = inclusions
+        e[HDB_HEADER_MACROS] = macros
+
+        yield True
+
+    sys.stdout = _sys_stdout_recovery
+
+    yield True
+
+    # A header which is not in `include_paths` (e.g. a removed one or a
+    # system header) is in DB only if it's included by a header.
+    files = set()
+    for path, recursive in include_paths:
+        dname = join(work_dir, path)
+        for entry in listdir(dname):
+            files.update(_iter_headers(dname, entry, recursive))
+
+    while True:
+        included = set()
+        for e in entries:
+            included.update(e[HDB_HEADER_INCLUSIONS])
+
+        useless = list(
+            e for e in entries
+            if e[HDB_HEADER_PATH] not in files
+            and e[HDB_HEADER_PATH] not in included
+        )
+        if not useless:
+            break
+
+        for e in useless:
+            entries.remove(e)
+
+    raise CoReturn(entries)
@@ -0,0 +1,3 @@
+from .bindings import *
+from .tree import *
+from .var_declarator import *
\ No newline at end of file
@@ -956,11 +956,16 @@ class Macro(Type):
         return MacroUsage(self, initializer = initializer, name = name)
 
     def gen_dict(self):
-        res = {HDB_MACRO_NAME : self.name}
-        if self.text is not None:
-            res[HDB_MACRO_TEXT] = self.text
-        if self.args is not None:
-            res[HDB_MACRO_ARGS] = self.args
+        return Macro.gen_dict_for(self.name, self.args, self.text)
+
+    @staticmethod
+    def gen_dict_for(name, args = None, text = None):
+        "Header DB representation of a macro without `Macro` creation."
+        res = {HDB_MACRO_NAME : name}
+        if text is not None:
+            res[HDB_MACRO_TEXT] = text
+        if args is not None:
+            res[HDB_MACRO_ARGS] = args
 
         return res
 
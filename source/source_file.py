@@ -5,6 +5,7 @@ __all__ = [
       , "Header"
   , "SourceFile"
   , "SourceTreeContainer"
+  , "SourceTreeSnapshot"
 ]
 
 from collections import (
@@ -1334,6 +1335,14 @@ digraph HeaderInclusion {
 
         return list_headers
 
+    def snapshot(self):
+        "See `SourceTreeSnapshot`."
+        return SourceTreeSnapshot(self)
+
+    def restore(self, snapshot):
+        "Brings the container back to the `snapshot` state."
+        snapshot.restore(self)
+
     def set_cur_stc(self):
         Header.reg = self.reg_header
         Type.reg = self.reg_type
@@ -1344,3 +1353,85 @@ digraph HeaderInclusion {
 
 
 SourceTreeContainer().set_cur_stc()
+
+
+class SourceTreeSnapshot(object):
+    """ State of a `SourceTreeContainer`: its registries, contents of
+registered headers and definers of their types and variables. Restoring of
+the state is a cheap alternative to re-creation of the container (e.g., after
+generation of sources using temporary types).
+
+Only containers are copied. The types, variables and headers themselves
+are shared with the container. So, a generator must not modify attributes of
+registered objects other than those mentioned above.
+
+A snapshot can be restored several times.
+    """
+
+    def __init__(self, stc):
+        self.stc = stc
+        self.reg_header = dict(stc.reg_header)
+        self.reg_type = dict(stc.reg_type)
+
+        # header -> its containers
+        self.headers = headers = {}
+
+        # (type or variable, definer, declarer)
+        # Note that types are not always compared by identity.
+        self.definers = definers = []
+        seen = set()
+
+        def save_definer(o):
+            if id(o) in seen:
+                return
+            seen.add(id(o))
+            definers.append((o, o.definer, getattr(o, "declarer", None)))
+
+        for t in stc.reg_type.values():
+            save_definer(t)
+
+        for h in stc.reg_header.values():
+            headers[h] = (
+                dict(h.types),
+                dict(h.inclusions),
+                list(h.includers),
+                dict(h.global_variables),
+                set(h.references),
+                h.locked_inclusions,
+            )
+
+            for t in h.types.values():
+                save_definer(t)
+
+            for v in h.global_variables.values():
+                save_definer(v)
+
+    def restore(self, stc = None):
+        if stc is None:
+            stc = self.stc
+        elif stc is not self.stc:
+            raise ValueError("The snapshot is of another container")
+
+        # Registries are updated in place because `Type.reg` and `Header.reg`
+        # may refer to them.
+        for reg, saved in (
+            (stc.reg_header, self.reg_header),
+            (stc.reg_type, self.reg_type),
+        ):
+            reg.clear()
+            reg.update(saved)
+
+        for h, (types, inclusions, includers, global_variables, references,
+            locked_inclusions
+        ) in self.headers.items():
+            h.types = dict(types)
+            h.inclusions = dict(inclusions)
+            h.includers = list(includers)
+            h.global_variables = dict(global_variables)
+            h.references = set(references)
+            h.locked_inclusions = locked_inclusions
+
+        for o, definer, declarer in self.definers:
+            o.definer = definer
+            if isinstance(o, Variable):
+                o.declarer = declarer
@@ -0,0 +1,14 @@
+from .analyzer import *
+from .base_types import *
+from .c_const import *
+from .c_str_adapter import *
+from .chunks import *
+from .code import *
+from .code_gen_helpers import *
+from .function import *
+from .gen_printf_format import *
+from .model import *
+from .parsetab import *
+from .source_file import *
+from .tools import *
+from .type_container import *
\ No newline at end of file
@@ -25,6 +25,14 @@ class LineIndexTest(TestCase):
         test_read_chunk(100000)
         test_read_chunk(200000)
 
+        lineidxs = [0, 1, 2, 1023, 1024, 1025, 5000, 5001, 100000]
+        for lineidx, offset in zip(lineidxs,
+            index.iter_offsets(stream, lineidxs)
+        ):
+            stream.seek(offset)
+            line = stream.read(10).split(b"\r\n")[0]
+            self.assertEqual(b"%d" % lineidx, line)
+
 
 if __name__ == "__main__":
     main()
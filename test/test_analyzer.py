@@ -0,0 +1,144 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    callco,
+)
+from source import (
+    co_build_inclusions,
+    co_update_header_db,
+    SourceTreeContainer,
+)
+from os import (
+    makedirs,
+    remove,
+)
+from os.path import (
+    dirname,
+    join,
+)
+from shutil import (
+    rmtree,
+)
+from tempfile import (
+    mkdtemp,
+)
+
+
+HEADERS = {
+    "a.h": """\
+#ifndef A_H
+#define A_H
+#include "b.h"
+#include <stddef.h>
+#define A_MACRO(x) ((x) + B_MACRO)
+#endif
+""",
+    "b.h": """\
+#ifndef B_H
+#define B_H
+#define B_MACRO 1
+#define SHARED "b"
+#endif
+""",
+    "c.h": """\
+#include "b.h"
+#include "sub/d.h"
+#define SHARED "c"
+""",
+    join("sub", "d.h"): """\
+#include "missing.h"
+#define D_MACRO D
+""",
+    join("sub", "e.h"): """\
+#include "d.h"
+#define E_MACRO
+""",
+}
+
+
+# Changes of `HEADERS` for next version, `None` means removal.
+CHANGES = {
+    "a.h": """\
+#ifndef A_H
+#define A_H
+#include "f.h"
+#define A_MACRO(x) ((x) + F_MACRO)
+#endif
+""",
+    "f.h": """\
+#include "b.h"
+#define F_MACRO B_MACRO
+""",
+    join("sub", "e.h"): None,
+}
+
+
+def header_db_as_dict(list_headers):
+    "Order independent representation of header DB."
+    return dict(
+        (e["path"], (
+            e["is_global"],
+            sorted(e["inclusions"]),
+            sorted(tuple(sorted(m.items())) for m in e["macros"]),
+        )) for e in list_headers
+    )
+
+
+class HeaderDBTest(TestCase):
+
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        self.write_headers(HEADERS)
+
+    def write_headers(self, headers):
+        for path, content in headers.items():
+            full_path = join(self.work_dir, "include", path)
+            if content is None:
+                remove(full_path)
+                continue
+            dname = dirname(full_path)
+            try:
+                makedirs(dname)
+            except OSError:
+                pass
+            with open(full_path, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+    def build_header_db(self, jobs):
+        stc = SourceTreeContainer()
+        prev = stc.set_cur_stc()
+        try:
+            callco(co_build_inclusions(self.work_dir, [("include", True)],
+                jobs = jobs
+            ))
+        finally:
+            prev.set_cur_stc()
+        return stc.create_header_db()
+
+    def test_parallel(self):
+        sequential = self.build_header_db(1)
+        self.assertTrue(sequential)
+        self.assertEqual(sequential, self.build_header_db(3))
+
+    def test_update(self):
+        prev = self.build_header_db(1)
+        self.write_headers(CHANGES)
+
+        updated = callco(co_update_header_db(prev, self.work_dir,
+            [("include", True)],
+            ["include/" + path.replace("\\", "/") for path in CHANGES]
+        ))
+
+        self.assertEqual(
+            header_db_as_dict(self.build_header_db(1)),
+            header_db_as_dict(updated)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from unittest import (
+    TestCase,
+    main,
+)
+from importlib.util import (
+    module_from_spec,
+    spec_from_file_location,
+)
+from os.path import (
+    dirname,
+    join,
+)
+from six.moves.queue import (
+    Queue,
+)
+from sys import (
+    modules,
+)
+from threading import (
+    Thread,
+)
+
+
+def load_c2t_script():
+    # `c2t` package shadows `c2t.py` script.
+    spec = spec_from_file_location("c2t_script",
+        join(dirname(__file__), "..", "c2t.py")
+    )
+    module = module_from_spec(spec)
+    modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+c2t_script = load_c2t_script()
+
+
+class FakeValue(object):
+
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeServer(object):
+
+    name = "fake"
+
+    def __init__(self, test_elf, ports, hanging):
+        self.test_elf = test_elf
+        self.port = ports[0]
+        # QMP makes the server reusable
+        self.qmp = object()
+        self.hanging = hanging
+        self.session = None
+        self.stopped = False
+
+    def wait_ready(self):
+        return True
+
+    def is_healthy(self):
+        return True
+
+    def run_test(self, timeout):
+        "Returns `True` if timeout expired."
+        return self.session in self.hanging
+
+    def stop(self, force = False):
+        assert not self.stopped
+        self.stopped = True
+
+
+class DebugServerPoolTest(TestCase):
+    """ A test runner must not demand more ports than the budget `c2t`
+gives to `FreePortFinder`.
+    """
+
+    tests_count = 7
+
+    def run_tests(self, jobs, reuse, hanging = ()):
+        # QEMU in system mode with QMP
+        ports_count = 2
+        budget = self.tests_count * (ports_count + 1) + jobs * ports_count
+
+        port_queue = Queue()
+        # gdbserver ports are consumed by oracle runners.
+        for port in range(budget - self.tests_count):
+            port_queue.put(port)
+
+        tests_queue = Queue()
+        for i in range(self.tests_count):
+            tests_queue.put(("test%d.c" % i, "test%d" % i))
+        is_finish = FakeValue(1)
+
+        ran = []
+        servers = []
+        errors = []
+
+        def start(test_elf, block = True):
+            ports = c2t_script.get_ports(port_queue, ports_count, False)
+            if ports is None:
+                if block:
+                    # it would hang
+                    errors.append("no ports for %s" % test_elf)
+                    raise RuntimeError(errors[-1])
+                return None
+
+            server = FakeServer(test_elf, ports, hanging)
+            servers.append(server)
+            return server
+
+        def setup_session(server, test_src, test_elf):
+            server.session = test_src
+            ran.append(test_src)
+
+        pools = [
+            c2t_script.DebugServerPool(start, reuse, False, bound = False)
+            for __ in range(jobs)
+        ]
+        runners = [
+            Thread(
+                target = c2t_script.run_tests,
+                args = (pool, tests_queue, is_finish, 10., setup_session)
+            ) for pool in pools
+        ]
+        for r in runners:
+            r.start()
+        for r in runners:
+            r.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(
+            sorted("test%d.c" % i for i in range(self.tests_count)),
+            sorted(ran)
+        )
+        self.assertTrue(all(s.stopped for s in servers))
+
+        started = sum(pool.started for pool in pools)
+        self.assertEqual(len(servers), started)
+        self.assertLessEqual(started * ports_count, budget - self.tests_count)
+
+        return started
+
+    def test_one_runner(self):
+        # no server is started in advance for nonexistent test
+        self.assertEqual(self.tests_count, self.run_tests(1, False))
+
+    def test_runners(self):
+        self.run_tests(3, False)
+
+    def test_reuse(self):
+        self.assertEqual(1, self.run_tests(1, True))
+
+    def test_reuse_timeouts(self):
+        self.run_tests(1, True, hanging = ("test1.c", "test2.c", "test6.c"))
+        self.run_tests(3, True, hanging = ("test0.c", "test3.c", "test4.c"))
+
+    def test_timeouts(self):
+        self.run_tests(2, False, hanging = ("test0.c", "test5.c", "test6.c"))
+
+
+if __name__ == "__main__":
+    main()
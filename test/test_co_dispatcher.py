@@ -0,0 +1,129 @@
+from unittest import (
+    skipIf,
+    TestCase,
+    main
+)
+from common import (
+    callco,
+    CoDispatcher,
+    CoEvent,
+    CoFD,
+    CoFuture,
+    CoReturn,
+    CoTimeout,
+)
+from os import (
+    close,
+    pipe,
+    read,
+    write,
+)
+from threading import (
+    Timer,
+)
+from time import (
+    time,
+)
+
+try:
+    from concurrent.futures import (
+        ThreadPoolExecutor,
+    )
+except ImportError: # Py2 without backport
+    ThreadPoolExecutor = None
+
+
+class CoWaitableTest(TestCase):
+
+    def test_timeout(self):
+        def co_sleep():
+            t = CoTimeout(0.1)
+            t0 = time()
+            yield t
+            raise CoReturn((time() - t0, t.ready))
+
+        elapsed, ready = callco(co_sleep())
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertFalse(ready)
+
+    def test_event(self):
+        def co_wait(event):
+            yield event
+            raise CoReturn(event.ready)
+
+        event = CoEvent()
+        Timer(0.05, event.set).start()
+        self.assertTrue(callco(co_wait(event)))
+
+        # already set event does not block
+        self.assertTrue(callco(co_wait(event)))
+
+        event = CoEvent(timeout = 0.05)
+        self.assertFalse(callco(co_wait(event)))
+
+    def test_fd(self):
+        r, w = pipe()
+
+        def co_read():
+            fd = CoFD(r)
+            yield fd
+            raise CoReturn(read(r, 4))
+
+        Timer(0.05, lambda : write(w, b"data")).start()
+
+        try:
+            self.assertEqual(b"data", callco(co_read()))
+        finally:
+            close(r)
+            close(w)
+
+    @skipIf(ThreadPoolExecutor is None, "concurrent.futures is not available")
+    def test_future(self):
+        def co_wait(future):
+            yield CoFuture(future)
+            raise CoReturn(future.result())
+
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(sum, [1, 2, 3])
+            self.assertEqual(6, callco(co_wait(future)))
+
+    def test_waiting_is_not_polled(self):
+        event = CoEvent()
+        polls = []
+
+        def co_wait():
+            while not event.is_set():
+                polls.append(None)
+                yield event
+
+        disp = CoDispatcher()
+        disp.enqueue(co_wait())
+
+        for __ in range(10):
+            disp.iteration()
+
+        self.assertEqual(1, len(polls))
+        self.assertTrue(disp.has_work())
+
+        event.set()
+        disp.dispatch_all()
+
+        self.assertEqual(1, len(polls))
+
+    def test_remove_waiting(self):
+        def co_wait():
+            yield CoEvent()
+
+        task = co_wait()
+
+        disp = CoDispatcher()
+        disp.enqueue(task)
+        disp.iteration()
+
+        self.assertTrue(disp.waiting)
+        disp.remove(task)
+        self.assertFalse(disp.has_work())
+
+
+if __name__ == "__main__":
+    main()
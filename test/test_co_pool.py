@@ -0,0 +1,117 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    callco,
+    CancelledCallee,
+    CoDispatcher,
+    CoPool,
+    CoReturn,
+    FunctionFailure,
+    offload_progress,
+    OffloadCancelled,
+)
+from threading import (
+    Event,
+)
+from time import (
+    sleep,
+)
+
+
+def square(x):
+    return x * x
+
+
+def fail():
+    raise ValueError("test")
+
+
+def count_up(n):
+    for i in range(n):
+        offload_progress(i)
+    return n
+
+
+def co_sum(values):
+    total = 0
+    for v in values:
+        total += v
+        yield True
+    raise CoReturn(total)
+
+
+def wait_cancel(started, cancelled):
+    started.set()
+    try:
+        while True:
+            offload_progress()
+            sleep(0.01)
+    except OffloadCancelled:
+        cancelled.set()
+        raise
+
+
+class CoPoolTest(TestCase):
+
+    def test_processes(self):
+        with CoPool(2) as pool:
+            tasks = list(pool.offload(square, i) for i in range(10))
+
+            def co_collect():
+                res = []
+                for t in tasks:
+                    res.append((yield t))
+                raise CoReturn(res)
+
+            self.assertEqual(list(i * i for i in range(10)),
+                callco(co_collect())
+            )
+
+            self.assertEqual(6, callco(pool.offload(co_sum, [1, 2, 3])))
+
+            with self.assertRaises(FunctionFailure) as ctx:
+                callco(pool.offload(fail))
+            self.assertIs(ValueError, ctx.exception.args[0])
+
+    def test_progress(self):
+        with CoPool(1) as pool:
+            task = pool.offload(count_up, 5)
+
+            progress = []
+            task.watch_progress(progress.append)
+
+            self.assertEqual(5, callco(task))
+            self.assertEqual(list(range(5)), progress)
+
+    def test_cancel(self):
+        started, cancelled = Event(), Event()
+
+        with CoPool(1, threads = True) as pool:
+            task = pool.offload(wait_cancel, started, cancelled)
+
+            def co_caller():
+                try:
+                    yield task
+                except CancelledCallee:
+                    raise CoReturn(True)
+                raise CoReturn(False)
+
+            caller = co_caller()
+
+            disp = CoDispatcher()
+            disp.enqueue(caller)
+            disp.iteration()
+            disp.iteration()
+
+            self.assertTrue(started.wait(10))
+            disp.remove(task)
+            disp.dispatch_all()
+
+            self.assertTrue(disp.get_co_ret(caller))
+            self.assertTrue(cancelled.wait(10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    callco,
+    CommitDesc,
+    CommitGraph,
+)
+from git import (
+    Actor,
+    Repo,
+)
+from os.path import (
+    join,
+)
+from shutil import (
+    rmtree,
+)
+from tempfile import (
+    mkdtemp,
+)
+
+
+class CommitGraphTest(TestCase):
+
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        self.repo = Repo.init(join(self.work_dir, "repo"))
+        self.actor = Actor("QDT", "qdt@example.com")
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+    def commit(self, message, parents = None):
+        repo = self.repo
+        file_name = join(repo.working_tree_dir, message)
+        with open(file_name, "w") as f:
+            f.write(message)
+        repo.index.add([file_name])
+        return repo.index.commit(message,
+            parent_commits = parents,
+            author = self.actor,
+            committer = self.actor,
+        ).hexsha
+
+    def update(self, graph):
+        return callco(graph.co_update(self.repo))
+
+    def test_graph(self):
+        c0 = self.commit("c0")
+        c1 = self.commit("c1")
+        main_branch = self.repo.active_branch
+        branch = self.repo.create_head("branch")
+        c2 = self.commit("c2")
+
+        graph = CommitGraph()
+        self.assertEqual(3, self.update(graph))
+        self.assertEqual(0, self.update(graph))
+
+        branch.checkout()
+        c3 = self.commit("c3")
+        main_branch.checkout()
+        m = self.commit("m", parents = [self.repo.commit(c2),
+            self.repo.commit(c3)
+        ])
+
+        path = join(self.work_dir, "graph")
+        graph.save(path)
+        graph = CommitGraph.load(path)
+
+        self.assertEqual(2, self.update(graph))
+        self.assertEqual(5, len(graph))
+
+        i = graph.sha2idx
+        self.assertEqual([i[c2], i[c3]], sorted(graph.parents(i[m])))
+        self.assertEqual([i[c2], i[c3]], sorted(graph.children(i[c1])))
+        self.assertEqual([i[m]], list(graph.iter_tips()))
+        self.assertEqual([1, 2, 3, 3, 4],
+            list(graph.generations[i[c]] for c in (c0, c1, c2, c3, m))
+        )
+
+        for sha in (c0, c1, c2, c3):
+            self.assertTrue(graph.is_ancestor(i[sha], i[m]))
+            self.assertFalse(graph.is_ancestor(i[m], i[sha]))
+        self.assertFalse(graph.is_ancestor(i[c2], i[c3]))
+
+        # parents first
+        for idx in range(len(graph)):
+            for p in graph.parents(idx):
+                self.assertLess(p, idx)
+
+    def check_nodes(self, nodes, shas):
+        self.assertEqual(set(shas), set(nodes))
+
+        for cd in nodes.values():
+            commit = self.repo.commit(cd.sha)
+            self.assertEqual(list(p.hexsha for p in commit.parents),
+                list(p.sha for p in cd.parents)
+            )
+            for p in cd.parents:
+                self.assertLess(p.num, cd.num)
+                self.assertIn(cd, p.children)
+
+        self.assertEqual(list(range(len(shas))),
+            sorted(cd.num for cd in nodes.values())
+        )
+
+    def test_commit_desc(self):
+        c0 = self.commit("c0")
+        main_branch = self.repo.active_branch
+        branch = self.repo.create_head("branch")
+        c1 = self.commit("c1")
+
+        nodes = {}
+        callco(CommitDesc.co_build_git_graph(self.repo, nodes))
+        self.check_nodes(nodes, [c0, c1])
+
+        branch.checkout()
+        c2 = self.commit("c2")
+        main_branch.checkout()
+        m = self.commit("m", parents = [self.repo.commit(c1),
+            self.repo.commit(c2)
+        ])
+
+        callco(CommitDesc.co_build_git_graph(self.repo, nodes))
+        self.check_nodes(nodes, [c0, c1, c2, m])
+
+        graph = CommitGraph()
+        self.update(graph)
+        self.check_nodes(graph.nodes, [c0, c1, c2, m])
+
+
+if __name__ == "__main__":
+    main()
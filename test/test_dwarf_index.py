@@ -0,0 +1,125 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    SectionFile,
+)
+from debug import (
+    DWARFIndex,
+    elf_index_key,
+)
+from debug.dwarf_index import (
+    DI_MAGIC,
+)
+from os.path import (
+    join,
+)
+from shutil import (
+    rmtree,
+)
+from tempfile import (
+    mkdtemp,
+)
+
+
+KEY = ("build-id", "0123456789abcdef")
+
+ROW = (0x1000, 1, 10, 0, True, False, False, True, False, 0)
+
+
+class DWARFIndexTest(TestCase):
+
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        self.path = join(self.work_dir, "index.qdi")
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+    def load(self):
+        sections = SectionFile(self.path, DI_MAGIC)
+        self.assertEqual(KEY, sections["key"])
+        return DWARFIndex(KEY, path = self.path, sections = sections)
+
+    def test_roundtrip(self):
+        index = DWARFIndex(KEY, path = self.path)
+        index.add_cu(0, (b"a.c", b"src"))
+        index.add_line_program(0, [[b".", b"a.c"]], [ROW])
+        index.add_sp_range(0x1000, 0x1010, 0)
+        index.add_fde(0x1000, 0x1010, 0x20, 0x48)
+        index.set_name_table("pubnames", {"main": (0, 0x2d)})
+        index.save()
+        self.assertFalse(index.changed)
+
+        index = self.load()
+        self.assertEqual([(0, (b"a.c", b"src"))], index.cus)
+        self.assertFalse(index.cus_complete)
+        self.assertEqual([(0x1000, 0x1010, 0)], index.sp_ranges)
+        self.assertEqual([(0x1000, 0x1010, 0x20)], index.fdes)
+        self.assertEqual(0x48, index.cfi_end)
+        self.assertEqual({"pubnames": {"main": (0, 0x2d)}},
+            index.name_tables
+        )
+        # line programs are loaded on demand
+        self.assertEqual({}, index.line_programs)
+        self.assertIsNone(index.line_program(100))
+
+        # not loaded line program is preserved
+        index.add_line_program(100, [[b".", b"b.c"]], [])
+        index.save()
+
+        index = self.load()
+        self.assertEqual(([[b".", b"a.c"]], [ROW]), index.line_program(0))
+        self.assertEqual(([[b".", b"b.c"]], []), index.line_program(100))
+
+
+class Section(dict):
+
+    def __init__(self, name, notes = (), **fields):
+        dict.__init__(self, **fields)
+        self.name = name
+        self.notes = notes
+
+    def iter_notes(self):
+        return iter(self.notes)
+
+
+class ELF(object):
+    "Few `elftools.elf.elffile.ELFFile` methods `elf_index_key` uses."
+
+    def __init__(self, *sections):
+        self.sections = sections
+
+    def iter_sections(self):
+        return iter(self.sections)
+
+    def get_section_by_name(self, name):
+        for s in self.sections:
+            if s.name == name:
+                return s
+        return None
+
+
+class ELFIndexKeyTest(TestCase):
+
+    def test_stripped(self):
+        build_id = Section(".note.gnu.build-id",
+            notes = [dict(n_type = "NT_GNU_BUILD_ID", n_desc = "0123abcd")],
+            sh_type = "SHT_NOTE"
+        )
+        debug_info = Section(".debug_info",
+            sh_type = "SHT_PROGBITS",
+            sh_size = 0x1234
+        )
+
+        full = elf_index_key(ELF(build_id, debug_info), __file__)
+        stripped = elf_index_key(ELF(build_id), __file__)
+
+        self.assertEqual(("build-id", "0123abcd", 0x1234), full)
+        self.assertEqual(("build-id", "0123abcd", None), stripped)
+        self.assertEqual("stat", elf_index_key(ELF(debug_info), __file__)[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    LRUCache,
+)
+
+
+class LRUCacheTest(TestCase):
+
+    def test(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+
+        # "a" becomes most recently used
+        self.assertEqual(1, cache.get("a"))
+
+        cache["c"] = 3
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache["a"])
+        self.assertEqual(3, cache["c"])
+        self.assertEqual(2, len(cache))
+
+        with self.assertRaises(KeyError):
+            cache["b"]
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    callco,
+    CoPool,
+)
+from qemu import (
+    co_layout_machine,
+    IRQHub,
+    IRQLine,
+    LAYOUT_DYNAMIC,
+    LAYOUT_IRQ_LINES_POINTS,
+    MachineDescription,
+    MachineLayout,
+    PCIExpressBusNode,
+    PCIExpressDeviceNode,
+    SystemBusDeviceNode,
+    SystemBusNode,
+)
+from random import (
+    seed,
+)
+
+
+def gen_machine(sysbus_devices = 40, pci_devices = 10):
+    mach = MachineDescription(name = "test", directory = "")
+
+    sysbus = SystemBusNode()
+    mach.add_node(sysbus)
+
+    pic = SystemBusDeviceNode(qom_type = "TYPE_PIC", system_bus = sysbus)
+    mach.add_node(pic)
+
+    hub = IRQHub(srcs = [], dsts = [])
+    mach.add_node(hub)
+    mach.add_node(IRQLine(src_dev = hub, dst_dev = pic))
+
+    for i in range(sysbus_devices):
+        dev = SystemBusDeviceNode(
+            qom_type = "TYPE_DEVICE_%u" % i,
+            system_bus = sysbus
+        )
+        mach.add_node(dev)
+        if i % 4 == 0:
+            mach.add_node(IRQLine(src_dev = dev, dst_dev = hub))
+
+    host = SystemBusDeviceNode(qom_type = "TYPE_PCI_HOST", system_bus = sysbus)
+    mach.add_node(host)
+
+    pci = PCIExpressBusNode(host_bridge = host)
+    mach.add_node(pci)
+
+    for i in range(pci_devices):
+        mach.add_node(PCIExpressDeviceNode(
+            qom_type = "TYPE_PCI_DEVICE_%u" % i,
+            pci_express_bus = pci,
+            slot = i,
+            function = 0
+        ))
+
+    return mach
+
+
+def overlap(a, b):
+    a, b = a.aabb(), b.aabb()
+    return not (a[0] >= b[2] or b[0] >= a[2] or a[1] >= b[3] or b[1] >= a[3])
+
+
+class MachineLayoutTest(TestCase):
+
+    def setUp(self):
+        # `MachineLayout` breaks symmetry randomly.
+        seed(0)
+        self.mach = gen_machine()
+
+    def test_settle(self):
+        ml = MachineLayout(self.mach)
+        ticks = callco(ml.co_settle(ticks = 3000))
+        self.assertLess(ticks, 3000)
+
+        boxes = ml.nodes + ml.buslabels
+        for i, n in enumerate(boxes):
+            for n1 in boxes[i + 1:]:
+                self.assertFalse(overlap(n, n1))
+
+        layout = ml.gen_layout()
+        conf = layout.pop(-1)
+
+        self.assertEqual(
+            set(n.id for n in self.mach.iter_nodes()
+                if not isinstance(n, IRQLine)
+            ),
+            set(layout)
+        )
+        self.assertFalse(conf[LAYOUT_DYNAMIC])
+        self.assertEqual(set(irq.id for irq in self.mach.irqs),
+            set(conf[LAYOUT_IRQ_LINES_POINTS])
+        )
+
+    def test_static(self):
+        ml = MachineLayout(self.mach)
+        node = ml.dev2node[self.mach.devices[1]]
+        node.static = True
+        pos = (node.x, node.y)
+
+        callco(ml.co_settle(ticks = 100))
+
+        self.assertEqual(pos, (node.x, node.y))
+
+    def test_initial_layout(self):
+        dev = self.mach.devices[1]
+        layout = {
+            dev.id: (-1000, 2000),
+            -1: { "show mesh": True },
+        }
+
+        res = callco(co_layout_machine(self.mach, layout = layout, ticks = 0))
+
+        self.assertEqual((-1000, 2000), res[dev.id])
+        self.assertTrue(res[-1]["show mesh"])
+
+    def test_offload(self):
+        pool = CoPool(1)
+        try:
+            res = callco(pool.offload(co_layout_machine, self.mach))
+        finally:
+            pool.terminate()
+
+        self.assertEqual(len(self.mach.id2node) - len(self.mach.irqs) + 1,
+            len(res)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from unittest import (
+    skipUnless,
+    TestCase,
+    main
+)
+from debug import (
+    InMemoryELFFile,
+    map_file,
+    MappedELFFile,
+    MappedStream,
+)
+from os import (
+    close,
+    remove,
+    SEEK_END,
+    write,
+)
+from os.path import (
+    realpath,
+)
+from sys import (
+    executable,
+)
+from tempfile import (
+    mkstemp,
+)
+
+
+def is_elf(file_name):
+    with open(file_name, "rb") as f:
+        return f.read(4) == b"\x7fELF"
+
+
+class MappedStreamTest(TestCase):
+
+    def setUp(self):
+        fd, self.path = mkstemp()
+        write(fd, b"0123456789")
+        close(fd)
+
+    def tearDown(self):
+        remove(self.path)
+
+    def test_stream(self):
+        s = MappedStream(map_file(self.path))
+        self.assertEqual(b"012", s.read(3))
+        self.assertEqual(3, s.tell())
+        s.seek(-2, SEEK_END)
+        self.assertEqual(b"89", s.read())
+        self.assertEqual(b"", s.read(1))
+
+    def test_shared(self):
+        m = map_file(self.path, shared = True)
+        self.assertIs(m, map_file(self.path, shared = True))
+        self.assertIsNot(m, map_file(self.path))
+
+        # streams over one mapping have own positions
+        s1, s2 = MappedStream(m), MappedStream(m)
+        s1.seek(5)
+        self.assertEqual(b"01", s2.read(2))
+        self.assertEqual(b"56", s1.read(2))
+
+
+@skipUnless(is_elf(realpath(executable)), "Python executable is not ELF")
+class MappedELFFileTest(TestCase):
+
+    def test_same_as_in_memory(self):
+        file_name = realpath(executable)
+        mapped = MappedELFFile(file_name, shared = True)
+        in_memory = InMemoryELFFile(file_name)
+
+        self.assertEqual(in_memory.header, mapped.header)
+        self.assertEqual(
+            list(s.name for s in in_memory.iter_sections()),
+            list(s.name for s in mapped.iter_sections())
+        )
+
+
+if __name__ == "__main__":
+    main()
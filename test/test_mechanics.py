@@ -0,0 +1,143 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    integrate_velocities,
+    PhBox,
+    PhCircle,
+    PhDiagram,
+    SpatialHash,
+)
+from random import (
+    Random,
+)
+
+
+def random_objects(rand, count):
+    objs = []
+    for __ in range(count):
+        x, y = rand.uniform(-500, 500), rand.uniform(-500, 500)
+        if rand.random() < 0.2:
+            objs.append(PhCircle(x = x, y = y, r = rand.randint(5, 20)))
+        else:
+            objs.append(PhBox(x = x, y = y,
+                w = rand.randint(0, 120),
+                h = rand.randint(0, 80),
+                spacing = rand.randint(0, 10)
+            ))
+    return objs
+
+
+def overlap(a, b):
+    return not (a[0] > b[2] or b[0] > a[2] or a[1] > b[3] or b[1] > a[3])
+
+
+class SpatialHashTest(TestCase):
+
+    def test_pairs(self):
+        rand = Random(0)
+        objs = random_objects(rand, 300)
+
+        expected = set()
+        for i, o in enumerate(objs):
+            for o1 in objs[i + 1:]:
+                if overlap(o.spaced_aabb(), o1.spaced_aabb()):
+                    expected.add((id(o), id(o1)))
+        self.assertTrue(expected)
+
+        for cell in (7, 50, 1000):
+            sh = SpatialHash(cell)
+            sh.extend(objs)
+
+            pairs = list((id(a), id(b)) for a, b in sh.iter_pairs())
+            self.assertEqual(len(set(pairs)), len(pairs))
+            self.assertEqual(expected, set(pairs))
+
+    def test_query(self):
+        rand = Random(1)
+        objs = random_objects(rand, 200)
+
+        sh = SpatialHash(40)
+        sh.extend(objs)
+
+        for aabb in [(0, 0, 0, 300), (-100, -100, 100, 100), (600, 0, 700, 0)]:
+            self.assertEqual(
+                list(o for o in objs if overlap(aabb, o.spaced_aabb())),
+                sh.query(aabb)
+            )
+
+
+class IntegrationTest(TestCase):
+
+    def test_limit(self):
+        objs = list(PhBox(x = 0, y = 0, vx = v, vy = -v) for v in range(-30, 31))
+        integrate_velocities(objs, 10)
+
+        for v, o in zip(range(-30, 31), objs):
+            lv = max(-10, min(10, v))
+            self.assertEqual((lv, -lv, lv, -lv), (o.x, o.y, o.vx, o.vy))
+
+
+class LightCircle(PhCircle):
+
+    light = True
+
+
+class Diagram(PhDiagram):
+
+    velocity_k = 0.05
+    bus_velocity_k = 0.05
+
+    def __init__(self, nodes = (), circles = ()):
+        self.nodes = list(nodes)
+        self.buslabels = []
+        self.buses = []
+        self.conns = []
+        self.circles = list(circles)
+
+    def react(self):
+        for o in self.nodes + self.circles:
+            o.vx = o.vy = 0
+        for __ in self.ph_co_reactions():
+            pass
+
+
+class DiagramTest(TestCase):
+
+    def test_boxes(self):
+        a = PhBox(x = 0, y = 0, w = 20, h = 20, spacing = 0)
+        b = PhBox(x = 10, y = 0, w = 20, h = 20, spacing = 0)
+        Diagram(nodes = [a, b]).react()
+
+        self.assertLess(a.vx, 0)
+        self.assertGreater(b.vx, 0)
+        self.assertEqual((-a.vx, -a.vy), (b.vx, b.vy))
+
+    def test_light(self):
+        box = PhBox(x = 0, y = 0, w = 20, h = 20, spacing = 0)
+        hub = PhCircle(x = 100, y = 100, r = 5, spacing = 0)
+        point = LightCircle(x = 12, y = 12, r = 5, spacing = 0)
+        diagram = Diagram(nodes = [box], circles = [hub, point])
+
+        # a light circle does not push a box...
+        diagram.react()
+        self.assertEqual((0, 0), (box.vx, box.vy))
+        self.assertNotEqual((0, 0), (point.vx, point.vy))
+
+        point.x = point.y = 200
+        hub.x = hub.y = 12
+        diagram.react()
+        self.assertNotEqual((0, 0), (box.vx, box.vy))
+        self.assertNotEqual((0, 0), (hub.vx, hub.vy))
+
+        # ... and a not light circle
+        box.x = box.y = 300
+        hub.x, hub.y = 0, 0
+        point.x, point.y = 4, 0
+        diagram.react()
+        self.assertEqual((0, 0), (hub.vx, hub.vy))
+        self.assertNotEqual((0, 0), (point.vx, point.vy))
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,8 @@ from source import (
     Call,
     Pointer,
     Enumeration,
-    add_base_types
+    add_base_types,
+    SourceTreeContainer,
 )
 from common import (
     ee
@@ -1199,5 +1200,43 @@ int gl __attribute__((unused));
         ]
 
 
+class TestSourceTreeSnapshot(TestCase):
+
+    def setUp(self):
+        self.stc = SourceTreeContainer()
+        self.prev_stc = self.stc.set_cur_stc()
+
+    def tearDown(self):
+        self.prev_stc.set_cur_stc()
+
+    def generate(self):
+        base_h = Header.lookup("base.h")
+        gen_h = Header("gen.h")
+        gen_h.add_inclusion(base_h)
+        gen_h.add_type(Structure("Gen", Pointer(Type["Base"])("field")))
+        base_h.add_reference(Type["Gen"])
+
+    def test(self):
+        base_h = Header("base.h")
+        base_h.add_type(Macro("Base"))
+
+        snapshot = self.stc.snapshot()
+
+        self.generate()
+        self.assertIn(base_h, Header.lookup("gen.h").inclusions.values())
+
+        self.stc.restore(snapshot)
+
+        self.assertFalse(Type.exists("Gen"))
+        self.assertRaises(RuntimeError, Header.lookup, "gen.h")
+        self.assertEqual([], base_h.includers)
+        self.assertEqual(set(), base_h.references)
+        self.assertEqual(["Base"], list(base_h.types))
+        self.assertIs(base_h, Type["Base"].definer)
+
+        # same named types and headers can be created again
+        self.generate()
+
+
 if __name__ == "__main__":
     main()
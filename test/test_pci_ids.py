@@ -0,0 +1,132 @@
+from unittest import (
+    TestCase,
+    main
+)
+from source import (
+    Header,
+    Macro,
+    Type,
+)
+from qemu import (
+    PCIClassification,
+    PCIId,
+)
+from pickle import (
+    dumps,
+    loads,
+)
+
+
+class PCIClassificationTest(TestCase):
+
+    def setUp(self):
+        Type.reg = {}
+        Header.reg = {}
+
+        self.prev_db = PCIId.db
+        PCIId.db = PCIClassification()
+
+        for name, text in [
+            ("PCI_VENDOR_ID_AMD", "0x1022"),
+            ("PCI_VENDOR_ID_INTEL", "0x8086"),
+            ("PCI_VENDOR_ID_REDHAT", "0x1b36"),
+            ("PCI_VENDOR_ID_REDHAT_QUMRANET", "0x1af4"),
+            ("PCI_VENDOR_ID_ZERO", "0x0"),
+            ("PCI_DEVICE_ID_AMD_LANCE", "0x2000"),
+            ("PCI_DEVICE_ID_INTEL_82557", "0x1229"),
+            ("PCI_DEVICE_ID_INTEL_ESB_9", "0x25ab"),
+            ("PCI_DEVICE_ID_REDHAT_QUMRANET_BALLOON", "0x0"),
+            ("PCI_DEVICE_ID_REDHAT_BRIDGE", "0x0001"),
+            ("PCI_DEVICE_ID_UNKNOWN_VENDOR_X", "0x0002"),
+            ("PCI_CLASS_NETWORK_ETHERNET", "0x0200"),
+        ]:
+            Macro(name, text = text)
+
+        PCIClassification.build()
+        self.db = PCIId.db
+
+    def tearDown(self):
+        PCIId.db = self.prev_db
+
+    def test_build(self):
+        db = self.db
+
+        self.assertEqual(5, len(db.vendors))
+        self.assertEqual(set([
+                "AMD_LANCE",
+                "INTEL_82557",
+                "INTEL_ESB_9",
+                "REDHAT_QUMRANET_BALLOON",
+                "REDHAT_BRIDGE",
+            ]),
+            set(db.devices)
+        )
+
+        # longest vendor name is preferred
+        balloon = db.devices["REDHAT_QUMRANET_BALLOON"]
+        self.assertEqual("QUMRANET", balloon.vendor.name[7:])
+        self.assertEqual("BALLOON", balloon.name)
+
+        self.assertEqual("ESB_9", db.devices["INTEL_ESB_9"].name)
+
+    def test_lookup(self):
+        db = self.db
+
+        self.assertIs(db.vendors["INTEL"], db.get_vendor(vid = "0x8086"))
+        self.assertIs(db.classes["NETWORK_ETHERNET"],
+            db.get_class(cid = "0x0200")
+        )
+        self.assertIs(db.devices["INTEL_82557"], db.get_device(did = "0X1229"))
+
+        # vendor is got by device macro name
+        dev = db.get_device(name = "PCI_DEVICE_ID_AMD_X", did = "0x7")
+        self.assertIs(db.vendors["AMD"], dev.vendor)
+
+        self.assertEqual([db.devices["INTEL_ESB_9"]],
+            list(db.find_devices(id = "0x25ab"))
+        )
+        # exact ID value is required by `find_*`
+        self.assertEqual([], list(db.find_devices(id = "0x25AB")))
+        self.assertEqual([db.vendors["INTEL"]],
+            list(db.find_vendors(name = "INTEL"))
+        )
+
+    def test_unique_ids(self):
+        db = self.db
+
+        # 0x0 is used by both vendors and devices, 0x1 by a device. 0x2
+        # device has no known vendor and is not accounted.
+        self.assertEqual("0x1", db.gen_uniq_vid())
+        self.assertEqual("0x2", db.gen_uniq_did())
+
+        db.get_device(name = "NEW", vendor_name = "AMD")
+        self.assertIn("AMD_NEW", db.devices)
+        self.assertEqual("0x2", db.devices["AMD_NEW"].id)
+        self.assertEqual("0x3", db.gen_uniq_did())
+
+        db.get_device(name = "OTHER", vendor_name = "NEW_VENDOR")
+        self.assertEqual("0x1", db.vendors["NEW_VENDOR"].id)
+        self.assertEqual("0x2", db.gen_uniq_vid())
+
+    def test_pickle(self):
+        db = loads(dumps(self.db))
+
+        self.assertTrue(db.built)
+        self.assertEqual(sorted(self.db.devices), sorted(db.devices))
+
+        # indexes are rebuilt
+        self.assertIs(db.vendors["INTEL"], db.get_vendor(vid = "0x8086"))
+        self.assertIs(db.devices["INTEL_82557"], db.get_device(did = "0x1229"))
+        self.assertEqual([db.classes["NETWORK_ETHERNET"]],
+            list(db.find_classes(id = "0x0200"))
+        )
+        balloon = db.vendor_of_device("REDHAT_QUMRANET_BALLOON")
+        self.assertEqual((db.vendors["REDHAT_QUMRANET"], "BALLOON"), balloon)
+        self.assertEqual("0x1", db.gen_uniq_vid())
+        self.assertEqual("0x2", db.gen_uniq_did())
+
+        self.assertNotIn("vendors_by_id", db.__getstate__())
+
+
+if __name__ == "__main__":
+    main()
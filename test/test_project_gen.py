@@ -0,0 +1,131 @@
+from unittest import (
+    TestCase,
+    main,
+    skipUnless,
+)
+from qemu import (
+    QProject,
+)
+from qemu.version import (
+    initialize_version,
+)
+from source import (
+    add_base_types,
+    Function,
+    Header,
+    Source,
+    Structure,
+    Type,
+)
+from multiprocessing import (
+    get_start_method,
+)
+from os import (
+    walk,
+)
+from os.path import (
+    join,
+    relpath,
+)
+from shutil import (
+    rmtree,
+)
+from tempfile import (
+    mkdtemp,
+)
+
+
+class DummyDescription(object):
+    "A device description generating a header and a source."
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.project = None
+
+    def gen_type(self):
+        return self
+
+    def co_gen_sources(self):
+        path = join("hw", self.directory, self.name)
+
+        h = Header(path + ".h")
+        state = Structure(self.name.upper() + "State")
+        h.add_type(state)
+
+        yield True
+
+        s = Source(path + ".c")
+        s.add_type(Function(self.name + "_init",
+            args = [ state.gen_var("s", pointer = True) ]
+        ))
+
+        self.sources = [h, s]
+
+
+def read_tree(root):
+    tree = {}
+    for dirpath, __, filenames in walk(root):
+        for fn in filenames:
+            full = join(dirpath, fn)
+            with open(full, "rb") as f:
+                tree[relpath(full, root)] = f.read()
+    return tree
+
+
+@skipUnless(get_start_method() == "fork", "workers must be forked")
+class ParallelGenerationTest(TestCase):
+    "Parallel generation must result in same tree as sequential one."
+
+    build_system = "Makefile"
+    build_file = "Makefile.objs"
+
+    def setUp(self):
+        initialize_version({ "build system": self.build_system })
+        self.trees = []
+
+    def tearDown(self):
+        for t in self.trees:
+            rmtree(t)
+
+    def gen(self, jobs):
+        Type.reg = {}
+        Header.reg = {}
+        add_base_types()
+
+        project = QProject(descriptions = [
+            DummyDescription("dev_a", "misc"),
+            DummyDescription("dev_b", "misc"),
+            DummyDescription("dev_c", "timer"),
+            DummyDescription("dev_d", join("misc", "sub")),
+            DummyDescription("dev_e", "timer"),
+        ])
+
+        root = mkdtemp(prefix = "qdt-test-gen-")
+        self.trees.append(root)
+
+        project.gen_all(root, jobs = jobs)
+
+        return read_tree(root)
+
+    def test_same_tree(self):
+        sequential = self.gen(1)
+        parallel = self.gen(3)
+
+        self.assertIn(join("hw", "timer", "dev_e.c"), sequential)
+        self.assertIn(join("hw", "misc", "sub", "dev_d.h"), sequential)
+        self.assertIn(join("hw", "misc", self.build_file), sequential)
+
+        self.assertEqual(sorted(sequential), sorted(parallel))
+        for path, data in sequential.items():
+            self.assertEqual(data, parallel[path], path)
+
+
+class ParallelGenerationMesonTest(ParallelGenerationTest):
+
+    build_system = "meson"
+    build_file = "meson.build"
+
+
+if __name__ == "__main__":
+    main()
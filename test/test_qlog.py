@@ -0,0 +1,408 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    CoPool,
+    SectionFile,
+)
+from qemu import (
+    export_columns,
+    find_divergence,
+    QEMULog,
+    QLogIndex,
+    QLogSteps,
+    TraceColumns,
+    TraceColumnsWriter,
+)
+from qemu.qlog import (
+    QLI_MAGIC,
+)
+from collections import (
+    Counter,
+)
+from os.path import (
+    join,
+)
+from random import (
+    Random,
+)
+from shutil import (
+    rmtree,
+)
+from tempfile import (
+    mkdtemp,
+)
+
+
+def gen_log(f, steps):
+    "Writes `-d in_asm,exec` log with overlapping TBs and linking."
+
+    rand = Random(0)
+    w = f.write
+    translated = []
+
+    for __ in range(steps):
+        r = rand.random()
+        if not translated or r < 0.1:
+            addr = start = 0x1000 + 0x40 * rand.randint(0, 30)
+            if r < 0.03:
+                start = addr = addr + rand.randint(1, 3)
+            w("IN: \n")
+            for __ in range(rand.randint(1, 6)):
+                size = rand.randint(1, 4)
+                w("0x%08x:  %s  nop\n" % (addr, " ".join(["90"] * size)))
+                addr += size
+            w("\n")
+            translated.append(start)
+        elif r < 0.2 and len(translated) > 1:
+            a, b = rand.sample(translated, 2)
+            w("Linking TBs 0x0 [%08x] index 0 -> 0x0 [%08x]\n" % (a, b))
+        else:
+            w("Trace 0: 0x0 [00000000/%08x/0x00000000] \n" % (
+                rand.choice(translated)
+            ))
+
+
+class GenLogTestCase(TestCase):
+    "Generates `self.log` of `steps` steps (see `gen_log`) in `self.work_dir`."
+
+    steps = 3000
+
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        self.log = join(self.work_dir, "qemu.log")
+        with open(self.log, "w") as f:
+            gen_log(f, self.steps)
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+
+def steps_of(instrs):
+    return list((i.icount, i.addr, i.tb, i.trace.lineno if i.trace else None)
+        for i in instrs
+    )
+
+
+# TB 0 at 0x1000 and TB 1 at 0x2000 are in version 0. Linking starts
+# version 1. TB 2 does not overlap anything of version 1. TB 3 re-translates
+# 0x1001 overlapping TB 2, version 2. Linkings start versions 3 and 4. TB 4 is
+# in version 4.
+TB_CACHE_LOG = """\
+IN: 
+0x00001000:  90  nop
+0x00001001:  90 90  nop
+0x00001003:  90  nop
+
+IN: 
+0x00002000:  90  nop
+
+Trace 0: 0x0 [00000000/00001000/0x00000000] 
+Linking TBs 0x0 [00001000] index 0 -> 0x0 [00002000]
+IN: 
+0x00001002:  90 90  nop
+0x00001004:  90  nop
+
+IN: 
+0x00001001:  90 90  nop
+
+Linking TBs 0x0 [00001001] index 0 -> 0x0 [00002000]
+Linking TBs 0x0 [00001000] index 0 -> 0x0 [00001002]
+IN: 
+0x00003000:  90 90  nop
+
+Trace 0: 0x0 [00000000/00003000/0x00000000] 
+"""
+
+
+class TBCacheTest(TestCase):
+
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        log = join(self.work_dir, "qemu.log")
+        with open(log, "w") as f:
+            f.write(TB_CACHE_LOG)
+
+        qlog = QEMULog(log)
+        for __ in qlog.iter_instructions():
+            pass
+        qlog.file.close()
+
+        self.cache = qlog.cache
+
+    def tearDown(self):
+        rmtree(self.work_dir)
+
+    def test_instructions(self):
+        cache = self.cache
+        self.assertEqual(4, cache.version)
+
+        first = cache.lookInstr(0x1001, 0)
+        self.assertEqual((0, 2, 0), (first.tb, first.size, first.cache_version))
+        self.assertIs(first, cache.lookInstr(0x1001, 1))
+
+        again = cache.lookInstr(0x1001)
+        self.assertEqual((3, 2), (again.tb, again.cache_version))
+        self.assertIs(again, cache.lookInstr(0x1001, 2))
+
+        self.assertIsNone(cache.lookInstr(0x1002, 0))
+        self.assertEqual(2, cache.lookInstr(0x1002, 1).tb)
+        self.assertEqual(0, cache.lookInstr(0x1003).tb)
+        self.assertIsNone(cache.lookInstr(0x3000, 3))
+        self.assertIsNone(cache.lookInstr(0x1005))
+
+        self.assertEqual(3, cache.lookTB(0x1001))
+        self.assertEqual(0, cache.lookTB(0x1000))
+
+    def test_links(self):
+        cache = self.cache
+
+        self.assertIsNone(cache.lookLink(0, 0))
+        self.assertEqual(1, cache.lookLink(0, 1))
+        self.assertEqual(1, cache.lookLink(0, 3))
+        self.assertEqual(2, cache.lookLink(0))
+
+        self.assertIsNone(cache.lookLink(3, 2))
+        self.assertEqual(1, cache.lookLink(3))
+        self.assertIsNone(cache.lookLink(1))
+
+    def test_overlaps(self):
+        cache = self.cache
+
+        # only TB 4 is in current version
+        self.assertTrue(cache.overlaps(0x3001, 1))
+        self.assertTrue(cache.overlaps(0x2FFF, 2))
+        self.assertFalse(cache.overlaps(0x2FFF, 1))
+        self.assertFalse(cache.overlaps(0x3002, 1))
+        self.assertFalse(cache.overlaps(0x1000, 4))
+
+
+class QLogIndexTest(GenLogTestCase):
+
+    def test_window(self):
+        full = steps_of(QEMULog(self.log).iter_instructions())
+        self.assertGreater(len(full), 2000)
+
+        path = join(self.work_dir, "index.qli")
+        index = QLogIndex(self.log, ("test",),
+            path = path,
+            checkpoint_interval = 100
+        )
+        index.build()
+        index.save()
+        self.assertGreater(len(index.checkpoints), 10)
+
+        index = QLogIndex(self.log, ("test",),
+            path = path,
+            sections = SectionFile(path, QLI_MAGIC)
+        )
+        qlog = QEMULog(self.log, index = index)
+
+        for start, end in [(0, 50), (1234, 1500), (len(full) - 10, None)]:
+            self.assertEqual(full[start:end],
+                steps_of(qlog.iter_window(start, end))
+            )
+
+
+class BinaryOffsetsTest(GenLogTestCase):
+    "Byte offsets of lines differ from character offsets in that log."
+
+    def setUp(self):
+        GenLogTestCase.setUp(self)
+
+        with open(self.log, "rb") as f:
+            data = f.read()
+
+        data = data.replace(b" nop\n", u" nop ; \u0436\r\n".encode("utf-8"))
+        with open(self.log, "wb") as f:
+            f.write(data)
+
+    def test_offsets(self):
+        full = steps_of(QEMULog(self.log).iter_instructions())
+
+        index = QLogIndex(self.log, ("test",), checkpoint_interval = 100)
+        index.build()
+        qlog = QEMULog(self.log, index = index)
+
+        for start, end in [(1234, 1500), (len(full) - 10, None)]:
+            self.assertEqual(full[start:end],
+                steps_of(qlog.iter_window(start, end))
+            )
+
+        qlog = QEMULog(self.log, jobs = 2, chunk_lines = 100)
+        self.assertEqual(full, steps_of(qlog.iter_instructions()))
+
+
+class ParallelQEMULogTest(GenLogTestCase):
+
+    steps = 10000
+
+    def test_same_steps(self):
+        # few lines per chunk to get many chunks
+        qlog = QEMULog(self.log, jobs = 3, chunk_lines = 1)
+        self.assertGreater(qlog.line_index.total_lines, 8 << 10)
+
+        self.assertEqual(
+            steps_of(QEMULog(self.log).iter_instructions()),
+            steps_of(qlog.iter_instructions())
+        )
+
+
+class Step(object):
+
+    def __init__(self, icount, addr, tb, cache_version):
+        self.icount = icount
+        self.addr = addr
+        self.tb = tb
+        self.cache_version = cache_version
+
+
+class TraceColumnsTest(GenLogTestCase):
+
+    def test_columns(self):
+        steps = list(QEMULog(self.log).iter_instructions())
+
+        columns = export_columns(QEMULog(self.log),
+            join(self.work_dir, "trace"),
+            flush_steps = 1000
+        )
+
+        self.assertEqual(len(steps), len(columns))
+        self.assertEqual(list(s.addr for s in steps),
+            list(columns.column("addr"))
+        )
+        self.assertEqual(list(s.icount for s in steps[100:200]),
+            list(columns.column("icount", 100, 200))
+        )
+
+        self.assertEqual(dict(Counter(s.addr for s in steps)),
+            columns.addr_histogram()
+        )
+
+        tbs = Counter(s.tb for s in steps)
+        hot = columns.hot_tbs(3)
+        self.assertEqual(3, len(hot))
+        self.assertEqual(tbs.most_common(1)[0][1], hot[0][1])
+        for tb, n in hot:
+            self.assertEqual(tbs[tb], n)
+
+        self.assertIsNone(columns.first_difference(columns))
+
+        def write(name, steps):
+            path = join(self.work_dir, name)
+            with TraceColumnsWriter(path, flush_steps = 1000) as w:
+                w.extend(steps)
+            return path
+
+        steps = list(Step(s.icount, s.addr, s.tb, s.cache_version)
+            for s in steps
+        )
+        prefix = TraceColumns(write("prefix", steps[:1500]))
+        self.assertEqual(1500, columns.first_difference(prefix))
+
+        steps[1234].addr += 1
+        other = TraceColumns(write("other", steps))
+        self.assertEqual(1234, columns.first_difference(other))
+        self.assertEqual(1234, other.first_difference(columns))
+
+
+class DivergenceTest(GenLogTestCase):
+
+    def setUp(self):
+        GenLogTestCase.setUp(self)
+
+        with open(self.log, "r") as f:
+            lines = f.readlines()
+
+        traces = list(i for i, l in enumerate(lines) if l.startswith("Trace"))
+
+        # Another TB is executed in the middle of the log.
+        i = traces[len(traces) // 2]
+        for j in traces:
+            if lines[j] != lines[i]:
+                break
+        lines[i] = lines[j]
+
+        self.other = join(self.work_dir, "b.log")
+        with open(self.other, "w") as f:
+            f.writelines(lines)
+
+        self.prefix = join(self.work_dir, "c.log")
+        with open(self.prefix, "w") as f:
+            f.writelines(lines[:i])
+
+    def expected(self, log1, log2):
+        steps1 = steps_of(QEMULog(log1).iter_instructions())
+        steps2 = steps_of(QEMULog(log2).iter_instructions())
+        for i, (s1, s2) in enumerate(zip(steps1, steps2)):
+            if s1[1] != s2[1]:
+                return i
+        return min(len(steps1), len(steps2))
+
+    def find(self, *logs, **kw):
+        return find_divergence(list(QEMULog(l) for l in logs),
+            window = 64,
+            **kw
+        )
+
+    def test_divergence(self):
+        self.assertIsNone(self.find(self.log, self.log))
+
+        expected = self.expected(self.log, self.other)
+        self.assertGreater(expected, 1000)
+
+        div = self.find(self.log, self.other, before = 10)
+        self.assertEqual(expected, div.index)
+        self.assertEqual(expected - div.start, 10 + expected % 64)
+        step = div.steps_lists[0][div.index - div.start]
+        self.assertIs(step.difference, div.steps[1])
+        self.assertNotEqual(div.steps[0].addr, div.steps[1].addr)
+
+        div = self.find(self.log, self.log, self.prefix)
+        self.assertEqual(self.expected(self.log, self.prefix), div.index)
+        self.assertIsNone(div.steps[2])
+
+        with CoPool(2) as pool:
+            div = self.find(self.other, self.log, pool = pool)
+        self.assertEqual(expected, div.index)
+
+    def test_indexed(self):
+        qlogs = []
+        for log in (self.log, self.other):
+            index = QLogIndex(log, ("test",), checkpoint_interval = 100)
+            index.build()
+            qlogs.append(QEMULog(log, index = index))
+
+        div = find_divergence(qlogs, window = 64)
+        self.assertEqual(self.expected(self.log, self.other), div.index)
+
+
+class QLogStepsTest(GenLogTestCase):
+
+    def test_random_access(self):
+        full = steps_of(QEMULog(self.log).iter_instructions())
+
+        index = QLogIndex(self.log, ("test",), checkpoint_interval = 100)
+        index.build()
+        self.assertEqual(len(full), index.count)
+
+        qlog = QEMULog(self.log, index = index, keep_trace = False)
+        steps = QLogSteps([qlog], block = 32, blocks = 4)
+        self.assertEqual(len(full), len(steps))
+
+        # sequential, backward, far forward and near forward accesses
+        for start, end in [(0, 100), (40, 70), (2000, 2100), (1500, 1600),
+            (1630, 1700), (len(full) - 50, len(full) + 10)
+        ]:
+            self.assertEqual(full[start:end], steps_of(steps[start:end]))
+
+        self.assertEqual(full[1234], steps_of([steps[1234]])[0])
+        self.assertRaises(IndexError, lambda : steps[len(full)])
+
+        # nothing is accumulated by the log
+        self.assertEqual([], qlog.trace)
+
+
+if __name__ == "__main__":
+    main()
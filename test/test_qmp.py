@@ -0,0 +1,103 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    QMPClient,
+)
+from json import (
+    dumps,
+    loads,
+)
+from socket import (
+    socket,
+    AF_INET,
+    SOCK_STREAM,
+    timeout as socket_timeout,
+)
+from threading import (
+    Event,
+    Thread,
+)
+
+
+class StubQEMU(object):
+    """ Answers QMP commands. "query-status" response is preceded by an event.
+"hang" command is not answered.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.hung = Event()
+
+        self.sock = s = socket(AF_INET, SOCK_STREAM)
+        s.bind(("localhost", 0))
+        s.listen(1)
+        self.port = s.getsockname()[1]
+
+        self.thread = t = Thread(target = self.serve)
+        t.daemon = True
+        t.start()
+
+    def serve(self):
+        conn, __ = self.sock.accept()
+        f = conn.makefile("rb")
+
+        def send(obj):
+            conn.sendall(dumps(obj).encode("utf-8") + b"\r\n")
+
+        send({"QMP": {"version": {}, "capabilities": []}})
+
+        for line in f:
+            request = loads(line.decode("utf-8"))
+            self.requests.append(request)
+
+            command = request["execute"]
+            if command == "query-status":
+                send({"event": "STOP", "data": {}})
+                send({"return": {"status": "paused"}})
+            elif command == "hang":
+                self.hung.wait()
+                break
+            elif command == "bad":
+                send({"error": {"class": "CommandNotFound"}})
+            else:
+                send({"return": {}})
+
+        f.close()
+        conn.close()
+        self.sock.close()
+
+
+class QMPClientTest(TestCase):
+
+    def setUp(self):
+        self.server = StubQEMU()
+        self.qmp = QMPClient(self.server.port)
+
+    def tearDown(self):
+        self.server.hung.set()
+        self.qmp.close()
+        self.server.thread.join()
+
+    def test_commands(self):
+        qmp = self.qmp
+
+        # the event is skipped
+        self.assertEqual({"status": "paused"}, qmp("query-status")["return"])
+        self.assertRaises(RuntimeError, qmp, "bad")
+
+        qmp("system_reset", force = True)
+        self.assertEqual(
+            dict(execute = "system_reset", arguments = dict(force = True)),
+            self.server.requests[-1]
+        )
+
+    def test_timeout(self):
+        qmp = self.qmp
+        qmp.settimeout(0.1)
+        self.assertRaises(socket_timeout, qmp, "hang")
+
+
+if __name__ == "__main__":
+    main()
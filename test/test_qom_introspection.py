@@ -0,0 +1,190 @@
+from unittest import (
+    TestCase,
+    main
+)
+from qemu import (
+    IntrospectionUnsupported,
+    QemuVersionDescription,
+    QType,
+    qmp_fill_device_tree,
+)
+from common import (
+    QMPClient,
+)
+from json import (
+    dumps,
+    loads,
+)
+from socket import (
+    socket,
+    AF_INET,
+    SOCK_STREAM,
+)
+from threading import (
+    Thread,
+)
+
+
+class StubQMP(object):
+    """ A QMP server answering `qom-list-types` with given types. One client
+is served.
+    """
+
+    def __init__(self, types):
+        self.types = types
+        self.requests = []
+
+        self.sock = s = socket(AF_INET, SOCK_STREAM)
+        s.bind(("localhost", 0))
+        s.listen(1)
+        self.port = s.getsockname()[1]
+
+        self.thread = t = Thread(target = self.serve)
+        t.daemon = True
+        t.start()
+
+    def serve(self):
+        conn, __ = self.sock.accept()
+        f = conn.makefile("rb")
+
+        def send(obj):
+            conn.sendall(dumps(obj).encode("utf-8") + b"\r\n")
+
+        send({"QMP": {"version": {}, "capabilities": []}})
+
+        for line in f:
+            request = loads(line.decode("utf-8"))
+            self.requests.append(request)
+
+            command = request["execute"]
+            if command == "qom-list-types":
+                send({"return": self.types})
+            else:
+                send({"return": {}})
+
+            if command == "quit":
+                break
+
+        f.close()
+        conn.close()
+        self.sock.close()
+
+
+def device_types(*name_parent_pairs):
+    return list(dict(name = n, parent = p, abstract = False)
+        for n, p in name_parent_pairs
+    )
+
+
+class QMPDeviceTreeTest(TestCase):
+
+    def fill(self, types, root):
+        server = StubQMP(types)
+        qmp = QMPClient(server.port)
+        try:
+            qmp_fill_device_tree(qmp, root, "arch")
+        finally:
+            qmp("quit")
+            qmp.close()
+            server.thread.join()
+
+        self.assertEqual(dict(
+                execute = "qom-list-types",
+                arguments = dict(implements = "device", abstract = True)
+            ),
+            server.requests[1]
+        )
+
+    def test_tree(self):
+        root = QType("device")
+        # another architecture's device
+        QType("isa-device", parent = root, arches = ["other"])
+
+        self.fill(device_types(
+            ("device", "object"),
+            ("pci-device", "device"),
+            ("e1000", "e1000-base"),
+            ("e1000-base", "pci-device"),
+            ("isa-device", "device"),
+            ("isa-serial", "isa-device"),
+        ), root)
+
+        self.assertEqual(set(["pci-device", "isa-device"]),
+            set(root.children)
+        )
+
+        pci = root.children["pci-device"]
+        e1000 = pci.children["e1000-base"].children["e1000"]
+        self.assertEqual(set(["arch"]), e1000.arches)
+
+        isa = root.children["isa-device"]
+        self.assertEqual(set(["arch", "other"]), isa.arches)
+        self.assertIn("isa-serial", isa)
+
+    def test_no_parents(self):
+        types = [dict(name = "device", abstract = True)]
+        self.assertRaises(IntrospectionUnsupported,
+            self.fill, types, QType("device")
+        )
+
+
+def arch_tree(arch, *paths):
+    "Device tree of `arch` like one `co_harvest_device_tree` returns."
+
+    root = QType("device", arches = [arch])
+    for path in paths:
+        node = root
+        for name in path:
+            if name in node:
+                node = node.children[name]
+            else:
+                node = QType(name, parent = node, arches = [arch])
+    return root
+
+
+class DeviceTreeMergeTest(TestCase):
+
+    def test_arches(self):
+        root = QType("device")
+        account = QemuVersionDescription._account_device_tree
+
+        pci = arch_tree("arm", ("pci-device", "e1000-base", "e1000"))
+        pci.children["pci-device"].macros.append("TYPE_PCI_DEVICE")
+        account(root, "arm", pci, [])
+
+        account(root, "i386", arch_tree("i386",
+            ("pci-device", "e1000-base", "e1000e"),
+            ("isa-device", "isa-serial"),
+        ), [])
+
+        # a failed architecture does not change the tree
+        account(root, "mips", None, ["no binaries\n"])
+
+        self.assertEqual(set(["arm", "i386"]), root.arches)
+        self.assertEqual(set(["pci-device", "isa-device"]),
+            set(root.children)
+        )
+
+        pci = root.children["pci-device"]
+        self.assertIs(root, pci.parent)
+        self.assertEqual(set(["arm", "i386"]), pci.arches)
+        self.assertEqual(["TYPE_PCI_DEVICE"], pci.macros)
+
+        base = pci.children["e1000-base"]
+        self.assertEqual(set(["arm", "i386"]), base.arches)
+        self.assertEqual(set(["arm"]), base.children["e1000"].arches)
+        self.assertEqual(set(["i386"]), base.children["e1000e"].arches)
+
+        isa = root.children["isa-device"]
+        self.assertEqual(set(["i386"]), isa.children["isa-serial"].arches)
+
+        # merging same tree again changes nothing
+        account(root, "arm", arch_tree("arm",
+            ("pci-device", "e1000-base", "e1000")
+        ), [])
+        self.assertEqual(set(["arm"]), base.children["e1000"].arches)
+        self.assertEqual(["TYPE_PCI_DEVICE"], pci.macros)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from unittest import (
+    TestCase,
+    main
+)
+from debug import (
+    Runtime,
+)
+from struct import (
+    pack,
+)
+
+
+class MemoryTarget(object):
+    "Emulates `pyrsp.rsp.RemoteTarget` memory reading and counts the reads."
+
+    def __init__(self, memory, base, readable = None):
+        self.memory = memory
+        self.base = base
+        # (start, end) of readable memory
+        self.readable = readable or (base, base + len(memory))
+
+        self.registers = ["r0", "pc"]
+        self.pc_reg = "pc"
+        self.arch = dict(bitsize = 32, endian = True)
+        self.regs = dict(r0 = "0000002a", pc = "00001000")
+
+        self.dumps = []
+
+    def dump(self, size, addr):
+        self.dumps.append((addr, size))
+
+        start, end = self.readable
+        if addr < start or end < addr + size:
+            raise RuntimeError("Reading %u bytes at 0x%x failed" % (size, addr))
+
+        offset = addr - self.base
+        return self.memory[offset:offset + size]
+
+
+class RuntimeMemoryTest(TestCase):
+
+    def setUp(self):
+        self.memory = b"".join(pack("<I", i) for i in range(0x400))
+        self.target = MemoryTarget(self.memory, 0x10000)
+        self.rt = Runtime(self.target, None, page_size = 0x100)
+
+    def test_cache(self):
+        rt, tgt = self.rt, self.target
+
+        self.assertEqual(5, rt.get_val(0x10014, 4))
+        self.assertEqual(6, rt.get_val(0x10018, 4))
+        self.assertEqual([(0x10000, 0x100)], tgt.dumps)
+
+        # crossing a page bound
+        self.assertEqual(self.memory[0xFE:0x102], rt.read(0x100FE, 4))
+        self.assertEqual(2, len(tgt.dumps))
+
+        rt.on_resume()
+        self.assertEqual(5, rt.get_val(0x10014, 4))
+        self.assertEqual(3, len(tgt.dumps))
+
+    def test_prefetch(self):
+        rt, tgt = self.rt, self.target
+
+        rt.prefetch([(0x10010, 4), (0x10300, 8), (0x10120, 0x10)])
+        # first 2 pages are read at once
+        self.assertEqual([(0x10000, 0x200), (0x10300, 0x100)], tgt.dumps)
+
+        self.assertEqual(0xC0, rt.get_val(0x10300, 4))
+        self.assertEqual(2, len(tgt.dumps))
+
+    def test_unreadable(self):
+        tgt = MemoryTarget(self.memory, 0x10000,
+            readable = (0x10080, 0x10180)
+        )
+        rt = Runtime(tgt, None, page_size = 0x100)
+
+        self.assertEqual(self.memory[0x90:0x94], rt.read(0x10090, 4))
+        # page reading failed, exact reading is used
+        self.assertEqual([(0x10000, 0x100), (0x10090, 4)], tgt.dumps)
+
+        self.assertRaises(RuntimeError, rt.read, 0x10000, 4)
+
+    def test_registers(self):
+        rt = self.rt
+        self.assertEqual(0x1000, rt.get_reg(rt.pc))
+        self.assertEqual([None, 0x1000], rt.regs)
+
+    def test_unavailable_register(self):
+        tgt = self.target
+        tgt.registers.append("sp")
+        tgt.regs["r0"] = "xxxxxxxx"
+        rt = Runtime(tgt, None, page_size = 0)
+
+        self.assertEqual(0x1000, rt.get_reg(rt.pc))
+        self.assertRaises(ValueError, rt.get_reg, 0)
+        self.assertRaises(KeyError, rt.get_reg, 2)
+
+    def test_no_cache(self):
+        tgt = self.target
+        rt = Runtime(tgt, None, page_size = 0)
+
+        rt.get_val(0x10014, 4)
+        rt.get_val(0x10014, 4)
+        self.assertEqual([(0x10014, 4)] * 2, tgt.dumps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from unittest import (
+    TestCase,
+    main
+)
+from common import (
+    BadSectionFile,
+    dump_sections,
+    RawSection,
+    SectionFile,
+)
+from os import (
+    close,
+    remove,
+)
+from tempfile import (
+    mkstemp,
+)
+
+
+MAGIC = b"TEST\x00\x01"
+
+
+class SectionFileTest(TestCase):
+
+    def setUp(self):
+        fd, self.path = mkstemp()
+        close(fd)
+
+    def tearDown(self):
+        remove(self.path)
+
+    def write(self, sections):
+        with open(self.path, "wb") as f:
+            f.write(dump_sections(MAGIC, sections))
+
+    def test_sections(self):
+        self.write([
+            ("list", [1, "2", (3,)]),
+            ("none", None),
+            ("dict", {"a": set([1])}),
+        ])
+        sf = SectionFile(self.path, MAGIC)
+
+        self.assertEqual(set(sf), set(["list", "none", "dict"]))
+        self.assertEqual(sf["dict"], {"a": set([1])})
+        self.assertIsNone(sf["none"])
+        self.assertNotIn("absent", sf)
+
+        raw = sf.read_raw("list")
+        self.write([("copy", RawSection(raw))])
+
+        self.assertEqual(SectionFile(self.path, MAGIC)["copy"], [1, "2", (3,)])
+
+    def test_bad_magic(self):
+        self.write([])
+        self.assertRaises(BadSectionFile, SectionFile, self.path, b"OTHER")
+
+
+if __name__ == "__main__":
+    main()
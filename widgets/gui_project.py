@@ -3,12 +3,14 @@ __all__ = [
 ]
 
 from common import (
+    CoReturn,
     History,
 )
 from .gui_layout import (
     GUILayout,
 )
 from qemu import (
+    co_layout_machine,
     MachineNode,
     QProject,
     QType,
@@ -129,6 +131,53 @@ exists." % (l.lid, l.desc_name)
         # explicit list conversion is used for Python 3.x compatibility
         return list(lys.values())
 
+    def co_auto_layout(self, desc, pool = None, reset = False, **kw):
+        """ Lays out machine description `desc` without GUI and stores the
+result to its layout (one with least id). The layout is created if `desc` has
+no one. Positions of nodes existing in the layout are used as initial.
+
+:param pool: a `CoPool` to offload the computation to
+:param reset: do not use current positions of nodes
+:param kw: arguments for `co_layout_machine`
+:returns: the `GUILayout`
+        """
+
+        lys = sorted(self.get_layout_objects(desc.name),
+            key = lambda l: l.lid
+        )
+        if lys:
+            l = lys[0]
+            # `MachineWidgetLayout` or a legacy diagram layout
+            mdwl = getattr(l.opaque, "mdwl", l.opaque)
+        else:
+            l = None
+            mdwl = None
+
+        if reset and mdwl:
+            # keep configuration only
+            mdwl = dict((k, v) for k, v in mdwl.items() if k == -1)
+
+        if pool is None:
+            layout = yield co_layout_machine(desc, layout = mdwl, **kw)
+        else:
+            layout = yield pool.offload(co_layout_machine, desc,
+                layout = mdwl,
+                **kw
+            )
+
+        if l is None:
+            l = self.add_layout(desc.name, layout)
+        else:
+            if hasattr(l.opaque, "mdwl"):
+                l.opaque.mdwl = layout
+            else:
+                l.opaque = layout
+
+            if l.widget is not None:
+                l.widget.set_layout(l.opaque)
+
+        raise CoReturn(l)
+
     def get_machine_descriptions(self):
         return [ d for d in self.descriptions if isinstance(d, MachineNode) ]
 
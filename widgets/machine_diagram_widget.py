@@ -10,12 +10,13 @@ from .bus_settings import (
 from common import (
     bidict,
     find_empty_aabb,
+    integrate_velocities,
     mlget as _,
     PhBox,
     PhCircle,
+    PhDiagram,
     Polygon,
     Segment,
-    sign,
     Vector,
 )
 from .cpu_settings import (
@@ -50,6 +51,10 @@ from qemu import (
     DeviceNode,
     IRQHub,
     IRQLine as QIRQLine,
+    LAYOUT_DYNAMIC,
+    LAYOUT_IRQ_LINES_POINTS,
+    LAYOUT_MESH_STEP,
+    LAYOUT_SHOW_MESH,
     MachineNodeOperation,
     MachineNodeSetLinkAttributeOperation,
     MOp_AddBus,
@@ -93,9 +98,6 @@ from os import (
 from os.path import (
     splitext,
 )
-from random import (
-    random,
-)
 from six import (
     binary_type,
     text_type,
@@ -272,6 +274,8 @@ class NodeCircle(PhCircle):
 
 class IRQPathCircle(NodeCircle):
 
+    light = True
+
     def __init__(self, line):
         NodeCircle.__init__(self)
         self.line = line
@@ -312,18 +316,13 @@ MIN_MESH_STEP = 1
 # limitation of Canvas.create_line.dash
 MAX_MESH_STEP = 260
 
-LAYOUT_SHOW_MESH = "show mesh"
-LAYOUT_MESH_STEP = "mesh step"
-LAYOUT_DYNAMIC = "physical layout" # this name difference is a legacy issue
-LAYOUT_IRQ_LINES_POINTS = "IRQ lines points"
-
 
 # MachineDiagramWidget states, use them with `is` operator only
 # They do extends CanvasDnD states list
 rect_selecting = object()
 
 
-class MachineDiagramWidget(CanvasDnD, TkPopupHelper):
+class MachineDiagramWidget(CanvasDnD, TkPopupHelper, PhDiagram):
     EVENT_SELECT = "<<Select>>"
 
     def __init__(self, parent, mach_desc, node_font = None, readonly = False):
@@ -2583,6 +2582,12 @@ IRQ line creation
                 yield c
             # TODO: also yield lines between circles
 
+    def ph_bus_parent(self, bus):
+        parent_device = self.node2dev[bus.buslabel].parent_device
+        if parent_device:
+            return self.dev2node[parent_device]
+        return None
+
     def ph_iterate_co(self):
         all_nodes = self.nodes + self.buslabels + self.circles
         dynamic = [n for n in all_nodes if not n.static]
@@ -2594,213 +2599,9 @@ IRQ line creation
 
         yield
 
-        nbl = self.nodes + self.buslabels
-
-        for idx, n in enumerate(nbl):
-            for n1 in nbl[idx + 1:]:
-                if not n.overlaps_box(n1):
-                    continue
-
-                w2 = n.width / 2
-                h2 = n.height / 2
-
-                w12 = n1.width / 2
-                h12 = n1.height / 2
-
-                # distance vector from n center to n1 center
-                dx = n1.x + w12 - (n.x + w2)
-
-                while dx == 0:
-                    dx = sign(random() - 0.5)
-
-                dy = n1.y + h12 - (n.y + h2) 
-
-                while dy == 0:
-                    dy = sign(random() - 0.5)
-
-                w = n.width + 2 * n.spacing
-                w1 = n1.width + 2 * n1.spacing
-
-                h = n.height + 2 * n.spacing
-                h1 = n1.height + 2 * n1.spacing
-
-                xscale = float(w) / (w + w1)
-                yscale = float(h) / (h + h1)
-
-                # intrusion point, inside box physical border (including
-                # spacing)
-                # The intrusion point is shifted from interval's middle point
-                # to the smallest box center.
-                ix = dx * xscale
-                iy = dy * yscale
-
-                # collision point, at box physical border
-                if abs(iy) > abs(ix):
-                    cy = (h2 + n.spacing) * sign(iy)
-                    cx = ix * cy / iy
-                else:
-                    cx = (w2 + n.spacing) * sign(ix)
-                    cy = iy * cx / ix
-
-                # reaction vector, the direction is from intrusion point to
-                # collision point
-                rx = ix - cx
-                ry = iy - cy
-
-                n.vx = n.vx + rx * self.velocity_k
-                n.vy = n.vy + ry * self.velocity_k
-                n1.vx = n1.vx - rx * self.velocity_k
-                n1.vy = n1.vy - ry * self.velocity_k
-
-                # Artificial sleep for time management test 
-                #time.sleep(0.001)
-
-            yield
-
-            for b in self.buses:
-                if not n.touches_vline(b):
-                    continue
-
-                if n == b.buslabel:
-                    continue
-
-                parent_device = self.node2dev[b.buslabel].parent_device
-                if parent_device:
-                    parent_node = self.dev2node[parent_device]
-                    if parent_node == n:
-                        continue
-
-                w2 = n.width / 2
-                dx = b.x - (n.x + w2)
-
-                while dx == 0:
-                    dx = sign(random() - 0.5)
-
-                ix = dx - sign(dx) * (w2 + n.spacing)
-
-                n.vx = n.vx + ix * self.bus_velocity_k
-
-                if parent_device and parent_node:
-                    parent_node.vx = parent_node.vx - ix * self.velocity_k
-
-            yield
-
-            for c in self.conns:
-                if n.conn == c:
-                    continue
-
-                if not n.touches_hline(c):
-                    continue
-
-                h2 = n.height / 2
-                dy = c.y - (n.y + h2)
-
-                while dy == 0:
-                    dy = sign(random() - 0.5)
-
-                iy = dy - sign(dy) * (h2 + n.spacing)
-
-                n.vy = n.vy + iy * self.bus_velocity_k
-                c.dev_node.vy = c.dev_node.vy - iy * self.bus_velocity_k
-
-            yield
-
-            for hub in self.circles:
-                if not hub.overlaps_box(n):
-                    continue
-
-                w2 = n.width / 2
-                h2 = n.height / 2
-
-                # distance vector from n center to n1 center
-                dx = hub.x + hub.r - (n.x + w2)
-
-                while dx == 0:
-                    dx = sign(random() - 0.5)
-
-                dy = hub.y + hub.r - (n.y + h2) 
-
-                while dy == 0:
-                    dy = sign(random() - 0.5)
-
-                w = n.width + 2 * n.spacing
-                h = n.height + 2 * n.spacing
-                d = (hub.r + hub.spacing) * 2
-
-
-                xscale = float(w) / (w + d)
-                yscale = float(h) / (h + d)
-
-                ix = dx * xscale
-                iy = dy * yscale
-
-                # collision point, at box physical border
-                if abs(iy) > abs(ix):
-                    cy = (h2 + n.spacing) * sign(iy)
-                    cx = ix * cy / iy
-                else:
-                    cx = (w2 + n.spacing) * sign(ix)
-                    cy = iy * cx / ix
-
-                rx = ix - cx
-                ry = iy - cy
-
-                if isinstance(hub, IRQHubCircle):
-                    n.vx = n.vx + rx * self.velocity_k
-                    n.vy = n.vy + ry * self.velocity_k
-
-                hub.vx = hub.vx - rx * self.velocity_k
-                hub.vy = hub.vy - ry * self.velocity_k
-
-            yield
-
-        for idx, h in enumerate(self.circles):
-            for h1 in self.circles[idx + 1:]:
-                # if (bool(isinstance(h1, IRQPathCircle))
-                #  != bool(isinstance(h, IRQPathCircle))
-                # ):
-                #    continue
-
-                if not h.overlaps_circle(h1):
-                    continue
-
-                dx = h1.x + h1.r - (h.x + h.r)
-
-                while dx == 0:
-                    dx = sign(random() - 0.5)
-
-                dy = h1.y + h1.r - (h.y + h.r)
-
-                while dy == 0:
-                    dy = sign(random() - 0.5)
-
-                scale = float(h.r) / (h.r + h1.r)
-
-                ix = dx * scale
-                iy = dy * scale
-
-                ir = sqrt(ix * ix + iy * iy)
-                k = (h.r + h.spacing) / ir
-
-                cx = ix * k
-                cy = iy * k
-
-                rx = ix - cx
-                ry = iy - cy
-
-                if not (
-                        isinstance(h, IRQHubCircle)
-                    and isinstance(h1, IRQPathCircle)
-                ):
-                    h.vx = h.vx + rx * self.velocity_k
-                    h.vy = h.vy + ry * self.velocity_k
-                if not (
-                        isinstance(h1, IRQHubCircle)
-                    and isinstance(h, IRQPathCircle)
-                ):
-                    h1.vx = h1.vx - rx * self.velocity_k
-                    h1.vy = h1.vy - ry * self.velocity_k
-
+        # Positions are not changed until the end of iteration. So, the broad
+        # phase is actual during whole `ph_co_reactions`.
+        for __ in self.ph_co_reactions():
             yield
 
         for l in self.irq_lines:
@@ -2838,20 +2639,7 @@ IRQ line creation
 
             yield
 
-        lim = self.velocity_limit
-
-        for n in dynamic:
-            vx, vy = n.vx, n.vy
-
-            if abs(vx) > lim:
-                vx = sign(vx) * lim
-                n.vx = vx
-            if abs(vy) > lim:
-                vy = sign(vy) * lim
-                n.vy = vy
-
-            n.x += vx
-            n.y += vy
+        integrate_velocities(dynamic, self.velocity_limit)
 
     def ph_apply_conn(self, c):
         _id = self.node2id[c]
@@ -0,0 +1,59 @@
+from .DnDCanvas import *
+from .add_desc_dialog import *
+from .auto_paned import *
+from .auto_var_treeview import *
+from .branch_tree_view import *
+from .bus_settings import *
+from .canvas_frame import *
+from .checklist import *
+from .close_button_notebook import *
+from .co_status_view import *
+from .cpu_settings import *
+from .cross_dialogs import *
+from .desc_name_watcher import *
+from .device_settings import *
+from .device_settings_window import *
+from .device_tree_widget import *
+from .git_ref_selector import *
+from .gui_dialog import *
+from .gui_editing import *
+from .gui_error import *
+from .gui_frame import *
+from .gui_layout import *
+from .gui_proj_ht import *
+from .gui_project import *
+from .gui_text import *
+from .gui_tk import *
+from .gui_toplevel import *
+from .history_window import *
+from .hotkey import *
+from .irq_hub_settings import *
+from .irq_settings import *
+from .keyboard_settings import *
+from .line_select_dialog import *
+from .logo import *
+from .machine_diagram_widget import *
+from .machine_widget import *
+from .memory_settings import *
+from .memory_tree_widget import *
+from .menubuilder import *
+from .obj_ref_var import *
+from .pack_info_compat import *
+from .pci_device_settings import *
+from .pci_id_widget import *
+from .popup_helper import *
+from .project_widget import *
+from .qdc_gui_signal_helper import *
+from .qom_settings import *
+from .scrollframe import *
+from .settings_window import *
+from .statusbar import *
+from .sysbusdevset import *
+from .text_canvas import *
+from .textview import *
+from .tk_co_dispatcher import *
+from .tk_geometry_helper import *
+from .tk_unbind import *
+from .tk_var_attr import *
+from .tv_width_helper import *
+from .var_widgets import *
\ No newline at end of file
@@ -65,7 +65,16 @@ peaces among Tkinter event driven GUI model.
             # Note that, a task may consume so many time just before a call or
             # finish. It will not be presented in the list.
 
-        self.tk.after(1 if ready else self.wait_msec, self.iteration)
+        if ready:
+            after = 1
+        else:
+            after = self.wait_msec
+            # Don't oversleep a `CoWaitable`'s timeout.
+            timeout = self.wait_timeout()
+            if timeout is not None:
+                after = max(1, min(after, int(timeout * 1000.)))
+
+        self.tk.after(after, self.iteration)
 
     def start_loop(self):
         self.tk.after(0, self.iteration)